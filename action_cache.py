@@ -0,0 +1,169 @@
+import asyncio
+import json
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+
+class ActionCache:
+    """Cache LRU+TTL das ações interpretadas pela IA, com camada SQLite opcional
+
+    A camada em memória é síncrona; a SQLite nunca roda no loop de eventos:
+    leituras vão para o executor e gravações para uma thread que agrupa os commits.
+    """
+
+    def __init__(self, max_entries=512, ttl=3600, db_path=None):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+
+        # chave -> (expira_em, ação)
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.persistent_hits = 0
+
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._writes = queue.Queue()
+        self._writer = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS actions ("
+                "key TEXT PRIMARY KEY, action TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM actions WHERE expires_at < ?", (time.time(),))
+            self._db.commit()
+
+            self._writer = threading.Thread(target=self._write_loop, name='action-cache-writer', daemon=True)
+            self._writer.start()
+
+    @staticmethod
+    def normalize_command(command):
+        """Normaliza o comando: minúsculas, sem pontuação final e espaços repetidos"""
+        command = command.lower().strip()
+        command = re.sub(r'\s+', ' ', command)
+        return command.strip(' .!?')
+
+    @staticmethod
+    def make_key(command, url=None, fingerprint=None):
+        """Monta a chave a partir do comando, domínio atual e impressão digital da página"""
+        domain = ''
+        if url:
+            domain = urlparse(url).netloc.lower()
+            if domain.startswith('www.'):
+                domain = domain[4:]
+
+        return f"{domain}|{ActionCache.normalize_command(command)}|{fingerprint or ''}"
+
+    def get_memory(self, key):
+        """Consulta só a camada em memória (síncrona); não conta falhas"""
+        entry = self._entries.get(key)
+        if entry:
+            expires_at, action = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(action)
+            del self._entries[key]
+        return None
+
+    async def get(self, key):
+        """Retorna uma cópia da ação em cache ou None (a consulta SQLite roda no executor)"""
+        action = self.get_memory(key)
+        if action is not None:
+            return action
+
+        if self._db:
+            loop = asyncio.get_running_loop()
+            row = await loop.run_in_executor(None, self._read, key)
+
+            if row and row[1] > time.time():
+                action = json.loads(row[0])
+                self._store_memory(key, action, row[1])
+                self.hits += 1
+                self.persistent_hits += 1
+                return dict(action)
+
+        self.misses += 1
+        return None
+
+    def _read(self, key):
+        """Lê a entrada do SQLite (executado fora do loop)"""
+        with self._db_lock:
+            return self._db.execute(
+                "SELECT action, expires_at FROM actions WHERE key = ?", (key,)
+            ).fetchone()
+
+    def put(self, key, action, ttl=None):
+        """Armazena a ação (somente após execução bem-sucedida)"""
+        expires_at = time.time() + (ttl if ttl is not None else self.ttl)
+        self._store_memory(key, dict(action), expires_at)
+
+        if self._writer:
+            self._writes.put((
+                "INSERT OR REPLACE INTO actions (key, action, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(action), expires_at)
+            ))
+
+    def _write_loop(self):
+        """Aplica as gravações pendentes com um único commit por lote (thread dedicada)"""
+        while True:
+            batch = [self._writes.get()]
+            while True:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+
+            statements = [item for item in batch if item is not None]
+            if statements:
+                try:
+                    with self._db_lock:
+                        for sql, params in statements:
+                            self._db.execute(sql, params)
+                        self._db.commit()
+                except sqlite3.Error as e:
+                    print(f"Erro ao gravar cache de ações: {e}")
+
+            if len(statements) < len(batch):
+                return
+
+    def _store_memory(self, key, action, expires_at):
+        """Insere na camada em memória respeitando o limite LRU"""
+        self._entries[key] = (expires_at, action)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        """Remove uma entrada das duas camadas"""
+        self._entries.pop(key, None)
+        if self._writer:
+            self._writes.put(("DELETE FROM actions WHERE key = ?", (key,)))
+
+    def stats(self):
+        """Contadores de acertos e falhas"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'persistent_hits': self.persistent_hits,
+            'hit_rate': self.hits / total if total else 0.0,
+            'entries': len(self._entries),
+        }
+
+    def close(self):
+        """Grava o que estiver pendente e fecha a conexão SQLite"""
+        if self._writer:
+            self._writes.put(None)
+            self._writer.join()
+            self._writer = None
+        if self._db:
+            self._db.close()
+            self._db = None
@@ -1,81 +1,139 @@
-import google.generativeai as genai
 import json
 import re
-from bs4 import BeautifulSoup
+from gemini_client import GeminiClient
+from action_cache import ActionCache
+from intent_parser import IntentParser
+from page_extractor import extract_from_html
+from prompt_builder import PromptBuilder
+from metrics import tracer
+
+# Ações que podem ser reaproveitadas sem impressão digital da página
+CACHEABLE_ACTIONS = ('navigate', 'search', 'scroll', 'type')
 
 class AIHandler:
-    def __init__(self, api_key):
+    def __init__(self, api_key, max_concurrency=8, per_user_concurrency=1, request_timeout=20,
+                 cache=None, model_name='gemini-pro', prompt_budget=1200):
+        # SDK importado só quando a IA é configurada (importação lenta)
+        import google.generativeai as genai
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
-        
-    async def process_command(self, command, page_source, screenshot_path):
-        """Processa comando do usuário usando Gemini AI"""
+        self.model = genai.GenerativeModel(model_name)
         
-        # Extrair texto relevante da página
-        soup = BeautifulSoup(page_source, 'html.parser')
+        # Prompt limitado a um orçamento de tokens com os trechos mais relevantes da página
+        self.prompt_builder = PromptBuilder(budget=prompt_budget)
         
-        # Remover scripts e estilos
-        for script in soup(["script", "style"]):
-            script.decompose()
+        # Cliente assíncrono com limites de concorrência, prazos e novas tentativas
+        self.client = GeminiClient(
+            self.model,
+            max_concurrency=max_concurrency,
+            per_user_concurrency=per_user_concurrency,
+            request_timeout=request_timeout
+        )
         
-        # Extrair texto visível
-        visible_text = soup.get_text()
+        # Cache de comandos já interpretados
+        self.cache = cache or ActionCache()
         
-        # Limitar tamanho do texto
-        visible_text = visible_text[:2000] if len(visible_text) > 2000 else visible_text
+        # Interpretador local para comandos comuns (dispensa a IA)
+        self.intent_parser = IntentParser()
         
-        # Prompt para a IA
-        prompt = f"""
-        Você é um assistente que controla um navegador web. Analise o comando do usuário e a página atual, então retorne uma ação em formato JSON.
-
-        COMANDO DO USUÁRIO: {command}
-
-        CONTEÚDO DA PÁGINA ATUAL:
-        {visible_text}
-
-        URL ATUAL: {self._extract_url_from_source(page_source)}
-
-        AÇÕES DISPONÍVEIS:
-        1. navigate - Navegar para URL
-        2. click - Clicar em coordenadas
-        3. type - Digitar texto
-        4. search - Pesquisar (encontra campo de busca automaticamente)
-        5. scroll - Rolar página
-
-        EXEMPLOS DE COMANDOS E RESPOSTAS:
-
-        Comando: "vá para o youtube"
-        Resposta: {{"type": "navigate", "url": "https://www.youtube.com"}}
-
-        Comando: "pesquise por gatos"
-        Resposta: {{"type": "search", "query": "gatos"}}
-
-        Comando: "digite olá mundo"
-        Resposta: {{"type": "type", "text": "olá mundo"}}
+    async def quick_action(self, command, current_url=None):
+        """Resolve o comando sem chamar a IA: interpretador local e depois cache
 
-        Comando: "role para baixo"
-        Resposta: {{"type": "scroll", "direction": "down", "pixels": 500}}
-
-        Comando: "clique no meio da tela"
-        Resposta: {{"type": "click", "x": 960, "y": 540}}
-
-        IMPORTANTE:
-        - Retorne APENAS o JSON, sem explicações
-        - Use URLs completas (com https://)
-        - Para sites brasileiros populares, use os domínios corretos (.com.br quando aplicável)
-        - Seja inteligente ao interpretar comandos em português
+        Retorna (ação, origem) com origem 'parser', 'cache' ou None.
+        """
+        action = self.intent_parser.resolve(command)
+        if action:
+            return action, 'parser'
+        
+        action = await self.cached_action(command, current_url)
+        return action, 'cache' if action else None
+    
+    async def cached_action(self, command, current_url=None, fingerprint=None):
+        """Retorna a ação em cache para o comando na página atual, se houver"""
+        return await self.cache.get(ActionCache.make_key(command, current_url, fingerprint))
+    
+    def remember(self, command, current_url, action, fingerprint=None):
+        """Guarda a ação no cache (chamar apenas após execução bem-sucedida)"""
+        steps = action.get('steps', []) if action.get('type') == 'plan' else [action]
+        
+        for step in steps:
+            action_type = step.get('type')
+            
+            # IDs do índice de elementos valem só para o documento em que foram gerados
+            if step.get('element_id') is not None:
+                return False
+            
+            # Cliques por coordenada só valem para a mesma página
+            if action_type not in CACHEABLE_ACTIONS and not (action_type == 'click' and fingerprint):
+                return False
+        
+        self.cache.put(ActionCache.make_key(command, current_url, fingerprint), action)
+        return True
+        
+    def forget(self, command, current_url, fingerprint=None):
+        """Descarta a ação em cache do comando (ex.: falhou ao ser reaproveitada)"""
+        self.cache.invalidate(ActionCache.make_key(command, current_url, fingerprint))
+        
+    async def process_command(self, command, page, screenshot=None, user_id=None):
+        """Processa comando do usuário usando Gemini AI
+        
+        `page` é o conteúdo extraído pelo navegador (dict) ou o HTML bruto.
+        Retorna uma ação única ou um plano {"type": "plan", "steps": [...]}.
+        """
+        prompt = self._build_prompt(command, page)
+        return await self._request_action(prompt, user_id, self._coalesce_key('command', command, page))
+    
+    async def replan(self, command, page, completed, failed_step, user_id=None):
+        """Pede um novo plano quando a pré-condição de um passo falha"""
+        done = '\n'.join(f"- {json.dumps(step, ensure_ascii=False)}" for step in completed) or '- nenhum'
+        context = (f"PASSOS JÁ EXECUTADOS COM SUCESSO:\n{done}\n\n"
+                   f"PASSO QUE FALHOU (condição não atendida):\n{json.dumps(failed_step, ensure_ascii=False)}\n\n"
+                   "Retorne as ações RESTANTES para concluir o comando a partir da página atual.")
+        prompt = self._build_prompt(command, page, context)
+        key = self._coalesce_key('replan', command, page, json.dumps(failed_step, sort_keys=True))
+        return await self._request_action(prompt, user_id, key)
+    
+    async def suggest_selector(self, description, page, user_id=None):
+        """Pede à IA o seletor CSS dos itens descritos pelo usuário (usado pelo !scrape)"""
+        context = ("NÃO execute ações. Responda apenas {\"selector\": \"css\"} com um seletor CSS que "
+                   "corresponda a CADA item a extrair (um elemento por item, não o contêiner da lista).")
+        prompt = self._build_prompt(f"extrair: {description}", page, context)
+        
+        try:
+            key = self._coalesce_key('selector', description, page)
+            parsed = self.parse_response(await self.client.generate(prompt, user_id, key))
+        except Exception as e:
+            print(f"Erro na IA: {e}")
+            return None
+        
+        return parsed.get('selector') if parsed else None
+    
+    @staticmethod
+    def _coalesce_key(kind, command, page, *extra):
+        """Chave de pedidos equivalentes à IA: tipo, comando normalizado e URL da página
 
-        RESPONDA APENAS COM O JSON:
+        Sem URL (HTML bruto) retorna None e o cliente usa o hash do prompt.
         """
+        url = page.get('url') if isinstance(page, dict) else None
+        if not url:
+            return None
+        return (kind, ActionCache.normalize_command(command), url) + extra
+    
+    @tracer.timed('prompt_build')
+    def _build_prompt(self, command, page, context=''):
+        """Monta o prompt com o comando, os trechos relevantes da página e o contexto adicional"""
+        # HTML bruto: usar o parser alternativo
+        if isinstance(page, str):
+            page = extract_from_html(page)
         
+        return self.prompt_builder.build(command, page, context)
+    
+    async def _request_action(self, prompt, user_id, coalesce_key=None):
+        """Chama a IA e converte a resposta em ação"""
         try:
-            response = self.model.generate_content(prompt)
+            response_text = await self.client.generate(prompt, user_id, coalesce_key)
             
-            # Extrair JSON da resposta
-            json_match = re.search(r'\{.*\}', response.text, re.DOTALL)
-            if json_match:
-                json_str = json_match.group()
-                action = json.loads(json_str)
+            action = self.parse_response(response_text)
+            if action:
                 return action
             else:
                 # Fallback se não conseguir extrair JSON
@@ -85,16 +143,36 @@ class AIHandler:
             print(f"Erro na IA: {e}")
             return {"type": "error", "message": f"Erro na IA: {str(e)}"}
     
-    def _extract_url_from_source(self, page_source):
-        """Extrai URL atual do código fonte"""
+    @staticmethod
+    def parse_response(response_text):
+        """Extrai a ação (objeto) ou plano (lista de ações) do texto da IA"""
+        match = re.search(r'[\[{]', response_text)
+        if not match:
+            return None
+        
         try:
-            # Procurar por canonical URL ou usar método alternativo
-            soup = BeautifulSoup(page_source, 'html.parser')
-            canonical = soup.find('link', {'rel': 'canonical'})
-            if canonical and canonical.get('href'):
-                return canonical['href']
-            
-            # Fallback
-            return "URL não detectada"
-        except:
-            return "URL não detectada"
\ No newline at end of file
+            parsed, _ = json.JSONDecoder().raw_decode(response_text[match.start():])
+        except ValueError:
+            # Fallback: maior trecho entre chaves
+            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+            if not json_match:
+                return None
+            try:
+                parsed = json.loads(json_match.group())
+            except ValueError:
+                return None
+        
+        if isinstance(parsed, list):
+            parsed = {"type": "plan", "steps": parsed}
+        
+        if not isinstance(parsed, dict):
+            return None
+        
+        # Plano com um único passo vira uma ação simples
+        if parsed.get('type') == 'plan':
+            steps = [step for step in parsed.get('steps', []) if isinstance(step, dict)]
+            if len(steps) == 1 and not steps[0].get('wait_for'):
+                return steps[0]
+            parsed['steps'] = steps
+        
+        return parsed
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Benchmark ponta a ponta offline: executa os comandos reais do bot.py com Discord falso,
+site estático local, Chrome headless e modelo de IA simulado. Resultado em JSON.
+
+Uso: python benchmarks/e2e_bench.py --sessions 1,4 --rounds 3 --ai-latency 0.5 --output resultado.json
+     --driver-path /usr/bin/chromedriver  (ou CHROMEDRIVER_PATH; obrigatório para rodar sem rede)
+"""
+
+import argparse
+import asyncio
+import functools
+import io
+import itertools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import discord
+import bot as bot_module
+from ai_handler import AIHandler
+from action_cache import ActionCache
+from browser_controller import BrowserController
+from load_profiles import LOAD_PROFILES, DEFAULT_LOAD_PROFILE
+from browser_pool import BrowserPool
+from message_scheduler import OutboundScheduler
+from metrics import LatencyHistogram, tracer
+from screenshot_pipeline import FrameTracker
+from memory_watchdog import process_tree_rss
+
+SITE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'site')
+
+_ids = itertools.count(1000)
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    """Servidor estático sem log por requisição"""
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_site_server():
+    """Sobe o site de benchmark em uma porta livre de 127.0.0.1"""
+    handler = functools.partial(_QuietHandler, directory=SITE_DIR)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, name='bench-site', daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """Modelo simulado: latência configurável e ações escolhidas por palavras-chave do comando"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    async def generate_content_async(self, prompt):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+
+        match = re.search(r'COMANDO DO USUÁRIO: (.*)', prompt)
+        command = match.group(1) if match else ''
+        return StubResponse(json.dumps(self.respond(command)))
+
+    @staticmethod
+    def respond(command):
+        if 'produtos' in command:
+            return {"type": "search", "query": "teclado"}
+        if 'posts' in command:
+            return [{"type": "scroll", "direction": "down", "pixels": 1500} for _ in range(3)]
+        return {"type": "scroll", "direction": "down", "pixels": 800}
+
+
+class UploadStats:
+    """Contadores do tráfego que iria para o Discord"""
+
+    def __init__(self):
+        self.messages = 0
+        self.edits = 0
+        self.uploads = 0
+        self.bytes = 0
+        self.errors = []
+
+    def record(self, kwargs):
+        files = list(kwargs.get('attachments') or [])
+        if kwargs.get('file'):
+            files.append(kwargs['file'])
+
+        for file in files:
+            if isinstance(file, discord.File):
+                self.uploads += 1
+                self.bytes += file.fp.getbuffer().nbytes if isinstance(file.fp, io.BytesIO) else 0
+
+        content = kwargs.get('content') or ''
+        if content.startswith('❌'):
+            self.errors.append(content)
+
+
+class FakeMessage:
+    def __init__(self, channel):
+        self.id = next(_ids)
+        self.channel = channel
+
+    async def edit(self, **kwargs):
+        self.channel.stats.edits += 1
+        self.channel.stats.record(kwargs)
+        return self
+
+    async def delete(self):
+        pass
+
+
+class FakeChannel:
+    def __init__(self, stats):
+        self.id = next(_ids)
+        self.stats = stats
+
+    async def send(self, content=None, **kwargs):
+        kwargs['content'] = content
+        self.stats.messages += 1
+        self.stats.record(kwargs)
+        return FakeMessage(self)
+
+
+class FakeObject:
+    def __init__(self, **attrs):
+        self.__dict__.update(attrs)
+
+
+def make_context(channel, author_id, command):
+    """commands.Context mínimo para os handlers do bot"""
+    return FakeObject(
+        guild=None,
+        channel=channel,
+        author=FakeObject(id=author_id),
+        message=FakeObject(created_at=discord.utils.utcnow()),
+        command=command,
+    )
+
+
+class Session:
+    """Usuário simulado executando o roteiro de comandos"""
+
+    def __init__(self, number, base_url, stats, latencies):
+        self.number = number
+        self.base_url = base_url
+        self.channel = FakeChannel(stats)
+        self.author_id = next(_ids)
+        self.latencies = latencies
+        self.commands = 0
+
+    async def invoke(self, name, handler, *args, **kwargs):
+        """Executa o handler real com os hooks de início/fim do bot"""
+        ctx = make_context(self.channel, self.author_id, handler)
+        await bot_module.start_command_trace(ctx)
+
+        started = time.perf_counter()
+        try:
+            await handler.callback(ctx, *args, **kwargs)
+        finally:
+            await bot_module.finish_command_trace(ctx)
+
+        self.latencies.setdefault(name, LatencyHistogram()).record(time.perf_counter() - started)
+        self.commands += 1
+
+    async def start(self):
+        await self.invoke('web', bot_module.start_browser)
+
+    async def run_round(self, round_number):
+        tag = f"{self.number}-{round_number}"
+        await self.invoke('go', bot_module.navigate_to, f"{self.base_url}/heavy.html")
+        await self.invoke('ai', bot_module.ai_command, command=f"mostre o que há mais abaixo na seção {tag}")
+        await self.invoke('go', bot_module.navigate_to, f"{self.base_url}/search.html")
+        await self.invoke('ai', bot_module.ai_command, command=f"encontre produtos do tipo teclado {tag}")
+        await self.invoke('screenshot', bot_module.take_screenshot)
+        await self.invoke('go', bot_module.navigate_to, f"{self.base_url}/scroll.html")
+        await self.invoke('ai', bot_module.ai_command, command=f"carregue mais posts {tag}")
+
+    def memory(self):
+        """RSS da árvore de processos do Chrome desta sessão"""
+        controller = bot_module.browser_pool.get(BrowserPool.session_key(make_context(self.channel, self.author_id, None)))
+        if not controller or not controller.driver:
+            return None
+        return process_tree_rss(getattr(controller.driver, 'browser_pid', None))
+
+    async def close(self):
+        await self.invoke('close', bot_module.close_browser)
+
+
+def summarize(histograms):
+    """Percentis em ms por nome"""
+    return {
+        name: {
+            'count': histogram.count,
+            'mean_ms': round(histogram.mean * 1000, 1),
+            'p50_ms': round(histogram.percentile(50) * 1000, 1),
+            'p95_ms': round(histogram.percentile(95) * 1000, 1),
+            'p99_ms': round(histogram.percentile(99) * 1000, 1),
+            'max_ms': round(histogram.max * 1000, 1),
+        }
+        for name, histogram in sorted(histograms.items())
+    }
+
+
+async def run_level(sessions_count, args, base_url):
+    """Executa o roteiro com N sessões concorrentes"""
+    tracer.histograms.clear()
+    stats = UploadStats()
+    latencies = {}
+    model = StubModel(args.ai_latency)
+
+    # Pool só com as sessões do benchmark, sem navegadores aquecidos
+    bot_module.browser_pool = BrowserPool(
+        max_browsers=sessions_count,
+        warm_size=0,
+        factory=lambda: BrowserController(
+            screenshot_profile=args.profile,
+            headless=True,
+            start_url=f"{base_url}/index.html",
+            load_profile=args.load_profile,
+            driver_path=args.driver_path
+        )
+    )
+    bot_module.ai_handler = AIHandler('offline', cache=ActionCache())
+    bot_module.ai_handler.client.model = model
+    bot_module.frame_tracker = FrameTracker()
+    if not args.discord_limits:
+        bot_module.outbound = OutboundScheduler(channel_rate=1e6, channel_burst=1e6, global_rate=1e6)
+
+    sessions = [Session(number, base_url, stats, latencies) for number in range(sessions_count)]
+
+    started = time.perf_counter()
+    await asyncio.gather(*(session.start() for session in sessions))
+    startup = time.perf_counter() - started
+
+    started = time.perf_counter()
+
+    async def run_session(session):
+        for round_number in range(args.rounds):
+            await session.run_round(round_number)
+
+    await asyncio.gather(*(run_session(session) for session in sessions))
+    elapsed = time.perf_counter() - started
+
+    memory = [session.memory() for session in sessions]
+    memory = [value for value in memory if value]
+
+    await asyncio.gather(*(session.close() for session in sessions))
+    await bot_module.browser_pool.close_all()
+
+    commands = sum(session.commands for session in sessions) - 2 * sessions_count
+    return {
+        'sessions': sessions_count,
+        'startup_seconds': round(startup, 2),
+        'throughput': {
+            'commands': commands,
+            'seconds': round(elapsed, 2),
+            'commands_per_second': round(commands / elapsed, 2) if elapsed else None,
+        },
+        'memory_per_session_mb': round(sum(memory) / len(memory) / 2 ** 20, 1) if memory else None,
+        'discord': {
+            'messages': stats.messages,
+            'edits': stats.edits,
+            'uploads': stats.uploads,
+            'bytes_uploaded': stats.bytes,
+            'errors': stats.errors[:10],
+        },
+        'ai_calls': model.calls,
+        'commands': summarize(latencies),
+        'stages': [
+            {'stage': stage, 'command': command, 'count': count,
+             'p50_ms': round(p50 * 1000, 1), 'p95_ms': round(p95 * 1000, 1),
+             'p99_ms': round(p99 * 1000, 1), 'max_ms': round(maximum * 1000, 1)}
+            for stage, command, count, p50, p95, p99, maximum in tracer.summary()
+        ],
+    }
+
+
+async def run(args):
+    server, base_url = start_site_server()
+    try:
+        levels = []
+        for sessions_count in args.sessions:
+            print(f"▶️ {sessions_count} sessão(ões), {args.rounds} rodada(s)...")
+            level = await run_level(sessions_count, args, base_url)
+            print(f"   {level['throughput']['commands_per_second']} comandos/s, "
+                  f"{level['discord']['bytes_uploaded'] / 1024:.0f} KiB enviados")
+            levels.append(level)
+    finally:
+        server.shutdown()
+
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': {
+            'sessions': args.sessions,
+            'rounds': args.rounds,
+            'ai_latency': args.ai_latency,
+            'profile': args.profile,
+            'load_profile': args.load_profile,
+            'discord_limits': args.discord_limits,
+            'driver_path': args.driver_path,
+        },
+        'levels': levels,
+    }
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Benchmark ponta a ponta offline do bot")
+    parser.add_argument('--sessions', default='1,4',
+                        type=lambda value: [int(n) for n in value.split(',') if n],
+                        help="Níveis de sessões concorrentes (ex: 1,4,8)")
+    parser.add_argument('--rounds', type=int, default=3, help="Rodadas do roteiro por sessão")
+    parser.add_argument('--ai-latency', type=float, default=0.5, help="Latência simulada da IA (segundos)")
+    parser.add_argument('--profile', default=bot_module.DEFAULT_PROFILE, help="Perfil de screenshot")
+    parser.add_argument('--load-profile', default=DEFAULT_LOAD_PROFILE, choices=list(LOAD_PROFILES),
+                        help="Perfil de carregamento de página")
+    parser.add_argument('--discord-limits', action='store_true',
+                        help="Mantém os limites de taxa do agendador de mensagens")
+    parser.add_argument('--output', help="Arquivo JSON de saída (padrão: stdout)")
+    parser.add_argument('--driver-path', default=os.getenv('CHROMEDRIVER_PATH'),
+                        help="Chromedriver local (padrão: CHROMEDRIVER_PATH); evita o download a cada navegador")
+    args = parser.parse_args()
+
+    # Sem driver local o undetected_chromedriver baixa o driver da internet em cada inicialização
+    if not args.driver_path or not os.path.isfile(args.driver_path):
+        parser.error("informe um chromedriver existente com --driver-path ou CHROMEDRIVER_PATH "
+                     "(o benchmark roda sem rede e não mede downloads)")
+
+    result = asyncio.run(run(args))
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+        print(f"💾 Resultado salvo em {args.output}")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Benchmark do interpretador local de comandos: taxa de acerto e tempo por comando
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from intent_parser import IntentParser
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'intent_corpus.txt')
+
+def load_corpus(path=CORPUS_PATH):
+    """Carrega um comando por linha"""
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+def main():
+    """Função principal"""
+    corpus = load_corpus(sys.argv[1] if len(sys.argv) > 1 else CORPUS_PATH)
+    parser = IntentParser()
+
+    resolved = []
+    for command in corpus:
+        action = parser.resolve(command)
+        resolved.append((command, action))
+
+    # Medir tempo médio por comando
+    rounds = 200
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for command in corpus:
+            parser.parse(command)
+    elapsed = time.perf_counter() - started
+    per_command_us = elapsed / (rounds * len(corpus)) * 1e6
+
+    hits = sum(1 for _, action in resolved if action)
+    for command, action in resolved:
+        status = '✅' if action else '🤖'
+        print(f"{status} {command} -> {action if action else 'IA'}")
+
+    print("=" * 50)
+    print(f"Comandos: {len(corpus)}")
+    print(f"Resolvidos localmente: {hits} ({hits / len(corpus):.0%})")
+    print(f"Tempo médio: {per_command_us:.1f} µs por comando")
+
+if __name__ == "__main__":
+    main()
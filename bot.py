@@ -1,11 +1,27 @@
+import time
+
+# Referência para os tempos de inicialização (antes das importações pesadas)
+STARTED_AT = time.monotonic()
+
 import discord
 from discord.ext import commands
-import google.generativeai as genai
 import os
 from dotenv import load_dotenv
 import asyncio
-from browser_controller import BrowserController
+import importlib
+import io
+from browser_controller import BrowserController, INPUT_MODES, DEFAULT_INPUT_MODE, START_URL
+from load_profiles import LOAD_PROFILES, DEFAULT_LOAD_PROFILE
+from browser_pool import BrowserPool
+from memory_watchdog import MemoryWatchdog
+from profile_store import ProfileStore, SnapshotStore, NAME_PATTERN
+from browser_workers import BrowserSupervisor, RemoteBrowserController
+from screenshot_pipeline import ScreenshotStore, FrameTracker, SCREENSHOT_PROFILES, DEFAULT_PROFILE, crop_screenshot
 from ai_handler import AIHandler
+from action_cache import ActionCache
+from live_view import LiveView
+from message_scheduler import OutboundScheduler
+from metrics import tracer, current_command
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -14,211 +30,960 @@ load_dotenv()
 intents = discord.Intents.default()
 intents.message_content = True
 
-# Criar bot
-bot = commands.Bot(command_prefix='!', intents=intents)
+# Criar bot (com shards: SHARD_COUNT total e SHARD_IDS deste processo, ou BOT_SHARDED=1 automático)
+shard_count = int(os.getenv('SHARD_COUNT', '0')) or None
+shard_ids = [int(shard) for shard in os.getenv('SHARD_IDS', '').split(',') if shard.strip()] or None
+if shard_count or os.getenv('BOT_SHARDED', '0') == '1':
+    bot = commands.AutoShardedBot(command_prefix='!', intents=intents, shard_count=shard_count, shard_ids=shard_ids)
+else:
+    bot = commands.Bot(command_prefix='!', intents=intents)
+
+# Gravação de screenshots em disco (opcional, limitada)
+screenshot_store = None
+if os.getenv('SCREENSHOT_DISK', '0') == '1':
+    screenshot_store = ScreenshotStore('screenshots', int(os.getenv('SCREENSHOT_DISK_MAX', '50')))
+
+# Opções dos navegadores de cada sessão
+controller_options = dict(
+    screenshot_store=screenshot_store,
+    screenshot_profile=os.getenv('SCREENSHOT_PROFILE', DEFAULT_PROFILE),
+    input_mode=os.getenv('INPUT_MODE', DEFAULT_INPUT_MODE),
+    start_url=os.getenv('BROWSER_START_URL', START_URL),
+    headless=os.getenv('BROWSER_HEADLESS', '0') == '1',
+    load_profile=os.getenv('LOAD_PROFILE', DEFAULT_LOAD_PROFILE),
+    blocked_domains=[domain.strip() for domain in os.getenv('BLOCKED_DOMAINS', '').split(',') if domain.strip()],
+    driver_path=os.getenv('CHROMEDRIVER_PATH') or None
+)
+
+# Processos de trabalho isolados para os navegadores (0 = no próprio processo do bot)
+browser_supervisor = None
+if int(os.getenv('BROWSER_WORKERS', '0')) > 0:
+    browser_supervisor = BrowserSupervisor(
+        workers=int(os.getenv('BROWSER_WORKERS')),
+        ping_interval=float(os.getenv('BROWSER_WORKER_PING', '5')),
+        ping_timeout=float(os.getenv('BROWSER_WORKER_TIMEOUT', '10')),
+        max_call_timeouts=int(os.getenv('BROWSER_WORKER_MAX_TIMEOUTS', '3'))
+    )
+
+def create_controller(**overrides):
+    """Cria o navegador de uma sessão, no processo do bot ou num processo de trabalho"""
+    options = dict(controller_options, **overrides)
+    if browser_supervisor:
+        return RemoteBrowserController(browser_supervisor, **options)
+    return BrowserController(**options)
+
+# Perfis persistentes do Chrome por usuário (vazio = navegadores descartáveis)
+profile_store = None
+if os.getenv('PROFILE_DIR'):
+    profile_store = ProfileStore(
+        os.getenv('PROFILE_DIR'),
+        max_total_mb=int(os.getenv('PROFILE_MAX_MB', '2048')),
+        max_profiles=int(os.getenv('PROFILE_MAX_COUNT', '50')),
+        disk_cache_mb=int(os.getenv('PROFILE_CACHE_MB', '256'))
+    )
+
+# Snapshots de sessão salvos com !save
+snapshot_store = SnapshotStore(
+    os.getenv('SNAPSHOT_DIR', 'snapshots'),
+    max_per_user=int(os.getenv('SNAPSHOT_MAX_PER_USER', '10'))
+)
+
+# Macros gravadas com !record (mesmo armazenamento dos snapshots) e gravações em andamento
+macro_store = SnapshotStore(
+    os.getenv('MACRO_DIR', 'macros'),
+    max_per_user=int(os.getenv('MACRO_MAX_PER_USER', '20'))
+)
+# Criadas no primeiro !record (módulo de macros importado só quando usado)
+macro_recorder = None
+
+def live_view_running(key):
+    """Sessão com transmissão ao vivo em andamento (não é despejada nem reciclada)"""
+    return key in live_views and live_views[key].running
+
 
 # Instâncias globais
-browser_controller = None
+browser_pool = BrowserPool(
+    max_browsers=int(os.getenv('BROWSER_POOL_MAX', '4')),
+    warm_size=int(os.getenv('BROWSER_POOL_WARM', '1')),
+    idle_ttl=int(os.getenv('BROWSER_SESSION_TTL', '900')),
+    factory=create_controller,
+    profiles=profile_store,
+    is_busy=live_view_running
+)
 ai_handler = None
 
+# Cluster de processos: registro compartilhado de sessões e repasse de comandos ao nó dono do navegador
+cluster = None
+if os.getenv('CLUSTER_PORT'):
+    import socket
+    from session_registry import SessionRegistry, SQLiteRegistryBackend, MemoryRegistryBackend
+    from cluster import ClusterNode
+    cluster_port = int(os.getenv('CLUSTER_PORT'))
+    if os.getenv('REGISTRY_BACKEND', 'sqlite') == 'memory':
+        registry_backend = MemoryRegistryBackend()
+    else:
+        registry_backend = SQLiteRegistryBackend(os.getenv('REGISTRY_DB', 'cluster.db'))
+    cluster = ClusterNode(
+        bot,
+        SessionRegistry(
+            registry_backend,
+            node_id=os.getenv('NODE_ID') or f'{socket.gethostname()}-{os.getpid()}',
+            address=os.getenv('CLUSTER_ADDRESS', f'127.0.0.1:{cluster_port}'),
+            capacity=browser_pool.max_browsers,
+            node_ttl=int(os.getenv('CLUSTER_NODE_TTL', '30'))
+        ),
+        browser_pool,
+        host=os.getenv('CLUSTER_HOST', '127.0.0.1'),
+        port=cluster_port,
+        secret=os.getenv('CLUSTER_SECRET', '')
+    )
+    browser_pool.on_session_change = cluster.session_changed
+
+# Recicla navegadores que passam do limite de memória (entre comandos, restaurando a página)
+memory_watchdog = MemoryWatchdog(
+    browser_pool,
+    rss_limit_mb=int(os.getenv('MEMORY_RSS_LIMIT_MB', '1500')),
+    heap_limit_mb=int(os.getenv('MEMORY_HEAP_LIMIT_MB', '512')),
+    interval=int(os.getenv('MEMORY_CHECK_INTERVAL', '60')),
+    is_busy=live_view_running
+)
+
+# Agendador de mensagens de saída (limites de taxa por canal, prioridade e coalescência)
+outbound = OutboundScheduler(
+    channel_rate=float(os.getenv('DISCORD_CHANNEL_RATE', '1.0')),
+    channel_burst=int(os.getenv('DISCORD_CHANNEL_BURST', '5'))
+)
+
+# Último frame enviado por sessão, para evitar uploads repetidos
+frame_tracker = FrameTracker()
+
+# Transmissões ao vivo ativas por sessão
+live_views = {}
+
+# Primeiro screenshot enviado desde a inicialização já foi medido
+first_screenshot_sent = False
+
+async def get_browser(ctx):
+    """Retorna o navegador da sessão do autor no canal atual (aguarda uma reciclagem em andamento)"""
+    return await browser_pool.checkout(BrowserPool.session_key(ctx))
+
+def describe_action(action):
+    """Resumo do tipo da ação ou dos passos do plano"""
+    if action.get('type') == 'plan':
+        steps = action.get('steps', [])
+        return f"plano com {len(steps)} passos ({', '.join(step.get('type', '?') for step in steps)})"
+    return action.get('type', 'unknown')
+
+def record_steps(ctx, *steps):
+    """Acrescenta passos executados à macro em gravação na sessão, se houver"""
+    if macro_recorder:
+        macro_recorder.record(BrowserPool.session_key(ctx), *steps)
+
+def changes_input(action):
+    """A ação (ou algum passo do plano) digita em campos da página"""
+    steps = action.get('steps', []) if action.get('type') == 'plan' else [action]
+    return any(step.get('type') in ('type', 'search') for step in steps)
+
+def notify(ctx, text):
+    """Nota de progresso: vira uma única mensagem de status editada a cada atualização"""
+    outbound.progress(ctx.channel, BrowserPool.session_key(ctx), text)
+
+async def reply(ctx, content=None, **kwargs):
+    """Resposta final: passa na frente das notas de progresso, que deixam de ser enviadas"""
+    outbound.finish(ctx.channel, BrowserPool.session_key(ctx))
+    return await outbound.send(ctx.channel, content=content, **kwargs)
+
+def screenshot_file(shot):
+    """Cria o anexo do Discord direto da memória"""
+    return discord.File(io.BytesIO(shot.data), shot.filename)
+
+async def send_screenshot(ctx, embed, shot, detect_changes=True, changed_input=False):
+    """Envia o embed com o screenshot, pulando o upload se a tela não mudou
+
+    `changed_input`: o comando alterou campos da página; a imagem é sempre enviada.
+    """
+    key = BrowserPool.session_key(ctx)
+    
+    mode, box = frame_tracker.compare(key, shot) if detect_changes else ('full', None)
+    if mode == 'unchanged' and changed_input:
+        mode = 'full'
+    
+    if mode == 'unchanged':
+        embed.set_footer(text="Sem alterações visíveis desde o último screenshot")
+        await reply(ctx, embed=embed)
+        return
+    
+    upload = shot
+    if mode == 'region':
+        # Enviar apenas a região alterada
+        browser_controller = await get_browser(ctx)
+        profile = browser_controller.screenshot_profile if browser_controller else DEFAULT_PROFILE
+        loop = asyncio.get_running_loop()
+        upload = await loop.run_in_executor(None, crop_screenshot, shot, box, profile)
+        embed.set_footer(text=f"Região alterada: {box[0]},{box[1]} → {box[2]},{box[3]}")
+    
+    frame_tracker.update(key, shot)
+    embed.set_image(url=f"attachment://{upload.filename}")
+    with tracer.span('upload'):
+        await reply(ctx, embed=embed, file=screenshot_file(upload))
+    
+    report_first_screenshot(ctx)
+
+def report_first_screenshot(ctx):
+    """Registra o tempo até o primeiro screenshot enviado (desde o início do processo e do comando)"""
+    global first_screenshot_sent
+    if first_screenshot_sent:
+        return
+    first_screenshot_sent = True
+    
+    since_start = time.monotonic() - STARTED_AT
+    since_command = time.perf_counter() - getattr(ctx, 'trace_started', time.perf_counter())
+    tracer.record('first_screenshot', since_start, command='-')
+    print(f"📸 Primeiro screenshot: {since_start:.1f}s após o início ({since_command:.1f}s desde o comando)")
+
+def format_stats(rows):
+    """Tabela de latências (ms) para o !stats"""
+    lines = [f"{'etapa':<20}{'comando':<12}{'n':>6}{'p50':>9}{'p95':>9}{'p99':>9}{'máx':>9}"]
+    for stage, command, count, p50, p95, p99, maximum in rows:
+        lines.append(f"{stage:<20}{command:<12}{count:>6}" +
+                     ''.join(f"{value * 1000:>9.0f}" for value in (p50, p95, p99, maximum)))
+    return '\n'.join(lines)
+
 @bot.event
 async def on_ready():
     global ai_handler
     print(f'{bot.user} está online!')
     
+    # on_ready se repete a cada reconexão: configurar só uma vez
+    if ai_handler is not None:
+        return
+    
+    # Processos de trabalho primeiro: o pré-aquecimento já distribui navegadores entre eles
+    if browser_supervisor:
+        await browser_supervisor.start()
+    
+    # Pré-aquecer navegadores em segundo plano antes de configurar o restante
+    await browser_pool.start()
+    if cluster:
+        await cluster.start()
+    if memory_watchdog.interval > 0:
+        memory_watchdog.start()
+    
+    # Importar o SDK do Gemini numa thread (importação lenta) sem travar o loop
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, importlib.import_module, 'google.generativeai')
+    
     # Inicializar AI Handler
-    ai_handler = AIHandler(os.getenv('GEMINI_API_KEY'))
-    print('Bot configurado e pronto para uso!')
+    ai_handler = AIHandler(
+        os.getenv('GEMINI_API_KEY'),
+        max_concurrency=int(os.getenv('AI_MAX_CONCURRENCY', '8')),
+        per_user_concurrency=int(os.getenv('AI_USER_CONCURRENCY', '1')),
+        request_timeout=float(os.getenv('AI_REQUEST_TIMEOUT', '20')),
+        model_name=os.getenv('AI_MODEL', 'gemini-pro'),
+        prompt_budget=int(os.getenv('AI_PROMPT_BUDGET', '1200')),
+        cache=ActionCache(
+            max_entries=int(os.getenv('AI_CACHE_SIZE', '512')),
+            ttl=int(os.getenv('AI_CACHE_TTL', '3600')),
+            db_path=os.getenv('AI_CACHE_DB') or None
+        )
+    )
+    
+    # Exportar métricas no formato do Prometheus (arquivo e/ou endpoint HTTP local)
+    metrics_file = os.getenv('METRICS_FILE')
+    if metrics_file:
+        asyncio.ensure_future(tracer.export_loop(metrics_file, int(os.getenv('METRICS_INTERVAL', '15'))))
+    metrics_port = os.getenv('METRICS_PORT')
+    if metrics_port:
+        try:
+            await tracer.serve(os.getenv('METRICS_HOST', '127.0.0.1'), int(metrics_port))
+        except OSError as e:
+            print(f"Erro ao iniciar endpoint de métricas: {e}")
+    
+    ready = time.monotonic() - STARTED_AT
+    tracer.record('startup_ready', ready, command='-')
+    print(f'Bot configurado e pronto para uso! ({ready:.1f}s desde o início)')
+
+@bot.event
+async def on_message(message):
+    """Repassa o comando ao nó dono da sessão quando o bot roda em cluster"""
+    if message.author.bot:
+        return
+    
+    if not cluster:
+        await bot.process_commands(message)
+        return
+    
+    # Interpretar uma única vez: o mesmo contexto decide o nó e executa o comando
+    ctx = await bot.get_context(message)
+    if await cluster.route(ctx):
+        return
+    
+    await bot.invoke(ctx)
+
+@bot.before_invoke
+async def start_command_trace(ctx):
+    """Rotula os spans com o comando e mede o atraso entre o envio da mensagem e a execução"""
+    current_command.set(ctx.command.name)
+    ctx.trace_started = time.perf_counter()
+    # Sessão não é reciclada pelo monitor de memória durante o comando
+    browser_pool.enter(BrowserPool.session_key(ctx))
+    received = (discord.utils.utcnow() - ctx.message.created_at).total_seconds()
+    tracer.record('discord_receive', max(0.0, received))
+
+@bot.after_invoke
+async def finish_command_trace(ctx):
+    """Registra a duração total do comando"""
+    tracer.record('command_total', time.perf_counter() - ctx.trace_started)
+    browser_pool.leave(BrowserPool.session_key(ctx))
 
 @bot.command(name='web')
 async def start_browser(ctx):
     """Inicia o navegador e mostra a tela atual"""
-    global browser_controller
-    
     try:
-        await ctx.send("🌐 Iniciando navegador...")
+        notify(ctx, "🌐 Iniciando navegador...")
         
-        # Inicializar controlador do navegador
-        browser_controller = BrowserController()
-        await browser_controller.start()
+        # Obter navegador da sessão (aquecido ou novo)
+        browser_controller = await browser_pool.acquire(BrowserPool.session_key(ctx))
         
         # Capturar screenshot inicial
-        screenshot_path = await browser_controller.take_screenshot()
+        screenshot = await browser_controller.take_screenshot()
         
         # Enviar screenshot
-        with open(screenshot_path, 'rb') as f:
-            file = discord.File(f, 'browser.png')
-            embed = discord.Embed(
-                title="🌐 Navegador Iniciado",
-                description="Use comandos como: `!go <url>`, `!click <x> <y>`, `!type <texto>`, `!ai <comando>`",
-                color=0x00ff00
-            )
-            embed.set_image(url="attachment://browser.png")
-            await ctx.send(embed=embed, file=file)
+        embed = discord.Embed(
+            title="🌐 Navegador Iniciado",
+            description="Use comandos como: `!go <url>`, `!click <x> <y>`, `!type <texto>`, `!ai <comando>`",
+            color=0x00ff00
+        )
+        await send_screenshot(ctx, embed, screenshot, detect_changes=False)
             
     except Exception as e:
-        await ctx.send(f"❌ Erro ao iniciar navegador: {str(e)}")
+        await reply(ctx, f"❌ Erro ao iniciar navegador: {str(e)}")
 
 @bot.command(name='go')
 async def navigate_to(ctx, url: str):
     """Navega para uma URL específica"""
-    global browser_controller
+    browser_controller = await get_browser(ctx)
     
     if not browser_controller:
-        await ctx.send("❌ Navegador não iniciado. Use `!web` primeiro.")
+        await reply(ctx, "❌ Navegador não iniciado. Use `!web` primeiro.")
         return
     
     try:
-        await ctx.send(f"🔄 Navegando para: {url}")
+        notify(ctx, f"🔄 Navegando para: {url}")
         
         await browser_controller.navigate_to(url)
-        await asyncio.sleep(3)  # Aguardar carregamento
-        
-        screenshot_path = await browser_controller.take_screenshot()
-        
-        with open(screenshot_path, 'rb') as f:
-            file = discord.File(f, 'browser.png')
-            embed = discord.Embed(
-                title=f"📍 Navegando: {url}",
-                color=0x0099ff
-            )
-            embed.set_image(url="attachment://browser.png")
-            await ctx.send(embed=embed, file=file)
+        record_steps(ctx, {'type': 'navigate', 'url': url})
+        
+        screenshot = await browser_controller.take_screenshot()
+        
+        embed = discord.Embed(
+            title=f"📍 Navegando: {url}",
+            color=0x0099ff
+        )
+        await send_screenshot(ctx, embed, screenshot)
             
     except Exception as e:
-        await ctx.send(f"❌ Erro ao navegar: {str(e)}")
+        await reply(ctx, f"❌ Erro ao navegar: {str(e)}")
 
 @bot.command(name='click')
 async def click_element(ctx, x: int, y: int):
     """Clica em coordenadas específicas"""
-    global browser_controller
+    browser_controller = await get_browser(ctx)
     
     if not browser_controller:
-        await ctx.send("❌ Navegador não iniciado. Use `!web` primeiro.")
+        await reply(ctx, "❌ Navegador não iniciado. Use `!web` primeiro.")
         return
     
     try:
         await browser_controller.click_at(x, y)
-        await asyncio.sleep(2)
-        
-        screenshot_path = await browser_controller.take_screenshot()
-        
-        with open(screenshot_path, 'rb') as f:
-            file = discord.File(f, 'browser.png')
-            embed = discord.Embed(
-                title=f"👆 Clicado em ({x}, {y})",
-                color=0xff9900
-            )
-            embed.set_image(url="attachment://browser.png")
-            await ctx.send(embed=embed, file=file)
+        record_steps(ctx, {'type': 'click', 'x': x, 'y': y})
+        
+        screenshot = await browser_controller.take_screenshot()
+        
+        embed = discord.Embed(
+            title=f"👆 Clicado em ({x}, {y})",
+            color=0xff9900
+        )
+        await send_screenshot(ctx, embed, screenshot)
             
     except Exception as e:
-        await ctx.send(f"❌ Erro ao clicar: {str(e)}")
+        await reply(ctx, f"❌ Erro ao clicar: {str(e)}")
 
 @bot.command(name='type')
 async def type_text(ctx, *, text: str):
-    """Digite texto no elemento focado"""
-    global browser_controller
+    """Digite texto no elemento focado (`!type --native texto` escolhe a estratégia)"""
+    browser_controller = await get_browser(ctx)
     
     if not browser_controller:
-        await ctx.send("❌ Navegador não iniciado. Use `!web` primeiro.")
+        await reply(ctx, "❌ Navegador não iniciado. Use `!web` primeiro.")
         return
     
     try:
-        await browser_controller.type_text(text)
-        await asyncio.sleep(1)
-        
-        screenshot_path = await browser_controller.take_screenshot()
-        
-        with open(screenshot_path, 'rb') as f:
-            file = discord.File(f, 'browser.png')
-            embed = discord.Embed(
-                title=f"⌨️ Digitado: {text}",
-                color=0x9900ff
-            )
-            embed.set_image(url="attachment://browser.png")
-            await ctx.send(embed=embed, file=file)
+        # Estratégia opcional para este comando: --human, --chunk ou --native
+        mode = None
+        first, _, rest = text.partition(' ')
+        if first.startswith('--') and first[2:] in INPUT_MODES and rest:
+            mode, text = first[2:], rest
+        
+        await browser_controller.type_text(text, mode)
+        step = {'type': 'type', 'text': text}
+        if mode:
+            step['input_mode'] = mode
+        record_steps(ctx, step)
+        
+        screenshot = await browser_controller.take_screenshot()
+        
+        embed = discord.Embed(
+            title=f"⌨️ Digitado: {text}",
+            color=0x9900ff
+        )
+        await send_screenshot(ctx, embed, screenshot, changed_input=True)
             
     except Exception as e:
-        await ctx.send(f"❌ Erro ao digitar: {str(e)}")
+        await reply(ctx, f"❌ Erro ao digitar: {str(e)}")
 
 @bot.command(name='ai')
 async def ai_command(ctx, *, command: str):
     """Usa IA para interpretar comando e executar ação no navegador"""
-    global browser_controller, ai_handler
+    browser_controller = await get_browser(ctx)
     
     if not browser_controller:
-        await ctx.send("❌ Navegador não iniciado. Use `!web` primeiro.")
+        await reply(ctx, "❌ Navegador não iniciado. Use `!web` primeiro.")
         return
     
     if not ai_handler:
-        await ctx.send("❌ IA não configurada.")
+        await reply(ctx, "❌ IA não configurada.")
         return
     
     try:
-        await ctx.send(f"🤖 Processando comando: {command}")
+        notify(ctx, f"🤖 Processando comando: {command}")
+        
+        async def ask_ai():
+            """Interpreta o comando com a IA a partir do estado atual da página"""
+            screenshot = await browser_controller.take_screenshot()
+            await browser_controller.refresh_element_index()
+            page = await browser_controller.extract_page_content()
+            return await ai_handler.process_command(command, page, screenshot, user_id=ctx.author.id)
+        
+        # Resolver localmente (comandos comuns ou já interpretados neste site)
+        current_url = await browser_controller.get_current_url()
+        action, source = await ai_handler.quick_action(command, current_url)
+        
+        if action is None:
+            action = await ask_ai()
+        
+        async def replan(completed, failed_step):
+            """Consulta a IA novamente com a página atual quando um passo do plano falha"""
+            await browser_controller.refresh_element_index()
+            page = await browser_controller.extract_page_content()
+            return await ai_handler.replan(command, page, completed, failed_step, user_id=ctx.author.id)
         
-        # Capturar estado atual da página
-        screenshot_path = await browser_controller.take_screenshot()
-        page_source = await browser_controller.get_page_source()
+        async def execute(action):
+            """Executa ação ou plano (passos em sequência, um único screenshot no final)"""
+            # Com uma macro em gravação, o controlador guarda os passos já resolvidos
+            browser_controller.recording = bool(macro_recorder and
+                                                macro_recorder.is_recording(BrowserPool.session_key(ctx)))
+            try:
+                return await browser_controller.execute_ai_action(action, replan=replan)
+            finally:
+                if browser_controller.recording:
+                    browser_controller.recording = False
+                    record_steps(ctx, *await browser_controller.pop_recorded_steps())
         
-        # Processar comando com IA
-        action = await ai_handler.process_command(command, page_source, screenshot_path)
+        result = await execute(action)
         
-        # Executar ação
-        result = await browser_controller.execute_ai_action(action)
+        if not browser_controller.last_action_ok and source == 'cache':
+            # Ação em cache não serve mais para esta página: descartar e consultar a IA
+            ai_handler.forget(command, current_url)
+            notify(ctx, f"🤖 Ação em cache falhou; consultando a IA: {command}")
+            action = await ask_ai()
+            result = await execute(action)
+        
+        if browser_controller.last_action_ok:
+            ai_handler.remember(command, current_url, action)
         
         # Capturar resultado
-        new_screenshot_path = await browser_controller.take_screenshot()
-        
-        with open(new_screenshot_path, 'rb') as f:
-            file = discord.File(f, 'browser.png')
-            embed = discord.Embed(
-                title=f"🤖 IA Executou: {command}",
-                description=f"Ação: {action.get('type', 'unknown')}\nResultado: {result}",
-                color=0x00ffff
-            )
-            embed.set_image(url="attachment://browser.png")
-            await ctx.send(embed=embed, file=file)
+        new_screenshot = await browser_controller.take_screenshot()
+        
+        embed = discord.Embed(
+            title=f"🤖 IA Executou: {command}",
+            description=f"Ação: {describe_action(action)}\nResultado: {result}",
+            color=0x00ffff
+        )
+        await send_screenshot(ctx, embed, new_screenshot, changed_input=changes_input(action))
             
     except Exception as e:
-        await ctx.send(f"❌ Erro na IA: {str(e)}")
+        await reply(ctx, f"❌ Erro na IA: {str(e)}")
 
 @bot.command(name='screenshot')
-async def take_screenshot(ctx):
-    """Captura screenshot atual do navegador"""
-    global browser_controller
+async def take_screenshot(ctx, quality: str = None):
+    """Captura screenshot atual do navegador (`!screenshot full` para PNG em resolução total)"""
+    browser_controller = await get_browser(ctx)
     
     if not browser_controller:
-        await ctx.send("❌ Navegador não iniciado. Use `!web` primeiro.")
+        await reply(ctx, "❌ Navegador não iniciado. Use `!web` primeiro.")
         return
     
+    full = quality == 'full'
+    
     try:
-        screenshot_path = await browser_controller.take_screenshot()
-        
-        with open(screenshot_path, 'rb') as f:
-            file = discord.File(f, 'browser.png')
-            embed = discord.Embed(
-                title="📸 Screenshot Atual",
-                color=0x00ff00
-            )
-            embed.set_image(url="attachment://browser.png")
-            await ctx.send(embed=embed, file=file)
+        screenshot = await browser_controller.take_screenshot('full' if full else None)
+        
+        embed = discord.Embed(
+            title="📸 Screenshot Atual",
+            color=0x00ff00
+        )
+        await send_screenshot(ctx, embed, screenshot, detect_changes=not full)
             
     except Exception as e:
-        await ctx.send(f"❌ Erro ao capturar screenshot: {str(e)}")
+        await reply(ctx, f"❌ Erro ao capturar screenshot: {str(e)}")
+
+@bot.command(name='quality')
+async def set_quality(ctx, profile: str):
+    """Define o perfil de codificação dos screenshots da sessão"""
+    browser_controller = await get_browser(ctx)
+    
+    if not browser_controller:
+        await reply(ctx, "❌ Navegador não iniciado. Use `!web` primeiro.")
+        return
+    
+    if profile not in SCREENSHOT_PROFILES:
+        await reply(ctx, f"❌ Perfil inválido. Opções: {', '.join(SCREENSHOT_PROFILES)}")
+        return
+    
+    browser_controller.screenshot_profile = profile
+    frame_tracker.forget(BrowserPool.session_key(ctx))
+    await reply(ctx, f"🖼️ Perfil de screenshot: {profile}")
+
+@bot.command(name='input')
+async def set_input_mode(ctx, mode: str):
+    """Define a estratégia de digitação da sessão"""
+    browser_controller = await get_browser(ctx)
+    
+    if not browser_controller:
+        await reply(ctx, "❌ Navegador não iniciado. Use `!web` primeiro.")
+        return
+    
+    if mode not in INPUT_MODES:
+        await reply(ctx, f"❌ Modo inválido. Opções: {', '.join(INPUT_MODES)}")
+        return
+    
+    browser_controller.input_mode = mode
+    await reply(ctx, f"⌨️ Modo de digitação: {mode}")
+
+@bot.command(name='mode')
+async def set_load_mode(ctx, profile: str = None):
+    """Define o perfil de carregamento da sessão (`!mode lean` bloqueia imagens, mídia e rastreadores)"""
+    browser_controller = await get_browser(ctx)
+    
+    if not browser_controller:
+        await reply(ctx, "❌ Navegador não iniciado. Use `!web` primeiro.")
+        return
+    
+    if profile is None:
+        await reply(ctx, f"⚙️ Perfil de carregamento atual: {browser_controller.load_profile}")
+        return
+    
+    if profile not in LOAD_PROFILES:
+        await reply(ctx, f"❌ Perfil inválido. Opções: {', '.join(LOAD_PROFILES)}")
+        return
+    
+    try:
+        await browser_controller.set_load_profile(profile)
+        # Tamanho da janela pode ter mudado: o próximo screenshot é enviado inteiro
+        frame_tracker.forget(BrowserPool.session_key(ctx))
+        width, height = LOAD_PROFILES[profile]['viewport']
+        await reply(ctx, f"⚙️ Perfil de carregamento: {profile} ({width}x{height})")
+    except Exception as e:
+        await reply(ctx, f"❌ Erro ao trocar perfil: {str(e)}")
+
+@bot.command(name='live')
+async def live_view(ctx, action: str = 'start'):
+    """Transmite a tela ao vivo editando uma única mensagem (`!live stop` encerra)"""
+    key = BrowserPool.session_key(ctx)
+    current = live_views.get(key)
+    
+    if action == 'stop':
+        if current and current.running:
+            live_views.pop(key, None)
+            await current.stop()
+        else:
+            await reply(ctx, "❌ Nenhuma transmissão ativa.")
+        return
+    
+    browser_controller = await get_browser(ctx)
+    
+    if not browser_controller:
+        await reply(ctx, "❌ Navegador não iniciado. Use `!web` primeiro.")
+        return
+    
+    if current and current.running:
+        await reply(ctx, "🔴 Transmissão já ativa. Use `!live stop` para encerrar.")
+        return
+    
+    try:
+        view = LiveView(
+            browser_controller,
+            min_interval=float(os.getenv('LIVE_MIN_INTERVAL', '1.0')),
+            max_duration=int(os.getenv('LIVE_MAX_DURATION', '300')),
+            outbound=outbound
+        )
+        await view.start(ctx.channel)
+        live_views[key] = view
+    except Exception as e:
+        await reply(ctx, f"❌ Erro ao iniciar transmissão: {str(e)}")
 
 @bot.command(name='close')
 async def close_browser(ctx):
     """Fecha o navegador"""
-    global browser_controller
+    key = BrowserPool.session_key(ctx)
+    frame_tracker.forget(key)
     
-    if browser_controller:
-        await browser_controller.close()
-        browser_controller = None
-        await ctx.send("🔴 Navegador fechado.")
+    view = live_views.pop(key, None)
+    if view:
+        await view.stop()
+    
+    if await browser_pool.release(key):
+        await reply(ctx, "🔴 Navegador fechado.")
     else:
-        await ctx.send("❌ Nenhum navegador ativo.")
+        await reply(ctx, "❌ Nenhum navegador ativo.")
+
+async def resolve_scrape_selector(ctx, browser_controller, target):
+    """Seletor CSS dos itens: o informado, o sugerido pela IA a partir da descrição ou o detectado na página"""
+    if target:
+        probe = await browser_controller.scrape_items(target, 0, 0)
+        if probe['valid'] and probe['total']:
+            return target
+        
+        # Não é um seletor com resultados: tratar como descrição dos itens
+        if ai_handler:
+            page = await browser_controller.extract_page_content()
+            selector = await ai_handler.suggest_selector(target, page, user_id=ctx.author.id)
+            if selector:
+                probe = await browser_controller.scrape_items(selector, 0, 0)
+                if probe['valid'] and probe['total']:
+                    return selector
+    
+    return await browser_controller.guess_item_selector()
+
+@bot.command(name='scrape')
+async def scrape_items(ctx, *, target: str = None):
+    """Extrai itens (seletor CSS ou descrição) seguindo a paginação e envia arquivos JSONL compactados"""
+    from scraper import Scraper, ChunkedJsonlWriter, scrape_to_chunks
+    
+    browser_controller = await get_browser(ctx)
+    
+    if not browser_controller:
+        await reply(ctx, "❌ Navegador não iniciado. Use `!web` primeiro.")
+        return
+    
+    try:
+        notify(ctx, "🕷️ Procurando os itens na página...")
+        selector = await resolve_scrape_selector(ctx, browser_controller, target)
+        if not selector:
+            await reply(ctx, "❌ Não encontrei itens para extrair. Informe um seletor CSS, ex: `!scrape .produto`")
+            return
+        
+        scraper = Scraper(
+            browser_controller,
+            selector,
+            max_pages=int(os.getenv('SCRAPE_MAX_PAGES', '50')),
+            max_items=int(os.getenv('SCRAPE_MAX_ITEMS', '5000'))
+        )
+        writer = ChunkedJsonlWriter(
+            prefix=f"scrape-{ctx.author.id}-{int(time.time())}",
+            max_bytes=int(float(os.getenv('SCRAPE_CHUNK_MB', '8')) * 2 ** 20)
+        )
+        
+        async def with_progress(records):
+            """Repassa os itens atualizando a nota de progresso a cada centena"""
+            async for record in records:
+                yield record
+                if scraper.items % 100 == 0:
+                    notify(ctx, f"🕷️ `{selector}`: {scraper.items} itens, {scraper.pages_visited} páginas...")
+        
+        async def upload(path, count):
+            """Envia uma parte pronta e apaga o arquivo temporário"""
+            try:
+                filename = os.path.basename(path)
+                await reply(ctx, f"📦 {filename}: {count} itens", file=discord.File(path, filename=filename))
+            finally:
+                os.remove(path)
+        
+        await scrape_to_chunks(with_progress(scraper.records()), writer, upload)
+        
+        stats = scraper.stats()
+        await reply(ctx,
+            f"✅ Extração de `{selector}` concluída: {stats['items']} itens de {stats['pages']} páginas "
+            f"em {writer.chunks} arquivo(s), {stats['duplicates']} repetidos ignorados ({stats['stop_reason']})")
+    except Exception as e:
+        await reply(ctx, f"❌ Erro na extração: {str(e)}")
+
+@bot.command(name='save')
+async def save_session(ctx, name: str = 'padrao'):
+    """Salva abas, URL, cookies e localStorage da sessão num snapshot nomeado"""
+    browser_controller = await get_browser(ctx)
+    
+    if not browser_controller:
+        await reply(ctx, "❌ Navegador não iniciado. Use `!web` primeiro.")
+        return
+    
+    if not NAME_PATTERN.fullmatch(name):
+        await reply(ctx, "❌ Nome inválido. Use até 32 letras, números, `_` ou `-`.")
+        return
+    
+    try:
+        state = await browser_controller.snapshot_state()
+        size = await snapshot_store.save(ctx.author.id, name, state)
+        await reply(ctx, f"💾 Snapshot `{name}` salvo ({len(state.get('tabs', [])) + 1} abas, "
+                         f"{len(state.get('cookies', []))} cookies, {size / 1024:.1f} KB)")
+    except Exception as e:
+        await reply(ctx, f"❌ Erro ao salvar sessão: {str(e)}")
+
+@bot.command(name='restore')
+async def restore_session(ctx, name: str = 'padrao'):
+    """Restaura um snapshot salvo com !save (inicia o navegador se necessário)"""
+    if not NAME_PATTERN.fullmatch(name):
+        await reply(ctx, "❌ Nome inválido. Use até 32 letras, números, `_` ou `-`.")
+        return
+    
+    state = await snapshot_store.load(ctx.author.id, name)
+    if state is None:
+        saved = snapshot_store.list(ctx.author.id)
+        available = f" Disponíveis: {', '.join(saved)}" if saved else ''
+        await reply(ctx, f"❌ Snapshot `{name}` não encontrado.{available}")
+        return
+    
+    try:
+        notify(ctx, f"♻️ Restaurando `{name}`...")
+        key = BrowserPool.session_key(ctx)
+        browser_controller = await browser_pool.acquire(key)
+        
+        started = time.perf_counter()
+        await browser_controller.restore_state(state)
+        elapsed = time.perf_counter() - started
+        
+        screenshot = await browser_controller.take_screenshot()
+        embed = discord.Embed(
+            title=f"♻️ Sessão restaurada: {name}",
+            description=f"URL: {state.get('url')}\nRestaurada em {elapsed * 1000:.0f} ms",
+            color=0x00ff00
+        )
+        await send_screenshot(ctx, embed, screenshot, detect_changes=False)
+    except Exception as e:
+        await reply(ctx, f"❌ Erro ao restaurar sessão: {str(e)}")
+
+@bot.command(name='record')
+async def record_macro(ctx, name: str = 'padrao'):
+    """Começa a gravar os comandos da sessão numa macro (!stop salva)"""
+    global macro_recorder
+    browser_controller = await get_browser(ctx)
+    
+    if not browser_controller:
+        await reply(ctx, "❌ Navegador não iniciado. Use `!web` primeiro.")
+        return
+    
+    if not NAME_PATTERN.fullmatch(name):
+        await reply(ctx, "❌ Nome inválido. Use até 32 letras, números, `_` ou `-`.")
+        return
+    
+    if macro_recorder is None:
+        from macros import MacroRecorder
+        macro_recorder = MacroRecorder()
+    
+    macro_recorder.start(BrowserPool.session_key(ctx), name)
+    await reply(ctx, f"⏺️ Gravando a macro `{name}`. Use `!go`, `!click`, `!type` e `!ai` normalmente; "
+                     f"`!stop` salva a gravação.")
+
+@bot.command(name='stop')
+async def stop_recording(ctx):
+    """Encerra a gravação e salva a macro"""
+    macro = macro_recorder.stop(BrowserPool.session_key(ctx)) if macro_recorder else None
+    if macro is None:
+        await reply(ctx, "❌ Nenhuma gravação em andamento. Use `!record [nome]`.")
+        return
+    
+    if not macro['steps']:
+        await reply(ctx, f"⚠️ Macro `{macro['name']}` vazia descartada.")
+        return
+    
+    from macros import MAX_MACRO_STEPS
+    try:
+        await macro_store.save(ctx.author.id, macro['name'], macro)
+        limit = f" (limite de {MAX_MACRO_STEPS} passos atingido)" if macro['truncated'] else ''
+        await reply(ctx, f"⏹️ Macro `{macro['name']}` salva com {len(macro['steps'])} passos "
+                         f"({', '.join(step['type'] for step in macro['steps'])}){limit}. "
+                         f"Use `!play {macro['name']}`.")
+    except Exception as e:
+        await reply(ctx, f"❌ Erro ao salvar macro: {str(e)}")
+
+@bot.command(name='play')
+async def play_recorded_macro(ctx, name: str = 'padrao', sessions: int = 1):
+    """Reproduz uma macro sem consultar a IA; com `sessões` > 1 roda também em sessões extras em paralelo"""
+    from macros import play_macro
+    
+    if not NAME_PATTERN.fullmatch(name):
+        await reply(ctx, "❌ Nome inválido. Use até 32 letras, números, `_` ou `-`.")
+        return
+    
+    macro = await macro_store.load(ctx.author.id, name)
+    if macro is None:
+        saved = macro_store.list(ctx.author.id)
+        available = f" Disponíveis: {', '.join(saved)}" if saved else ''
+        await reply(ctx, f"❌ Macro `{name}` não encontrada.{available}")
+        return
+    
+    steps = macro['steps']
+    key = BrowserPool.session_key(ctx)
+    
+    try:
+        notify(ctx, f"▶️ Reproduzindo `{name}` ({len(steps)} passos)...")
+        browser_controller = await browser_pool.acquire(key)
+        
+        # Sessões extras do mesmo usuário, limitadas ao espaço livre do pool (sem despejar outras sessões)
+        extra = min(sessions, int(os.getenv('MACRO_MAX_SESSIONS', '4'))) - 1
+        extra_keys = [(key[0], key[1], f'{key[2]}-play{i}') for i in range(1, min(extra, browser_pool.free_slots()) + 1)]
+        start_url = await browser_controller.get_current_url() if extra_keys else None
+        
+        async def play_extra(extra_key):
+            controller = await browser_pool.acquire(extra_key)
+            browser_pool.enter(extra_key)
+            try:
+                return await play_macro(controller, steps, start_url)
+            finally:
+                browser_pool.leave(extra_key)
+        
+        try:
+            runs = await asyncio.gather(play_macro(browser_controller, steps),
+                                        *(play_extra(extra_key) for extra_key in extra_keys),
+                                        return_exceptions=True)
+        finally:
+            await asyncio.gather(*(browser_pool.release(extra_key) for extra_key in extra_keys),
+                                 return_exceptions=True)
+        
+        if isinstance(runs[0], Exception):
+            raise runs[0]
+        
+        # Reproduzida dentro de outra gravação: os passos entram na macro em gravação
+        record_steps(ctx, *steps)
+        
+        ok, result, screenshot, elapsed = runs[0]
+        # Em caso de falha, a última linha do resultado é o passo que parou a macro
+        failed = result.rsplit('\n', 1)[-1]
+        summary = f"✅ {len(steps)} passos em {elapsed:.1f}s" if ok else f"⚠️ Parou em: {failed}"
+        embed = discord.Embed(
+            title=f"▶️ Macro: {name}",
+            description=summary,
+            color=0x00ff00 if ok else 0xff9900
+        )
+        
+        if not extra_keys:
+            await send_screenshot(ctx, embed, screenshot, changed_input=changes_input({'type': 'plan', 'steps': steps}))
+            return
+        
+        # Várias sessões: um screenshot final de cada, numa única mensagem
+        files = [screenshot_file(screenshot)]
+        for index, run in enumerate(runs[1:], 2):
+            if isinstance(run, Exception):
+                embed.add_field(name=f"Sessão {index}", value=f"❌ {str(run)[:200]}", inline=False)
+                continue
+            run_ok, run_result, run_screenshot, run_elapsed = run
+            embed.add_field(name=f"Sessão {index}", value=f"{'✅' if run_ok else '⚠️'} {run_elapsed:.1f}s", inline=True)
+            files.append(discord.File(io.BytesIO(run_screenshot.data), f"sessao{index}.{run_screenshot.extension}"))
+        
+        frame_tracker.update(key, screenshot)
+        embed.set_image(url=f"attachment://{screenshot.filename}")
+        with tracer.span('upload'):
+            await reply(ctx, embed=embed, files=files)
+    except Exception as e:
+        await reply(ctx, f"❌ Erro ao reproduzir macro: {str(e)}")
+
+@bot.command(name='cache')
+async def cache_stats(ctx):
+    """Mostra os contadores do cache de comandos de IA"""
+    if not ai_handler:
+        await reply(ctx, "❌ IA não configurada.")
+        return
+    
+    stats = ai_handler.cache.stats()
+    parser_stats = ai_handler.intent_parser.stats()
+    prompt_stats = ai_handler.prompt_builder.stats()
+    await reply(ctx,
+        f"🗃️ Cache de IA: {stats['hits']} acertos ({stats['persistent_hits']} do disco), "
+        f"{stats['misses']} falhas, taxa {stats['hit_rate']:.0%}, {stats['entries']} entradas\n"
+        f"⚡ Interpretador local: {parser_stats['hits']} resolvidos sem IA ({parser_stats['hit_rate']:.0%})\n"
+        f"🧮 Prompts: {prompt_stats['calls']} enviados, ~{prompt_stats['average_tokens']:.0f} tokens em média "
+        f"(orçamento {ai_handler.prompt_builder.budget})"
+    )
+
+@bot.command(name='workers')
+async def worker_stats(ctx):
+    """Mostra a carga de cada processo de trabalho dos navegadores"""
+    if not browser_supervisor:
+        await reply(ctx, "ℹ️ Navegadores rodando no processo do bot (BROWSER_WORKERS=0).")
+        return
+    
+    lines = []
+    for worker in browser_supervisor.stats():
+        status = '🟢' if worker['alive'] else '🔴'
+        ping = f"{worker['ping'] * 1000:.0f} ms" if worker['ping'] is not None else '-'
+        rss = f"{worker['rss'] / 2 ** 20:.0f} MB" if worker['rss'] else '-'
+        lines.append(f"{status} #{worker['index']} (pid {worker['pid']}): {worker['sessions']} sessões, "
+                     f"{worker['pending']} pendentes, ping {ping}, memória {rss}, {worker['restarts']} reinícios, "
+                     f"{worker['call_timeouts']} chamadas sem resposta")
+    await reply(ctx, "⚙️ Processos de trabalho\n" + '\n'.join(lines))
+
+@bot.command(name='memory')
+async def memory_stats(ctx):
+    """Mostra a memória de cada sessão e as reciclagens feitas pelo monitor"""
+    stats = memory_watchdog.stats()
+    if not stats['sessions']:
+        await reply(ctx, "🧠 Nenhuma sessão ativa.")
+        return
+    
+    lines = []
+    for session in stats['sessions']:
+        rss = f"{session['rss'] / 2 ** 20:.0f} MB" if session['rss'] else '-'
+        heap = f"{session['js_heap'] / 2 ** 20:.0f} MB" if session['js_heap'] else '-'
+        pending = " (reciclagem pendente)" if session['pending'] else ''
+        lines.append(f"- canal {session['key'][1]}, usuário {session['key'][2]}: RSS {rss}, heap JS {heap}, "
+                     f"{session['recycles']} reciclagens{pending}")
+    
+    rss_limit = f"{memory_watchdog.rss_limit // 2 ** 20} MB" if memory_watchdog.rss_limit else '-'
+    heap_limit = f"{memory_watchdog.heap_limit // 2 ** 20} MB" if memory_watchdog.heap_limit else '-'
+    await reply(ctx, f"🧠 Memória por sessão (limites: RSS {rss_limit}, heap JS {heap_limit}; "
+                     f"{stats['recycles']} reciclagens)\n" + '\n'.join(lines))
+
+@bot.command(name='nodes')
+async def node_stats(ctx):
+    """Mostra os nós do cluster com carga e sessões"""
+    if not cluster:
+        await reply(ctx, "ℹ️ Bot rodando em um único processo (CLUSTER_PORT não configurado).")
+        return
+    
+    stats = await cluster.stats()
+    lines = []
+    for node in stats['nodes']:
+        marker = ' (este)' if node['local'] else ''
+        lines.append(f"- {node['node_id']}{marker}: {node['load']}/{node['capacity']} navegadores, "
+                     f"{node['sessions']} sessões")
+    await reply(ctx,
+        f"🕸️ Nós do cluster ({stats['forwarded']} comandos repassados, {stats['received']} recebidos, "
+        f"{stats['forward_failures']} falhas)\n" + '\n'.join(lines))
+
+@bot.command(name='stats')
+async def latency_stats(ctx, command: str = None):
+    """Mostra p50/p95/p99 de latência por etapa (`!stats ai` filtra por comando)"""
+    rows = tracer.summary(command)
+    if not rows:
+        await reply(ctx, "📊 Nenhuma medição ainda.")
+        return
+    
+    # Respeitar o limite de 2000 caracteres por mensagem
+    table = format_stats(rows)
+    if len(table) > 1900:
+        table = table[:1900].rsplit('\n', 1)[0] + '\n...'
+    await reply(ctx, f"📊 Latências em ms\n```\n{table}\n```")
 
 @bot.command(name='help_web')
 async def help_command(ctx):
@@ -233,22 +998,41 @@ async def help_command(ctx):
         ("!web", "Inicia o navegador"),
         ("!go <url>", "Navega para uma URL"),
         ("!click <x> <y>", "Clica em coordenadas"),
-        ("!type <texto>", "Digite texto"),
+        ("!type [--modo] <texto>", "Digite texto"),
+        ("!input <modo>", "Digitação: human (tecla a tecla), chunk (blocos) ou native (valor direto)"),
         ("!ai <comando>", "Comando de IA (ex: 'vá para o YouTube')"),
-        ("!screenshot", "Captura screenshot"),
+        ("!screenshot [full]", "Captura screenshot (full = PNG em resolução total)"),
+        ("!quality <perfil>", "Perfil de imagem: full, balanced, fast, preview"),
+        ("!mode [lean|full]", "Carregamento leve (bloqueio de imagens, mídia e rastreadores por extensão e domínio, não garantido) ou completo"),
+        ("!live [stop]", "Transmissão ao vivo da tela"),
         ("!close", "Fecha o navegador"),
+        ("!scrape [seletor|descrição]", "Extrai itens seguindo a paginação (arquivos JSONL compactados)"),
+        ("!save [nome]", "Salva abas, URL, cookies e localStorage da sessão"),
+        ("!restore [nome]", "Restaura uma sessão salva"),
+        ("!record [nome]", "Grava os comandos seguintes (!go, !click, !type, !ai) numa macro"),
+        ("!stop", "Encerra a gravação e salva a macro"),
+        ("!play [nome] [sessões]", "Reproduz a macro sem IA (em várias sessões em paralelo)"),
+        ("!cache", "Estatísticas do cache de IA"),
+        ("!stats [comando]", "Latência por etapa (p50/p95/p99)"),
+        ("!workers", "Carga dos processos de trabalho dos navegadores"),
+        ("!memory", "Memória de cada sessão e reciclagens automáticas"),
+        ("!nodes", "Nós do cluster com carga e sessões"),
         ("!help_web", "Mostra esta ajuda")
     ]
     
     for cmd, desc in commands_list:
         embed.add_field(name=cmd, value=desc, inline=False)
     
-    await ctx.send(embed=embed)
+    await reply(ctx, embed=embed)
 
-# Executar bot
-if __name__ == "__main__":
+def main():
+    """Executa o bot"""
     token = os.getenv('DISCORD_TOKEN')
     if not token:
         print("❌ Token do Discord não encontrado no arquivo .env")
     else:
-        bot.run(token)
\ No newline at end of file
+        bot.run(token)
+
+# Executar bot
+if __name__ == "__main__":
+    main()
\ No newline at end of file
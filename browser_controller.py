@@ -1,214 +1,758 @@
-import undetected_chromedriver as uc
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from PIL import Image
+# Selenium e undetected_chromedriver são importados sob demanda (na thread do navegador)
+# para não atrasar a inicialização do bot
+from driver_worker import DriverWorker
+from screenshot_pipeline import process_screenshot, DEFAULT_PROFILE
+from wait_engine import WaitEngine
+from page_extractor import extract_from_driver
+from element_index import ElementIndex, INDEX_SCRIPT, INTERACTIVE_SELECTOR
+from metrics import tracer
+from load_profiles import LOAD_PROFILES, DEFAULT_LOAD_PROFILE, blocked_url_patterns
+from memory_watchdog import process_tree_rss, kill_process_tree
 import asyncio
-import os
+import json
 import time
 import random
 
+# Limites de execução de planos
+MAX_PLAN_STEPS = 20
+MAX_REPLANS = 2
+
+# Estratégias de digitação: tecla a tecla, blocos de texto ou valor nativo + eventos
+INPUT_MODES = ('human', 'chunk', 'native')
+DEFAULT_INPUT_MODE = 'chunk'
+INPUT_CHUNK_SIZE = 32
+
+# Define o valor pelo setter nativo (compatível com React/Vue) e dispara input/change
+NATIVE_INPUT_SCRIPT = """
+const el = arguments[0];
+const text = arguments[1];
+el.focus();
+
+if (el.isContentEditable) {
+    document.execCommand('insertText', false, text);
+    return true;
+}
+
+let proto = null;
+if (el instanceof HTMLTextAreaElement) proto = HTMLTextAreaElement.prototype;
+else if (el instanceof HTMLInputElement) proto = HTMLInputElement.prototype;
+if (!proto) return false;
+
+const setter = Object.getOwnPropertyDescriptor(proto, 'value').set;
+setter.call(el, (el.value || '') + text);
+el.dispatchEvent(new Event('input', {bubbles: true}));
+el.dispatchEvent(new Event('change', {bubbles: true}));
+return true;
+"""
+
+# Tempo máximo (segundos) de cada tipo de comando enviado ao navegador
+COMMAND_TIMEOUTS = {
+    'start': 90,
+    'navigate': 45,
+    'screenshot': 20,
+    'default': 20,
+}
+
+# Página carregada ao iniciar o navegador
+START_URL = 'https://www.google.com'
+
+# Estado da página preservado ao reciclar o navegador
+SNAPSHOT_SCRIPT = """
+const storage = {};
+try {
+    for (let i = 0; i < localStorage.length; i++) {
+        const key = localStorage.key(i);
+        storage[key] = localStorage.getItem(key);
+    }
+} catch (e) {}
+return {url: location.href, origin: location.origin, local_storage: storage,
+        scroll: [window.scrollX, window.scrollY]};
+"""
+
+# Campos aceitos por Network.setCookies (getAllCookies devolve outros informativos)
+COOKIE_FIELDS = ('name', 'value', 'domain', 'path', 'secure', 'httpOnly', 'sameSite', 'expires')
+
 class BrowserController:
-    def __init__(self):
+    def __init__(self, screenshot_store=None, screenshot_profile=DEFAULT_PROFILE, input_mode=DEFAULT_INPUT_MODE,
+                 headless=False, start_url=START_URL, load_profile=DEFAULT_LOAD_PROFILE, blocked_domains=(),
+                 user_data_dir=None, disk_cache_mb=None, driver_path=None):
         self.driver = None
         self.wait = None
-        self.screenshot_counter = 0
-        
+
+        # Chromedriver local: sem ele o undetected_chromedriver baixa o driver a cada inicialização
+        self.driver_path = driver_path
+
+        # Perfil persistente do Chrome (cache, cookies e service workers entre sessões)
+        self.user_data_dir = user_data_dir
+        self.disk_cache_mb = disk_cache_mb
+
+        # Modo sem janela (servidores e benchmarks) e página inicial
+        self.headless = headless
+        self.start_url = start_url
+
+        # Perfil de carregamento (recursos bloqueados e tamanho da janela) e domínios extras bloqueados
+        self.load_profile = load_profile if load_profile in LOAD_PROFILES else DEFAULT_LOAD_PROFILE
+        self.blocked_domains = tuple(blocked_domains)
+
+        # Gravação em disco é opcional (ScreenshotStore com buffer circular)
+        self.screenshot_store = screenshot_store
+        # Perfil de codificação dos screenshots desta sessão
+        self.screenshot_profile = screenshot_profile
+
+        # Índice dos elementos interativos da página atual
+        self.element_index = ElementIndex()
+
+        # Estratégia de digitação da sessão
+        self.input_mode = input_mode if input_mode in INPUT_MODES else DEFAULT_INPUT_MODE
+
+        # Resultado da última ação executada por execute_ai_action
+        self.last_action_ok = False
+
+        # Gravação de macro: passos executados (já resolvidos) aguardando o bot recolhê-los
+        self.recording = False
+        self.recorded_steps = []
+
+        # Métricas de desempenho do CDP habilitadas (medição do heap JS)
+        self._performance_enabled = False
+
+        # Thread dedicada com fila FIFO para as chamadas bloqueantes do Selenium
+        self.worker = DriverWorker(name='browser-worker')
+        # Espera por prontidão da página em vez de pausas fixas
+        self.wait_engine = WaitEngine()
+
+    async def _run(self, fn, *args, timeout=None):
+        """Executa uma chamada bloqueante na thread do navegador"""
+        if timeout is None:
+            timeout = COMMAND_TIMEOUTS['default']
+        return await self.worker.run(fn, *args, timeout=timeout)
+
+    async def wait_until_ready(self, action_type='default'):
+        """Aguarda a página estabilizar após uma ação (limitado pelo tempo máximo da ação)"""
+        limit = self.wait_engine.timeout_for(action_type)
+        return await self._run(self.wait_engine.wait_ready, self.driver, action_type, timeout=limit + 5)
+
     async def start(self):
         """Inicia o navegador com configurações anti-detecção"""
         try:
-            # Configurações do Chrome para evitar detecção
-            options = uc.ChromeOptions()
-            
-            # Configurações anti-bot
-            options.add_argument('--no-sandbox')
-            options.add_argument('--disable-dev-shm-usage')
-            options.add_argument('--disable-blink-features=AutomationControlled')
-            options.add_experimental_option("excludeSwitches", ["enable-automation"])
-            options.add_experimental_option('useAutomationExtension', False)
-            
-            # Configurações de janela
-            options.add_argument('--window-size=1920,1080')
-            options.add_argument('--start-maximized')
-            
-            # User agent personalizado
-            options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-            
-            # Inicializar driver
-            self.driver = uc.Chrome(options=options)
-            self.wait = WebDriverWait(self.driver, 10)
-            
-            # Script para remover propriedades de webdriver
-            self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-            
-            # Navegar para página inicial
-            self.driver.get('https://www.google.com')
-            
+            await self._run(self._start_sync, timeout=COMMAND_TIMEOUTS['start'])
+
             # Aguardar carregamento
-            await asyncio.sleep(3)
-            
+            await self.wait_until_ready('start')
+
             return True
-            
+
         except Exception as e:
             print(f"Erro ao iniciar navegador: {e}")
             return False
-    
+
+    def _start_sync(self):
+        """Cria o driver (executado na thread do navegador)"""
+        import undetected_chromedriver as uc
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        # Configurações do Chrome para evitar detecção
+        options = uc.ChromeOptions()
+
+        # Configurações anti-bot
+        options.add_argument('--no-sandbox')
+        options.add_argument('--disable-dev-shm-usage')
+        options.add_argument('--disable-blink-features=AutomationControlled')
+        options.add_experimental_option("excludeSwitches", ["enable-automation"])
+        options.add_experimental_option('useAutomationExtension', False)
+
+        # Retornar do driver.get no DOMContentLoaded; o restante fica com o WaitEngine
+        options.page_load_strategy = 'eager'
+
+        # Configurações de janela
+        width, height = LOAD_PROFILES[self.load_profile]['viewport']
+        options.add_argument(f'--window-size={width},{height}')
+        if LOAD_PROFILES[self.load_profile]['maximize']:
+            options.add_argument('--start-maximized')
+        if self.headless:
+            options.add_argument('--headless=new')
+
+        # User agent personalizado
+        options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+
+        # Limite do cache HTTP em disco do perfil
+        if self.disk_cache_mb:
+            options.add_argument(f'--disk-cache-size={self.disk_cache_mb * 2 ** 20}')
+
+        # Inicializar driver (com user_data_dir o undetected_chromedriver mantém o perfil ao fechar)
+        driver_options = {}
+        if self.user_data_dir:
+            driver_options['user_data_dir'] = self.user_data_dir
+        if self.driver_path:
+            driver_options['driver_executable_path'] = self.driver_path
+        self.driver = uc.Chrome(options=options, **driver_options)
+        self.wait = WebDriverWait(self.driver, 10)
+
+        # Evitar que um carregamento travado prenda a thread indefinidamente
+        self.driver.set_page_load_timeout(COMMAND_TIMEOUTS['navigate'])
+
+        # Script para remover propriedades de webdriver
+        self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+
+        # Bloqueios do perfil de carregamento antes da primeira página
+        self._apply_load_profile_sync(resize=False)
+
+        # Navegar para página inicial
+        self.driver.get(self.start_url)
+
+    async def set_load_profile(self, name):
+        """Troca o perfil de carregamento em tempo de execução
+
+        Ao sair de um perfil que bloqueava recursos, a página é recarregada para exibi-los.
+        """
+        if name not in LOAD_PROFILES:
+            raise ValueError(f"Perfil de carregamento inválido: {name}")
+
+        previous, self.load_profile = self.load_profile, name
+        if not self.driver:
+            return
+
+        reload = LOAD_PROFILES[previous]['block_resources'] and not LOAD_PROFILES[name]['block_resources']
+        await self._run(self._apply_load_profile_sync)
+        if reload:
+            await self._run(self.driver.refresh, timeout=COMMAND_TIMEOUTS['navigate'])
+        await self.wait_until_ready('navigate' if reload else 'default')
+
+    def _apply_load_profile_sync(self, resize=True):
+        """Aplica bloqueios via CDP e o tamanho da janela (executado na thread do navegador)"""
+        profile = LOAD_PROFILES[self.load_profile]
+
+        self.driver.execute_cdp_cmd('Network.enable', {})
+        self.driver.execute_cdp_cmd('Network.setBlockedURLs', {
+            'urls': blocked_url_patterns(self.load_profile, self.blocked_domains)
+        })
+
+        if resize:
+            width, height = profile['viewport']
+            self.driver.set_window_size(width, height)
+
+    async def memory_usage(self):
+        """Memória da sessão: RSS da árvore de processos do Chrome e heap JS da página (bytes)"""
+        if not self.driver:
+            return None
+        return await self._run(self._memory_usage_sync)
+
+    def _memory_usage_sync(self):
+        """Lê /proc e Performance.getMetrics (executado na thread do navegador)"""
+        usage = {'rss': process_tree_rss(getattr(self.driver, 'browser_pid', None)), 'js_heap': None}
+
+        try:
+            if not self._performance_enabled:
+                self.driver.execute_cdp_cmd('Performance.enable', {})
+                self._performance_enabled = True
+            metrics = self.driver.execute_cdp_cmd('Performance.getMetrics', {})
+            values = {metric['name']: metric['value'] for metric in metrics.get('metrics', [])}
+            usage['js_heap'] = values.get('JSHeapUsedSize')
+        except Exception as e:
+            print(f"Erro ao ler métricas de memória: {e}")
+
+        return usage
+
+    async def snapshot_state(self):
+        """Estado para recriar a sessão noutro navegador: preferências, abas, URL, cookies, localStorage e rolagem"""
+        state = {
+            'screenshot_profile': self.screenshot_profile,
+            'input_mode': self.input_mode,
+            'load_profile': self.load_profile,
+        }
+        if self.driver:
+            state.update(await self._run(self._snapshot_sync))
+        return state
+
+    def _snapshot_sync(self):
+        """Coleta o estado da página (executado na thread do navegador)"""
+        page = self.driver.execute_script(SNAPSHOT_SCRIPT)
+        cookies = self.driver.execute_cdp_cmd('Network.getAllCookies', {}).get('cookies', [])
+        page['cookies'] = [
+            {field: cookie[field] for field in COOKIE_FIELDS
+             if field in cookie and not (field == 'expires' and cookie.get('session'))}
+            for cookie in cookies
+        ]
+
+        # Outras abas abertas (só a URL; o controlador opera na aba atual)
+        targets = self.driver.execute_cdp_cmd('Target.getTargets', {}).get('targetInfos', [])
+        tabs = [target['url'] for target in targets if target.get('type') == 'page']
+        if page['url'] in tabs:
+            tabs.remove(page['url'])
+        page['tabs'] = tabs
+        return page
+
+    async def restore_state(self, state):
+        """Aplica um estado obtido por snapshot_state (cookies e localStorage antes do carregamento)"""
+        self.screenshot_profile = state.get('screenshot_profile', self.screenshot_profile)
+        if state.get('input_mode') in INPUT_MODES:
+            self.input_mode = state['input_mode']
+
+        if state.get('load_profile') in LOAD_PROFILES and state['load_profile'] != self.load_profile:
+            await self.set_load_profile(state['load_profile'])
+
+        if not self.driver or not state.get('url'):
+            return
+
+        await self._run(self._restore_sync, state, timeout=COMMAND_TIMEOUTS['navigate'])
+        await self.wait_until_ready('navigate')
+
+        x, y = state.get('scroll') or (0, 0)
+        if x or y:
+            await self._run(self.driver.execute_script, 'window.scrollTo(arguments[0], arguments[1]);', x, y)
+
+    def _restore_sync(self, state):
+        """Restaura cookies e localStorage e abre a URL (executado na thread do navegador)"""
+        if state.get('cookies'):
+            self.driver.execute_cdp_cmd('Network.setCookies', {'cookies': state['cookies']})
+
+        # localStorage só pode ser gravado na própria origem: script injetado antes dos scripts da página
+        identifier = None
+        if state.get('local_storage') and state.get('origin', 'null') != 'null':
+            source = (f"if (location.origin === {json.dumps(state['origin'])}) {{"
+                      f" const items = {json.dumps(state['local_storage'])};"
+                      f" for (const key in items) localStorage.setItem(key, items[key]); }}")
+            identifier = self.driver.execute_cdp_cmd(
+                'Page.addScriptToEvaluateOnNewDocument', {'source': source})['identifier']
+
+        try:
+            # Abas extras carregam em segundo plano enquanto a principal abre
+            for url in state.get('tabs', []):
+                self.driver.execute_cdp_cmd('Target.createTarget', {'url': url, 'background': True})
+            self.driver.get(state['url'])
+        finally:
+            if identifier:
+                self.driver.execute_cdp_cmd('Page.removeScriptToEvaluateOnNewDocument', {'identifier': identifier})
+
+    @tracer.timed('navigate')
     async def navigate_to(self, url):
         """Navega para uma URL específica"""
         if not self.driver:
             raise Exception("Navegador não iniciado")
-        
+
         # Adicionar protocolo se necessário
         if not url.startswith(('http://', 'https://')):
             url = 'https://' + url
-        
-        self.driver.get(url)
-        
-        # Aguardar carregamento com delay aleatório
-        await asyncio.sleep(random.uniform(2, 4))
-        
+
+        await self._run(self.driver.get, url, timeout=COMMAND_TIMEOUTS['navigate'])
+
+        # Aguardar carregamento
+        await self.wait_until_ready('navigate')
+
         return True
-    
+
     async def click_at(self, x, y):
         """Clica em coordenadas específicas"""
         if not self.driver:
             raise Exception("Navegador não iniciado")
-        
+
+        await self._run(self._click_sync, x, y)
+
+        # Aguardar reação da página ao clique
+        await self.wait_until_ready('click')
+
+        return True
+
+    async def click_element(self, element_id):
+        """Clica em um elemento do índice pelo ID"""
+        if not self.driver:
+            raise Exception("Navegador não iniciado")
+
+        await self._run(self._click_element_sync, ElementIndex.selector_for(element_id))
+
+        # Aguardar reação da página ao clique
+        await self.wait_until_ready('click')
+
+        return True
+
+    def _click_element_sync(self, selector):
+        """Localiza o elemento pelo seletor estável e clica (executado na thread do navegador)"""
+        from selenium.webdriver.common.by import By
+
+        elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
+        if not elements:
+            raise Exception("Elemento não encontrado na página")
+
+        element = elements[0]
+        self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", element)
+        try:
+            element.click()
+        except Exception:
+            # Elemento coberto por outro: clicar via JavaScript
+            self.driver.execute_script("arguments[0].click();", element)
+
+        return element
+
+    def _click_sync(self, x, y):
+        """Executa o clique (executado na thread do navegador)"""
+        from selenium.webdriver.common.action_chains import ActionChains
+
         # Usar ActionChains para movimento mais natural
         actions = ActionChains(self.driver)
-        
+
         # Mover para coordenadas com movimento suave
         actions.move_by_offset(x, y)
         actions.click()
         actions.perform()
-        
-        # Delay aleatório após clique
-        await asyncio.sleep(random.uniform(0.5, 1.5))
-        
-        return True
-    
-    async def type_text(self, text):
-        """Digite texto com timing humano"""
+
+    async def type_text(self, text, mode=None, element=None):
+        """Digite texto no elemento indicado (ou no ativo) usando a estratégia da sessão
+
+        human: uma tecla por vez com timing humano; chunk: blocos de texto;
+        native: define o valor direto e dispara os eventos input/change.
+        """
         if not self.driver:
             raise Exception("Navegador não iniciado")
-        
-        # Encontrar elemento ativo ou usar body
+
+        mode = mode or self.input_mode
+        if element is None:
+            element = await self._run(self._active_element_sync)
+
+        if mode == 'native':
+            if await self._run(self.driver.execute_script, NATIVE_INPUT_SCRIPT, element, text):
+                await self.wait_until_ready('type')
+                return True
+            # Elemento sem valor editável: usar blocos de texto
+            mode = 'chunk'
+
+        if mode == 'human':
+            # Digitar com delays aleatórios entre caracteres
+            for char in text:
+                await self._run(element.send_keys, char)
+                await asyncio.sleep(random.uniform(0.05, 0.15))
+        else:
+            for start in range(0, len(text), INPUT_CHUNK_SIZE):
+                await self._run(element.send_keys, text[start:start + INPUT_CHUNK_SIZE])
+
+        await self.wait_until_ready('type')
+
+        return True
+
+    def _active_element_sync(self):
+        """Encontra elemento ativo ou usa body"""
+        from selenium.webdriver.common.by import By
+
         try:
-            active_element = self.driver.switch_to.active_element
+            return self.driver.switch_to.active_element
         except:
-            active_element = self.driver.find_element(By.TAG_NAME, "body")
-        
-        # Digitar com delays aleatórios entre caracteres
-        for char in text:
-            active_element.send_keys(char)
-            await asyncio.sleep(random.uniform(0.05, 0.15))
-        
-        return True
-    
-    async def take_screenshot(self):
-        """Captura screenshot e processa com Pillow"""
+            return self.driver.find_element(By.TAG_NAME, "body")
+
+    async def take_screenshot(self, profile=None):
+        """Captura screenshot em memória e codifica com Pillow conforme o perfil"""
         if not self.driver:
             raise Exception("Navegador não iniciado")
-        
-        # Criar diretório se não existir
-        os.makedirs('screenshots', exist_ok=True)
-        
-        # Nome do arquivo
-        filename = f'screenshots/browser_{self.screenshot_counter}.png'
-        self.screenshot_counter += 1
-        
-        # Capturar screenshot
-        self.driver.save_screenshot(filename)
-        
-        # Processar com Pillow
-        with Image.open(filename) as img:
-            # Redimensionar se muito grande
-            if img.width > 1920 or img.height > 1080:
-                img.thumbnail((1920, 1080), Image.Resampling.LANCZOS)
-            
-            # Salvar imagem processada
-            img.save(filename, 'PNG', optimize=True)
-        
-        return filename
-    
+
+        with tracer.span('screenshot_capture'):
+            png_bytes = await self._run(self.driver.get_screenshot_as_png, timeout=COMMAND_TIMEOUTS['screenshot'])
+
+        # Processar fora da thread do navegador para liberar a fila da sessão
+        loop = asyncio.get_running_loop()
+        with tracer.span('screenshot_encode'):
+            shot = await loop.run_in_executor(None, process_screenshot, png_bytes, profile or self.screenshot_profile)
+
+        if self.screenshot_store:
+            await self.screenshot_store.save(shot.data, shot.extension)
+
+        return shot
+
     async def get_page_source(self):
         """Obtém o código fonte da página"""
         if not self.driver:
             raise Exception("Navegador não iniciado")
-        
-        return self.driver.page_source
-    
-    async def execute_ai_action(self, action):
-        """Executa ação baseada na resposta da IA"""
+
+        return await self._run(lambda: self.driver.page_source)
+
+    @tracer.timed('page_extract')
+    async def extract_page_content(self):
+        """Extrai URL, título, texto visível e elementos interativos em uma única chamada"""
+        if not self.driver:
+            raise Exception("Navegador não iniciado")
+
+        return await self._run(extract_from_driver, self.driver)
+
+    async def scrape_items(self, selector, start=0, limit=200):
+        """Itens da página que correspondem ao seletor, a partir da posição `start`"""
+        if not self.driver:
+            raise Exception("Navegador não iniciado")
+
+        from scraper import SCRAPE_SCRIPT, MAX_ITEM_TEXT
+        return await self._run(self.driver.execute_script, SCRAPE_SCRIPT, selector, start, limit, MAX_ITEM_TEXT)
+
+    async def guess_item_selector(self):
+        """Seletor do grupo de elementos repetidos mais provável de ser a lista de itens"""
+        if not self.driver:
+            raise Exception("Navegador não iniciado")
+
+        from scraper import AUTO_SELECTOR_SCRIPT
+        return await self._run(self.driver.execute_script, AUTO_SELECTOR_SCRIPT)
+
+    async def next_page(self):
+        """Segue o link ou botão de próxima página; retorna False se não houver"""
+        if not self.driver:
+            raise Exception("Navegador não iniciado")
+
+        from scraper import NEXT_PAGE_SCRIPT
+        target = await self._run(self.driver.execute_script, NEXT_PAGE_SCRIPT)
+        if not target:
+            return False
+
+        if target.get('href'):
+            await self._run(self.driver.get, target['href'], timeout=COMMAND_TIMEOUTS['navigate'])
+            await self.wait_until_ready('navigate')
+        else:
+            await self.wait_until_ready('click')
+        return True
+
+    async def scroll_for_more(self):
+        """Rola até o fim da página; retorna True se a página cresceu (rolagem infinita)"""
+        if not self.driver:
+            raise Exception("Navegador não iniciado")
+
+        from scraper import SCROLL_BOTTOM_SCRIPT
+        before = await self._run(self.driver.execute_script, SCROLL_BOTTOM_SCRIPT)
+        await self.wait_until_ready('load_more')
+        after = await self._run(self.driver.execute_script, 'return document.documentElement.scrollHeight;')
+        return after > before
+
+    @tracer.timed('element_index')
+    async def refresh_element_index(self):
+        """Atualiza o índice de elementos com as mudanças desde a última consulta"""
+        if not self.driver:
+            raise Exception("Navegador não iniciado")
+
+        diff = await self._run(self.driver.execute_script, INDEX_SCRIPT, INTERACTIVE_SELECTOR)
+        self.element_index.apply(diff)
+        return self.element_index
+
+    async def get_debugger_target(self):
+        """Endereço do DevTools e ID da aba atual (o handle da janela é o targetId no Chrome)"""
         if not self.driver:
             raise Exception("Navegador não iniciado")
-        
+
+        address = self.driver.capabilities.get('goog:chromeOptions', {}).get('debuggerAddress')
+        target_id = await self._run(lambda: self.driver.current_window_handle)
+        return address, target_id
+
+    async def get_current_url(self):
+        """Obtém a URL atual"""
+        if not self.driver:
+            raise Exception("Navegador não iniciado")
+
+        return await self._run(lambda: self.driver.current_url)
+
+    async def wait_for_condition(self, condition, timeout=None):
+        """Aguarda a condição "wait_for" de um passo (selector, text ou url_contains)"""
+        if timeout is None:
+            timeout = self.wait_engine.timeout_for('navigate')
+        return await self._run(self.wait_engine.wait_for_condition, self.driver, condition, timeout,
+                               timeout=timeout + 5)
+
+    async def execute_plan(self, steps, replan=None, max_steps=MAX_PLAN_STEPS):
+        """Executa os passos em sequência; se uma pré-condição falhar, pede um novo plano via `replan`
+
+        `replan(completed, failed_step)` é uma corrotina que retorna uma ação ou um plano.
+        """
+        pending = list(steps)
+        completed = []
+        results = []
+        replans = 0
+        self.last_action_ok = bool(pending)
+
+        while pending and len(completed) < max_steps:
+            step = pending.pop(0)
+
+            condition = step.get('wait_for')
+            if condition and not await self.wait_for_condition(condition, step.get('timeout')):
+                if replan is None or replans >= MAX_REPLANS:
+                    self.last_action_ok = False
+                    results.append(f"Condição não atendida: {json.dumps(condition, ensure_ascii=False)}")
+                    break
+
+                replans += 1
+                new_plan = await replan(completed, step)
+                if new_plan.get('type') == 'error':
+                    self.last_action_ok = False
+                    results.append(new_plan.get('message', 'Erro ao replanejar'))
+                    break
+
+                pending = new_plan['steps'] if new_plan.get('type') == 'plan' else [new_plan]
+                results.append("Plano refeito pela IA")
+                continue
+
+            result = await self._execute_step(step)
+            results.append(result)
+            if not self.last_action_ok:
+                break
+
+            completed.append(step)
+
+        self.last_action_ok = self.last_action_ok and not pending
+        return '\n'.join(f"{i}. {result}" for i, result in enumerate(results, 1))
+
+    @tracer.timed('execute')
+    async def execute_ai_action(self, action, replan=None):
+        """Executa ação (ou plano de ações) baseada na resposta da IA"""
+        if not self.driver:
+            raise Exception("Navegador não iniciado")
+
+        if action.get('type') == 'plan':
+            return await self.execute_plan(action.get('steps', []), replan)
+
+        return await self._execute_step(action)
+
+    async def pop_recorded_steps(self):
+        """Passos gravados desde a última chamada"""
+        steps, self.recorded_steps = self.recorded_steps, []
+        return steps
+
+    async def _portable_step(self, action):
+        """Ação com o elemento do índice trocado por um seletor que sobrevive a novos carregamentos"""
+        from macros import STABLE_SELECTOR_SCRIPT, portable_step
+        selector = None
+        if action.get('element_id') is not None:
+            try:
+                selector = await self._run(self.driver.execute_script, STABLE_SELECTOR_SCRIPT,
+                                           ElementIndex.selector_for(action['element_id']))
+            except Exception as e:
+                print(f"Erro ao resolver seletor para a macro: {e}")
+        return portable_step(action, selector)
+
+    async def _execute_step(self, action):
+        """Executa uma única ação, gravando-a se houver uma macro em gravação"""
+        if not self.recording:
+            return await self._perform_step(action)
+
+        # Resolver o elemento antes que a ação mude a página
+        step = await self._portable_step(action)
+        result = await self._perform_step(action)
+        if self.last_action_ok and step:
+            self.recorded_steps.append(step)
+        return result
+
+    async def _perform_step(self, action):
+        """Executa uma única ação"""
         action_type = action.get('type', '')
-        
+        self.last_action_ok = False
+
         try:
             if action_type == 'navigate':
                 url = action.get('url', '')
                 await self.navigate_to(url)
+                self.last_action_ok = True
                 return f"Navegado para: {url}"
-            
+
+            elif action_type == 'click' and action.get('selector'):
+                selector = action['selector']
+                await self._run(self._click_element_sync, selector)
+                await self.wait_until_ready('click')
+                self.last_action_ok = True
+                return f"Clicado em {selector}"
+
+            elif action_type == 'click' and action.get('element_id') is not None:
+                element_id = str(action['element_id'])
+                await self.click_element(element_id)
+                self.last_action_ok = True
+                element = self.element_index.get(element_id)
+                label = f" \"{element['text']}\"" if element and element['text'] else ''
+                return f"Clicado no elemento #{element_id}{label}"
+
             elif action_type == 'click':
                 x = action.get('x', 0)
                 y = action.get('y', 0)
                 await self.click_at(x, y)
+                self.last_action_ok = True
                 return f"Clicado em ({x}, {y})"
-            
+
             elif action_type == 'type':
                 text = action.get('text', '')
-                await self.type_text(text)
+                element = None
+                if action.get('element_id') is not None:
+                    # Focar o campo indicado antes de digitar
+                    element = await self._run(self._click_element_sync, ElementIndex.selector_for(action['element_id']))
+                elif action.get('selector'):
+                    element = await self._run(self._click_element_sync, action['selector'])
+                await self.type_text(text, action.get('input_mode'), element)
+                self.last_action_ok = True
                 return f"Digitado: {text}"
-            
+
             elif action_type == 'search':
                 query = action.get('query', '')
-                # Procurar campo de busca
-                search_selectors = [
-                    'input[name="q"]',
-                    'input[type="search"]',
-                    'input[placeholder*="search" i]',
-                    'input[placeholder*="buscar" i]'
-                ]
-                
-                for selector in search_selectors:
-                    try:
-                        search_box = self.driver.find_element(By.CSS_SELECTOR, selector)
-                        search_box.clear()
-                        await self.type_text(query)
-                        search_box.send_keys(Keys.RETURN)
-                        return f"Pesquisado: {query}"
-                    except:
-                        continue
-                
-                return "Campo de busca não encontrado"
-            
+                # Procurar campo de busca (índice de elementos e depois seletores comuns)
+                await self.refresh_element_index()
+                candidate = self.element_index.find_search_box()
+                selector = candidate['selector'] if candidate else None
+                search_box = await self._run(self._find_search_box_sync, selector)
+
+                if search_box is None:
+                    return "Campo de busca não encontrado"
+
+                # Digitar direto no campo encontrado, não no elemento que estiver ativo
+                await self._run(search_box.clear)
+                await self.type_text(query, action.get('input_mode'), search_box)
+                from selenium.webdriver.common.keys import Keys
+                await self._run(search_box.send_keys, Keys.RETURN)
+                await self.wait_until_ready('search')
+                self.last_action_ok = True
+                return f"Pesquisado: {query}"
+
             elif action_type == 'scroll':
                 direction = action.get('direction', 'down')
                 pixels = action.get('pixels', 500)
-                
+
                 if direction == 'down':
-                    self.driver.execute_script(f"window.scrollBy(0, {pixels});")
+                    await self._run(self.driver.execute_script, f"window.scrollBy(0, {pixels});")
                 else:
-                    self.driver.execute_script(f"window.scrollBy(0, -{pixels});")
-                
-                await asyncio.sleep(1)
+                    await self._run(self.driver.execute_script, f"window.scrollBy(0, -{pixels});")
+
+                await self.wait_until_ready('scroll')
+                self.last_action_ok = True
                 return f"Rolado {direction} {pixels}px"
-            
+
             else:
                 return f"Ação não reconhecida: {action_type}"
-                
+
         except Exception as e:
             return f"Erro ao executar ação: {str(e)}"
-    
+
+    def _find_search_box_sync(self, preferred_selector=None):
+        """Procura um campo de busca na página (executado na thread do navegador)"""
+        from selenium.webdriver.common.by import By
+
+        search_selectors = [
+            'input[name="q"]',
+            'input[type="search"]',
+            'input[placeholder*="search" i]',
+            'input[placeholder*="buscar" i]'
+        ]
+
+        if preferred_selector:
+            search_selectors.insert(0, preferred_selector)
+
+        # Uma consulta por seletor, sem exceções para os que não existem
+        for selector in search_selectors:
+            elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
+            if elements:
+                return elements[0]
+
+        return None
+
     async def close(self):
         """Fecha o navegador"""
-        if self.driver:
-            self.driver.quit()
+        # Descartar comandos pendentes desta sessão
+        self.worker.cancel_pending()
+
+        driver = self.driver
+        try:
+            if driver:
+                await self._run(driver.quit)
+        except Exception as e:
+            # Driver travado ou com erro: encerrar o Chrome e o chromedriver à força
+            print(f"Erro ao fechar navegador ({e}); encerrando os processos")
+            kill_process_tree(getattr(driver, 'browser_pid', None))
+            service_process = getattr(getattr(driver, 'service', None), 'process', None)
+            kill_process_tree(getattr(service_process, 'pid', None))
+        finally:
             self.driver = None
             self.wait = None
-        
-        return True
\ No newline at end of file
+            self.worker.stop()
+
+        return True
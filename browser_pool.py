@@ -0,0 +1,394 @@
+import asyncio
+import time
+from collections import OrderedDict
+from browser_controller import BrowserController
+
+
+class BrowserSession:
+    """Sessão de navegador associada a (servidor, canal, usuário)"""
+
+    def __init__(self, key, controller, profile=None):
+        self.key = key
+        self.controller = controller
+        # Perfil persistente (nome, caminho) quando os perfis estão ativos
+        self.profile = profile
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+        # Comandos em execução e reciclagem por excesso de memória
+        self.active = 0
+        self.memory = None
+        self.recycle_reason = None
+        self.recycles = 0
+        self.recycling = None
+
+    def touch(self):
+        """Marca a sessão como usada agora"""
+        self.last_used = time.monotonic()
+
+    def idle_seconds(self):
+        """Tempo em segundos desde o último uso"""
+        return time.monotonic() - self.last_used
+
+    @property
+    def busy(self):
+        """Há um comando em execução ou uma reciclagem em andamento (não pode ser despejada)"""
+        return bool(self.active or self.recycling)
+
+
+class BrowserPool:
+    """Pool de navegadores por sessão com instâncias pré-aquecidas e despejo LRU/TTL
+
+    Com perfis persistentes (ProfileStore) cada sessão abre o perfil do usuário,
+    então não há navegadores pré-aquecidos.
+    """
+
+    def __init__(self, max_browsers=4, warm_size=1, idle_ttl=900, cleanup_interval=60,
+                 factory=BrowserController, profiles=None, on_session_change=None, is_busy=None):
+        self.max_browsers = max(1, max_browsers)
+        self.profiles = profiles
+        self.warm_size = 0 if profiles else max(0, min(warm_size, self.max_browsers))
+        self.idle_ttl = idle_ttl
+        self.cleanup_interval = cleanup_interval
+        self.factory = factory
+        # Callback (chave, aberta) ao abrir ou fechar sessões (ex.: registro do cluster)
+        self.on_session_change = on_session_change
+        # Callback (chave) -> bool para usos fora de comandos que impedem o despejo (ex.: transmissão ao vivo)
+        self.is_busy = is_busy
+
+        # Sessões ativas em ordem LRU (mais antiga primeiro)
+        self.sessions = OrderedDict()
+        # Navegadores já iniciados aguardando uma sessão
+        self.warm = []
+
+        self._lock = asyncio.Lock()
+        self._launching = 0
+        self._pending = {}
+        self._maintenance_task = None
+        self._warm_task = None
+
+    @staticmethod
+    def session_key(ctx):
+        """Gera a chave da sessão a partir do contexto do comando"""
+        guild_id = ctx.guild.id if ctx.guild else 0
+        return (guild_id, ctx.channel.id, ctx.author.id)
+
+    def live_count(self):
+        """Total de navegadores vivos (sessões, aquecidos e em inicialização)"""
+        return len(self.sessions) + len(self.warm) + self._launching
+
+    def _busy(self, session):
+        """A sessão está em uso (comando, reciclagem ou uso externo) e não pode ser despejada"""
+        return session.busy or bool(self.is_busy and self.is_busy(session.key))
+
+    def free_slots(self):
+        """Sessões que ainda cabem sem despejar outras (navegadores aquecidos podem ser usados)"""
+        return max(0, self.max_browsers - len(self.sessions) - self._launching)
+
+    def get(self, key):
+        """Retorna o controlador da sessão ou None se não existir"""
+        session = self.sessions.get(key)
+        if not session:
+            return None
+
+        # Navegador perdido junto com o processo de trabalho (reiniciado pelo supervisor)
+        if getattr(session.controller, 'lost', False):
+            self.sessions.pop(key, None)
+            self._session_closed(session)
+            return None
+
+        session.touch()
+        self.sessions.move_to_end(key)
+        return session.controller
+
+    async def checkout(self, key):
+        """Como get, mas aguarda uma reciclagem em andamento da sessão"""
+        session = self.sessions.get(key)
+        if session and session.recycling:
+            await asyncio.shield(session.recycling)
+        return self.get(key)
+
+    def enter(self, key):
+        """Marca o início de um comando na sessão (não é reciclada enquanto houver comandos)"""
+        session = self.sessions.get(key)
+        if session:
+            session.active += 1
+
+    def leave(self, key):
+        """Marca o fim de um comando na sessão"""
+        session = self.sessions.get(key)
+        if session and session.active:
+            session.active -= 1
+
+    async def recycle(self, key):
+        """Troca o navegador da sessão por um novo, restaurando URL, cookies, localStorage e rolagem"""
+        session = self.sessions.get(key)
+        if not session or session.active:
+            return False
+
+        if not session.recycling:
+            session.recycling = asyncio.ensure_future(self._recycle(session))
+        return await asyncio.shield(session.recycling)
+
+    async def _recycle(self, session):
+        old = session.controller
+        try:
+            state = await old.snapshot_state()
+
+            if session.profile:
+                # O Chrome trava o perfil: fechar o antigo antes de reabrir o mesmo diretório
+                await self._close_controller(old)
+                old = None
+
+            # Um aquecido serve de substituto; senão um novo é iniciado
+            async with self._lock:
+                controller = None
+                while self.warm and controller is None:
+                    controller = self.warm.pop()
+                    if getattr(controller, 'lost', False):
+                        controller = None
+                if controller is None:
+                    self._launching += 1
+
+            if controller is None:
+                try:
+                    controller = await self._launch(**self._profile_options(session.profile))
+                finally:
+                    self._launching -= 1
+                if controller is None:
+                    if old is None:
+                        # Navegador antigo já fechado: a sessão deixa de existir
+                        self.sessions.pop(session.key, None)
+                        self._session_closed(session)
+                    raise Exception("Falha ao iniciar navegador")
+
+            try:
+                await controller.restore_state(state)
+            except Exception as e:
+                # Página pode não voltar igual (ex.: site fora do ar), mas a sessão segue utilizável
+                print(f"Erro ao restaurar estado da sessão {session.key}: {e}")
+
+            if self.sessions.get(session.key) is not session:
+                # Sessão fechada durante a reciclagem
+                await self._close_controller(controller)
+                return False
+
+            session.controller = controller
+            session.recycles += 1
+            session.memory = None
+            if old is not None:
+                await self._close_controller(old)
+            self._schedule_warm_fill()
+            return True
+
+        except Exception as e:
+            print(f"Erro ao reciclar sessão {session.key}: {e}")
+            return False
+
+        finally:
+            session.recycle_reason = None
+            session.recycling = None
+
+    async def acquire(self, key):
+        """Obtém o navegador da sessão, usando um aquecido ou iniciando um novo
+
+        Uma reciclagem em andamento é aguardada, como em checkout.
+        """
+        controller = await self.checkout(key)
+        if controller:
+            return controller
+
+        # Evitar inicializações duplicadas para a mesma sessão
+        pending = self._pending.get(key)
+        if pending:
+            return await asyncio.shield(pending)
+
+        task = asyncio.ensure_future(self._create_session(key))
+        self._pending[key] = task
+        task.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _create_session(self, key):
+        """Associa um navegador (aquecido ou novo) à sessão"""
+        victims = []
+
+        async with self._lock:
+            controller = None
+            while self.warm and controller is None:
+                controller = self.warm.pop()
+                if getattr(controller, 'lost', False):
+                    controller = None
+
+            if controller is None:
+                # Liberar espaço despejando as sessões menos usadas (nunca as que estão em uso)
+                idle = [session for session in self.sessions.values() if not self._busy(session)]
+                while self.live_count() >= self.max_browsers and idle:
+                    victim = idle.pop(0)
+                    del self.sessions[victim.key]
+                    victims.append(victim)
+
+                if self.live_count() >= self.max_browsers:
+                    raise Exception("Limite de navegadores atingido. Tente novamente mais tarde.")
+
+                self._launching += 1
+
+        for victim in victims:
+            print(f"Sessão {victim.key} despejada (LRU)")
+            await self._close_session(victim)
+
+        profile = None
+        if controller is None:
+            try:
+                if self.profiles:
+                    profile = self.profiles.acquire(key)
+                controller = await self._launch(**self._profile_options(profile))
+            finally:
+                self._launching -= 1
+
+            if controller is None:
+                if profile:
+                    self.profiles.release(profile[0])
+                raise Exception("Falha ao iniciar navegador")
+
+        async with self._lock:
+            self.sessions[key] = BrowserSession(key, controller, profile)
+        if self.on_session_change:
+            self.on_session_change(key, True)
+
+        self._schedule_warm_fill()
+        return controller
+
+    async def release(self, key):
+        """Fecha o navegador da sessão"""
+        async with self._lock:
+            session = self.sessions.pop(key, None)
+
+        if not session:
+            return False
+
+        await self._close_session(session)
+        self._schedule_warm_fill()
+        return True
+
+    def _profile_options(self, profile):
+        """Opções do navegador para abrir o perfil persistente"""
+        if not profile:
+            return {}
+        return {'user_data_dir': profile[1], 'disk_cache_mb': self.profiles.disk_cache_mb}
+
+    def _session_closed(self, session):
+        """Libera o perfil e avisa que a sessão deixou de existir"""
+        if session.profile and self.profiles:
+            self.profiles.release(session.profile[0])
+        if self.on_session_change:
+            self.on_session_change(session.key, False)
+
+    async def _launch(self, **options):
+        """Inicia um novo navegador, retornando None em caso de falha"""
+        controller = self.factory(**options)
+        if await controller.start():
+            return controller
+
+        await self._close_controller(controller)
+        return None
+
+    async def _close_session(self, session):
+        """Fecha o navegador da sessão e libera seu perfil"""
+        await self._close_controller(session.controller)
+        self._session_closed(session)
+
+    async def _close_controller(self, controller):
+        """Fecha um controlador ignorando erros"""
+        try:
+            await controller.close()
+        except Exception as e:
+            print(f"Erro ao fechar navegador: {e}")
+
+    def _schedule_warm_fill(self):
+        """Agenda a reposição dos navegadores aquecidos em segundo plano"""
+        if self._warm_task and not self._warm_task.done():
+            return
+        self._warm_task = asyncio.ensure_future(self._fill_warm())
+
+    async def _fill_warm(self):
+        """Mantém a quantidade configurada de navegadores aquecidos, iniciando-os em paralelo"""
+        while True:
+            async with self._lock:
+                needed = min(self.warm_size - len(self.warm) - self._launching,
+                             self.max_browsers - self.live_count())
+                if needed <= 0:
+                    return
+                self._launching += needed
+
+            try:
+                controllers = await asyncio.gather(*(self._launch() for _ in range(needed)))
+            finally:
+                self._launching -= needed
+
+            launched = [controller for controller in controllers if controller is not None]
+            async with self._lock:
+                self.warm.extend(launched)
+
+            if len(launched) < needed:
+                return
+
+    async def evict_idle(self):
+        """Fecha sessões ociosas há mais tempo que o TTL"""
+        async with self._lock:
+            expired = [key for key, session in self.sessions.items()
+                       if session.idle_seconds() > self.idle_ttl and not self._busy(session)]
+            victims = [self.sessions.pop(key) for key in expired]
+
+        for victim in victims:
+            print(f"Sessão {victim.key} expirada por inatividade")
+            await self._close_session(victim)
+
+        if victims:
+            self._schedule_warm_fill()
+
+        return len(victims)
+
+    async def start(self):
+        """Inicia a manutenção periódica e o pré-aquecimento"""
+        if self._maintenance_task and not self._maintenance_task.done():
+            return
+
+        self._maintenance_task = asyncio.ensure_future(self._maintenance_loop())
+        self._schedule_warm_fill()
+        if self.profiles:
+            self.profiles.schedule_cleanup()
+
+    async def _maintenance_loop(self):
+        """Loop de despejo de sessões ociosas"""
+        while True:
+            await asyncio.sleep(self.cleanup_interval)
+            try:
+                await self.evict_idle()
+                self._schedule_warm_fill()
+            except Exception as e:
+                print(f"Erro na manutenção do pool: {e}")
+
+    async def close_all(self):
+        """Fecha todas as sessões e navegadores aquecidos"""
+        if self._maintenance_task:
+            self._maintenance_task.cancel()
+            self._maintenance_task = None
+
+        async with self._lock:
+            sessions = list(self.sessions.values())
+            warm = list(self.warm)
+            self.sessions.clear()
+            self.warm.clear()
+
+        await asyncio.gather(*(self._close_session(session) for session in sessions),
+                             *(self._close_controller(controller) for controller in warm))
+
+    def stats(self):
+        """Resumo do estado do pool"""
+        return {
+            'sessions': len(self.sessions),
+            'warm': len(self.warm),
+            'launching': self._launching,
+            'max': self.max_browsers,
+            'recycles': sum(session.recycles for session in self.sessions.values()),
+        }
@@ -0,0 +1,604 @@
+import asyncio
+import itertools
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from browser_controller import BrowserController, COMMAND_TIMEOUTS, DEFAULT_INPUT_MODE, START_URL, MAX_PLAN_STEPS
+from load_profiles import DEFAULT_LOAD_PROFILE
+from screenshot_pipeline import DEFAULT_PROFILE
+
+# Protocolo (tuplas enviadas pelo Pipe):
+#   pai -> filho: ('call', request_id, session_id, method, args, kwargs, settings)
+#                 ('callback_result', callback_id, ok, value)
+#                 ('shutdown',)
+#   filho -> pai: ('result', request_id, ok, value, state)
+#                 ('callback', request_id, callback_id, args)
+
+# Métodos do BrowserController que podem ser chamados remotamente
+REMOTE_METHODS = (
+    'start', 'navigate_to', 'click_at', 'click_element', 'type_text', 'take_screenshot',
+    'get_page_source', 'extract_page_content', 'refresh_element_index', 'get_debugger_target',
+    'get_current_url', 'wait_for_condition', 'execute_plan', 'execute_ai_action',
+    'set_load_profile', 'memory_usage', 'snapshot_state', 'restore_state',
+    'scrape_items', 'guess_item_selector', 'next_page', 'scroll_for_more', 'pop_recorded_steps', 'close',
+)
+
+# Atributos da sessão sincronizados a cada chamada (alterados pelo bot no processo principal)
+SYNCED_SETTINGS = ('screenshot_profile', 'input_mode', 'recording')
+
+# Prazo (segundos) de uma chamada remota; planos incluem novas consultas à IA
+REMOTE_TIMEOUTS = {
+    'start': COMMAND_TIMEOUTS['start'] + 30,
+    'execute_plan': 600,
+    'execute_ai_action': 600,
+    'default': 120,
+}
+
+
+class RemoteBrowserError(Exception):
+    """Erro ocorrido no processo de trabalho"""
+
+
+class WorkerLostError(Exception):
+    """O processo de trabalho da sessão foi encerrado ou reiniciado"""
+
+
+def _worker_main(conn):
+    """Ponto de entrada do processo de trabalho"""
+    # Grupo de processos próprio: ao matar o worker, o Chrome iniciado por ele vai junto
+    if hasattr(os, 'setsid'):
+        os.setsid()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    asyncio.run(_WorkerServer(conn).serve())
+
+
+class _WorkerServer:
+    """Executa as sessões de navegador de um processo de trabalho"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.controllers = {}
+        self.callbacks = {}
+        self.loop = None
+        self.closed = None
+        self._callback_ids = itertools.count(1)
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.closed = self.loop.create_future()
+        threading.Thread(target=self._reader, name='worker-reader', daemon=True).start()
+
+        await self.closed
+
+        for controller in list(self.controllers.values()):
+            try:
+                await controller.close()
+            except Exception:
+                pass
+
+    def _reader(self):
+        """Lê mensagens do processo principal (thread dedicada)"""
+        while True:
+            try:
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                # Processo principal encerrado
+                self.loop.call_soon_threadsafe(self._close)
+                return
+            self.loop.call_soon_threadsafe(self._dispatch, message)
+
+    def _close(self):
+        if not self.closed.done():
+            self.closed.set_result(None)
+
+    def _send(self, message):
+        try:
+            self.conn.send(message)
+        except (EOFError, OSError):
+            self._close()
+
+    def _dispatch(self, message):
+        kind = message[0]
+        if kind == 'call':
+            asyncio.ensure_future(self._handle(*message[1:]))
+        elif kind == 'callback_result':
+            _, callback_id, ok, value = message
+            future = self.callbacks.pop(callback_id, None)
+            if future and not future.done():
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(RemoteBrowserError(value))
+        elif kind == 'shutdown':
+            self._close()
+
+    async def _handle(self, request_id, session_id, method, args, kwargs, settings):
+        controller = self.controllers.get(session_id)
+        try:
+            value = await self._execute(request_id, session_id, method, args, kwargs, settings)
+            reply = ('result', request_id, True, value, self._state(session_id))
+        except Exception as e:
+            reply = ('result', request_id, False, (type(e).__name__, str(e)), self._state(session_id, controller))
+
+        try:
+            self._send(reply)
+        except Exception as e:
+            # Resposta não serializável: devolver o erro em vez de deixar o pedido sem resposta
+            self._send(('result', request_id, False, ('RemoteBrowserError', f"Resposta inválida: {e}"), None))
+
+    def _state(self, session_id, controller=None):
+        """Estado da sessão devolvido com cada resposta"""
+        controller = self.controllers.get(session_id, controller)
+        if controller is None:
+            return None
+        return {'last_action_ok': controller.last_action_ok, 'load_profile': controller.load_profile}
+
+    async def _execute(self, request_id, session_id, method, args, kwargs, settings):
+        if method == 'ping':
+            return self.stats()
+
+        if method == 'create':
+            self.controllers[session_id] = BrowserController(**kwargs)
+            return None
+
+        if method not in REMOTE_METHODS:
+            raise RemoteBrowserError(f"Método não permitido: {method}")
+
+        controller = self.controllers.get(session_id)
+        if controller is None:
+            raise WorkerLostError("Sessão não encontrada no processo de trabalho")
+
+        for name, value in settings.items():
+            setattr(controller, name, value)
+
+        if method == 'close':
+            self.controllers.pop(session_id, None)
+            await controller.close()
+            return None
+
+        if kwargs.pop('remote_replan', False):
+            kwargs['replan'] = self._remote_replan(request_id)
+
+        result = await getattr(controller, method)(*args, **kwargs)
+
+        # O índice fica no processo de trabalho; não vale a pena transferi-lo
+        if method == 'refresh_element_index':
+            return None
+        return result
+
+    def _remote_replan(self, request_id):
+        """Callback de replanejamento executado no processo principal (onde está a IA)"""
+        async def replan(completed, failed_step):
+            callback_id = next(self._callback_ids)
+            future = self.loop.create_future()
+            self.callbacks[callback_id] = future
+            self._send(('callback', request_id, callback_id, (completed, failed_step)))
+            return await future
+        return replan
+
+    def stats(self):
+        """Carga do processo: sessões e memória residente"""
+        rss = None
+        try:
+            with open('/proc/self/statm') as f:
+                rss = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, AttributeError):
+            pass
+        return {'sessions': len(self.controllers), 'rss': rss}
+
+
+class WorkerHandle:
+    """Processo de trabalho visto pelo supervisor"""
+
+    def __init__(self, index):
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.pending = {}
+        self.sessions = set()
+        self.restarts = 0
+        self.started_at = None
+        self.last_ping = None
+        self.last_stats = {}
+        # Chamadas seguidas que estouraram o prazo (driver travado com o loop do processo ainda respondendo)
+        self.call_timeouts = 0
+
+    @property
+    def pid(self):
+        return self.process.pid if self.process else None
+
+    def load(self):
+        """Chave de ordenação para distribuir sessões (menos sessões, depois menos pendências)"""
+        return len(self.sessions), len(self.pending)
+
+
+class BrowserSupervisor:
+    """Distribui sessões entre processos de trabalho, verifica a saúde e reinicia os travados"""
+
+    def __init__(self, workers=2, ping_interval=5, ping_timeout=10, max_call_timeouts=3):
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.max_call_timeouts = max_call_timeouts
+        self.handles = [WorkerHandle(index) for index in range(max(1, workers))]
+
+        self._context = multiprocessing.get_context('spawn')
+        self._request_ids = itertools.count(1)
+        self._session_ids = itertools.count(1)
+        self._loop = None
+        self._health_task = None
+
+    async def start(self):
+        """Inicia os processos e a verificação de saúde"""
+        if self._health_task and not self._health_task.done():
+            return
+
+        self._loop = asyncio.get_running_loop()
+        for handle in self.handles:
+            if not handle.process or not handle.process.is_alive():
+                self._spawn(handle)
+
+        self._health_task = asyncio.ensure_future(self._health_loop())
+
+    def _spawn(self, handle):
+        parent_conn, child_conn = self._context.Pipe()
+        handle.process = self._context.Process(
+            target=_worker_main, args=(child_conn,), name=f'browser-worker-{handle.index}', daemon=True)
+        handle.process.start()
+        child_conn.close()
+
+        handle.conn = parent_conn
+        handle.started_at = time.monotonic()
+        threading.Thread(target=self._reader, args=(handle, parent_conn),
+                         name=f'supervisor-reader-{handle.index}', daemon=True).start()
+
+    def _reader(self, handle, conn):
+        """Lê respostas de um processo de trabalho (thread dedicada)"""
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                return
+            self._loop.call_soon_threadsafe(self._dispatch, handle, conn, message)
+
+    def _dispatch(self, handle, conn, message):
+        # Mensagens de um processo já substituído são descartadas
+        if conn is not handle.conn:
+            return
+
+        kind = message[0]
+        if kind == 'result':
+            _, request_id, ok, value, state = message
+            entry = handle.pending.pop(request_id, None)
+            if entry and not entry[0].done():
+                if ok:
+                    entry[0].set_result((value, state))
+                else:
+                    error_type, error_message = value
+                    error = TimeoutError(error_message) if error_type == 'TimeoutError' else RemoteBrowserError(error_message)
+                    error.state = state
+                    entry[0].set_exception(error)
+        elif kind == 'callback':
+            _, request_id, callback_id, args = message
+            entry = handle.pending.get(request_id)
+            callback = entry[1] if entry else None
+            asyncio.ensure_future(self._run_callback(handle, conn, callback_id, callback, args))
+
+    async def _run_callback(self, handle, conn, callback_id, callback, args):
+        """Executa o callback pedido pelo processo de trabalho e devolve o resultado"""
+        try:
+            if callback is None:
+                raise RemoteBrowserError("Callback indisponível")
+            reply = ('callback_result', callback_id, True, await callback(*args))
+        except Exception as e:
+            reply = ('callback_result', callback_id, False, str(e))
+
+        if conn is handle.conn:
+            try:
+                conn.send(reply)
+            except (EOFError, OSError):
+                pass
+
+    def assign(self):
+        """Escolhe o processo menos carregado para uma nova sessão"""
+        handle = min(self.handles, key=WorkerHandle.load)
+        session_id = next(self._session_ids)
+        handle.sessions.add(session_id)
+        return handle, session_id
+
+    async def call(self, handle, session_id, method, args=(), kwargs=None, settings=None,
+                   callback=None, timeout=None):
+        """Envia uma chamada ao processo de trabalho e aguarda (valor, estado)"""
+        if handle.conn is None or session_id is not None and session_id not in handle.sessions:
+            raise WorkerLostError("Navegador encerrado: o processo de trabalho foi reiniciado. Use `!web` novamente.")
+
+        request_id = next(self._request_ids)
+        future = self._loop.create_future()
+        handle.pending[request_id] = (future, callback)
+
+        try:
+            handle.conn.send(('call', request_id, session_id, method, tuple(args), kwargs or {}, settings or {}))
+            result = await asyncio.wait_for(future, timeout or REMOTE_TIMEOUTS['default'])
+            if method != 'ping':
+                handle.call_timeouts = 0
+            return result
+        except (asyncio.TimeoutError, TimeoutError):
+            # Prazo esgotado aqui ou no processo de trabalho (comando do driver travado)
+            # No Python 3.11+ TimeoutError é subclasse de OSError: não confundir com pipe quebrado
+            if method != 'ping':
+                handle.call_timeouts += 1
+            raise
+        except (EOFError, OSError):
+            raise WorkerLostError("Processo de trabalho indisponível")
+        finally:
+            handle.pending.pop(request_id, None)
+
+    def forget(self, handle, session_id):
+        handle.sessions.discard(session_id)
+
+    async def _health_loop(self):
+        """Verifica periodicamente se cada processo responde dentro do prazo"""
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            await asyncio.gather(*(self._safe_check(handle) for handle in self.handles))
+
+    async def _safe_check(self, handle):
+        """Verifica um processo sem deixar um erro (ex.: no reinício) encerrar o loop de saúde"""
+        try:
+            await self._check(handle)
+        except Exception as e:
+            print(f"Erro ao verificar processo de trabalho {handle.index}: {e}")
+
+    async def _check(self, handle):
+        if not handle.process.is_alive():
+            await self.restart(handle, f"processo encerrado (código {handle.process.exitcode})")
+            return
+
+        # O ping só mostra que o loop do processo responde; chamadas ao driver podem estar travadas
+        if self.max_call_timeouts and handle.call_timeouts >= self.max_call_timeouts:
+            await self.restart(handle, f"{handle.call_timeouts} chamadas seguidas sem resposta do navegador")
+            return
+
+        started = time.monotonic()
+        try:
+            stats, _ = await self.call(handle, None, 'ping', timeout=self.ping_timeout)
+            handle.last_ping = time.monotonic() - started
+            handle.last_stats = stats
+        except asyncio.TimeoutError:
+            await self.restart(handle, f"sem resposta em {self.ping_timeout}s")
+        except Exception as e:
+            await self.restart(handle, str(e))
+
+    async def restart(self, handle, reason):
+        """Mata o processo (e o Chrome dele) e inicia outro; as sessões dele são perdidas"""
+        print(f"Reiniciando processo de trabalho {handle.index} (pid {handle.pid}): {reason}")
+
+        conn, handle.conn = handle.conn, None
+        await self._kill(handle.process)
+        if conn:
+            conn.close()
+
+        lost = WorkerLostError("Navegador encerrado: o processo de trabalho foi reiniciado. Use `!web` novamente.")
+        for future, _ in handle.pending.values():
+            if not future.done():
+                future.set_exception(lost)
+        handle.pending.clear()
+        handle.sessions.clear()
+        handle.last_stats = {}
+        handle.call_timeouts = 0
+        handle.restarts += 1
+
+        self._spawn(handle)
+
+    async def _kill(self, process, grace=2):
+        """Encerra o grupo de processos; força após o prazo de cortesia"""
+        if not process or not process.is_alive():
+            return
+
+        loop = asyncio.get_running_loop()
+        try:
+            if hasattr(os, 'killpg'):
+                os.killpg(process.pid, signal.SIGTERM)
+            else:
+                process.terminate()
+        except (ProcessLookupError, PermissionError):
+            pass
+
+        await loop.run_in_executor(None, process.join, grace)
+        if process.is_alive():
+            try:
+                if hasattr(os, 'killpg'):
+                    os.killpg(process.pid, signal.SIGKILL)
+                else:
+                    process.kill()
+            except (ProcessLookupError, PermissionError):
+                pass
+            await loop.run_in_executor(None, process.join, grace)
+
+    def stats(self):
+        """Carga por processo de trabalho"""
+        return [
+            {
+                'index': handle.index,
+                'pid': handle.pid,
+                'alive': bool(handle.process and handle.process.is_alive()),
+                'sessions': len(handle.sessions),
+                'pending': len(handle.pending),
+                'restarts': handle.restarts,
+                'call_timeouts': handle.call_timeouts,
+                'ping': handle.last_ping,
+                'rss': handle.last_stats.get('rss'),
+            }
+            for handle in self.handles
+        ]
+
+    async def close(self):
+        """Encerra todos os processos"""
+        if self._health_task:
+            self._health_task.cancel()
+
+        for handle in self.handles:
+            if handle.conn:
+                try:
+                    handle.conn.send(('shutdown',))
+                except (EOFError, OSError):
+                    pass
+
+        loop = asyncio.get_running_loop()
+        for handle in self.handles:
+            if handle.process:
+                await loop.run_in_executor(None, handle.process.join, 10)
+                await self._kill(handle.process)
+
+
+class RemoteBrowserController:
+    """BrowserController executado num processo de trabalho, com a mesma interface assíncrona"""
+
+    def __init__(self, supervisor, screenshot_store=None, screenshot_profile=DEFAULT_PROFILE,
+                 input_mode=DEFAULT_INPUT_MODE, headless=False, start_url=START_URL,
+                 load_profile=DEFAULT_LOAD_PROFILE, blocked_domains=(), user_data_dir=None, disk_cache_mb=None,
+                 driver_path=None):
+        self.supervisor = supervisor
+        # Gravação em disco fica no processo principal
+        self.screenshot_store = screenshot_store
+        self.screenshot_profile = screenshot_profile
+        self.input_mode = input_mode
+        self.load_profile = load_profile
+        self.last_action_ok = False
+        # Gravação de macro (os passos ficam no processo de trabalho até pop_recorded_steps)
+        self.recording = False
+
+        self._options = {
+            'screenshot_profile': screenshot_profile,
+            'input_mode': input_mode,
+            'headless': headless,
+            'start_url': start_url,
+            'load_profile': load_profile,
+            'blocked_domains': tuple(blocked_domains),
+            'user_data_dir': user_data_dir,
+            'disk_cache_mb': disk_cache_mb,
+            'driver_path': driver_path,
+        }
+        self.handle = None
+        self.session_id = None
+
+    @property
+    def lost(self):
+        """A sessão deixou de existir porque o processo foi reiniciado"""
+        return self.handle is not None and self.session_id not in self.handle.sessions
+
+    async def _call(self, method, *args, callback=None, **kwargs):
+        if self.handle is None:
+            raise Exception("Navegador não iniciado")
+
+        settings = {name: getattr(self, name) for name in SYNCED_SETTINGS}
+        try:
+            value, state = await self.supervisor.call(
+                self.handle, self.session_id, method, args, kwargs, settings, callback,
+                REMOTE_TIMEOUTS.get(method, REMOTE_TIMEOUTS['default']))
+        except RemoteBrowserError as e:
+            self._apply_state(getattr(e, 'state', None))
+            raise
+
+        self._apply_state(state)
+        return value
+
+    def _apply_state(self, state):
+        if state:
+            self.last_action_ok = state['last_action_ok']
+            self.load_profile = state['load_profile']
+
+    async def start(self):
+        """Cria a sessão no processo menos carregado e inicia o navegador"""
+        self.handle, self.session_id = self.supervisor.assign()
+        try:
+            await self._call('create', **self._options)
+            return await self._call('start')
+        except Exception as e:
+            print(f"Erro ao iniciar navegador remoto: {e}")
+            return False
+
+    async def navigate_to(self, url):
+        return await self._call('navigate_to', url)
+
+    async def click_at(self, x, y):
+        return await self._call('click_at', x, y)
+
+    async def click_element(self, element_id):
+        return await self._call('click_element', element_id)
+
+    async def type_text(self, text, mode=None):
+        return await self._call('type_text', text, mode)
+
+    async def take_screenshot(self, profile=None):
+        shot = await self._call('take_screenshot', profile)
+        if self.screenshot_store:
+            await self.screenshot_store.save(shot.data, shot.extension)
+        return shot
+
+    async def get_page_source(self):
+        return await self._call('get_page_source')
+
+    async def extract_page_content(self):
+        return await self._call('extract_page_content')
+
+    async def refresh_element_index(self):
+        return await self._call('refresh_element_index')
+
+    async def get_debugger_target(self):
+        return await self._call('get_debugger_target')
+
+    async def get_current_url(self):
+        return await self._call('get_current_url')
+
+    async def wait_for_condition(self, condition, timeout=None):
+        return await self._call('wait_for_condition', condition, timeout)
+
+    async def execute_plan(self, steps, replan=None, max_steps=MAX_PLAN_STEPS):
+        return await self._call('execute_plan', steps, max_steps=max_steps,
+                                callback=replan, remote_replan=replan is not None)
+
+    async def execute_ai_action(self, action, replan=None):
+        return await self._call('execute_ai_action', action, callback=replan, remote_replan=replan is not None)
+
+    async def set_load_profile(self, name):
+        return await self._call('set_load_profile', name)
+
+    async def scrape_items(self, selector, start=0, limit=200):
+        return await self._call('scrape_items', selector, start, limit)
+
+    async def guess_item_selector(self):
+        return await self._call('guess_item_selector')
+
+    async def next_page(self):
+        return await self._call('next_page')
+
+    async def scroll_for_more(self):
+        return await self._call('scroll_for_more')
+
+    async def pop_recorded_steps(self):
+        return await self._call('pop_recorded_steps')
+
+    async def memory_usage(self):
+        return await self._call('memory_usage')
+
+    async def snapshot_state(self):
+        return await self._call('snapshot_state')
+
+    async def restore_state(self, state):
+        # Preferências sincronizadas a cada chamada: aplicar também no processo principal
+        self.screenshot_profile = state.get('screenshot_profile', self.screenshot_profile)
+        self.input_mode = state.get('input_mode', self.input_mode)
+        return await self._call('restore_state', state)
+
+    async def close(self):
+        """Fecha o navegador no processo de trabalho"""
+        if self.handle is None:
+            return
+        try:
+            if not self.lost:
+                await self._call('close')
+        finally:
+            self.supervisor.forget(self.handle, self.session_id)
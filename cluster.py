@@ -0,0 +1,175 @@
+import asyncio
+import hmac
+import json
+from browser_pool import BrowserPool
+
+# Comandos que não dependem do navegador da sessão: sempre executados no nó que recebeu a mensagem
+LOCAL_COMMANDS = ('help_web', 'cache', 'stats', 'workers', 'memory', 'nodes')
+
+# Comandos que criam a sessão: vão para o nó menos ocupado quando ela ainda não existe
+SESSION_START_COMMANDS = ('web', 'restore', 'play')
+
+# Tempo máximo para entregar um comando a outro nó
+FORWARD_TIMEOUT = 5
+
+
+class ClusterNode:
+    """Nó de um cluster de processos do bot
+
+    O Discord entrega cada mensagem ao processo do shard do servidor; este nó
+    consulta o registro e, se o navegador da sessão estiver em outro nó (ou se
+    outro nó estiver menos ocupado para uma sessão nova), repassa a mensagem.
+    O nó de destino busca a mensagem pela API e executa o comando localmente.
+    As consultas ao registro (SQLite compartilhado) rodam no executor, fora do loop do gateway.
+    """
+
+    def __init__(self, bot, registry, pool, host='127.0.0.1', port=8765, secret='', heartbeat_interval=10):
+        self.bot = bot
+        self.registry = registry
+        self.pool = pool
+        self.host = host
+        self.port = port
+        self.secret = secret
+        self.heartbeat_interval = heartbeat_interval
+
+        self.forwarded = 0
+        self.received = 0
+        self.forward_failures = 0
+
+        self._server = None
+        self._heartbeat_task = None
+
+    async def start(self):
+        """Abre o endpoint de repasse e começa a anunciar o nó no registro"""
+        if self._server:
+            return
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        await self._registry(self._announce)
+        self._heartbeat_task = asyncio.ensure_future(self._heartbeat_loop())
+
+    async def close(self):
+        """Sai do registro e fecha o endpoint"""
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+        if self._server:
+            self._server.close()
+            self._server = None
+        await self._registry(self.registry.leave)
+
+    async def _registry(self, fn, *args):
+        """Executa uma operação do registro no executor (o backend pode esperar pelo lock do arquivo)"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, fn, *args)
+
+    def _announce(self):
+        self.registry.heartbeat(self.pool.live_count(), keys=list(self.pool.sessions))
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self._registry(self._announce)
+            except Exception as e:
+                print(f"Erro ao anunciar nó no registro: {e}")
+
+    def session_changed(self, key, opened):
+        """Chamado pelo pool ao abrir ou fechar uma sessão (atualiza o registro em segundo plano)"""
+        asyncio.ensure_future(self._update_owner(key, opened))
+
+    async def _update_owner(self, key, opened):
+        try:
+            await self._registry(self.registry.claim if opened else self.registry.release, key)
+        except Exception as e:
+            print(f"Erro ao atualizar registro de sessões: {e}")
+
+    async def route(self, ctx):
+        """Repassa o comando ao nó dono da sessão; retorna True se outro nó vai executá-lo
+
+        Recebe o contexto já interpretado pelo bot, que o reaproveita em bot.invoke se o comando ficar aqui.
+        """
+        if not ctx.valid or ctx.command.name in LOCAL_COMMANDS:
+            return False
+
+        key = BrowserPool.session_key(ctx)
+        if key in self.pool.sessions:
+            return False
+
+        target = await self._registry(self.registry.owner, key)
+        if target is None and ctx.command.name in SESSION_START_COMMANDS:
+            target = await self._registry(self.registry.place)
+
+        if target is None or target['node_id'] == self.registry.node_id:
+            return False
+
+        if await self.forward(target, ctx.message):
+            return True
+
+        # Nó indisponível: a sessão recomeça aqui
+        self.forward_failures += 1
+        print(f"Nó {target['node_id']} não respondeu; executando comando localmente")
+        return False
+
+    async def forward(self, node, message):
+        """Entrega (canal, mensagem) ao endpoint do outro nó"""
+        host, _, port = node['address'].rpartition(':')
+        payload = json.dumps({
+            'secret': self.secret,
+            'channel_id': message.channel.id,
+            'message_id': message.id,
+        }).encode('utf-8') + b'\n'
+
+        writer = None
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(host, int(port)), FORWARD_TIMEOUT)
+            writer.write(payload)
+            await writer.drain()
+            response = await asyncio.wait_for(reader.readline(), FORWARD_TIMEOUT)
+            ok = json.loads(response or b'{}').get('ok', False)
+        except (OSError, ValueError, asyncio.TimeoutError) as e:
+            print(f"Erro ao repassar comando para {node['node_id']}: {e}")
+            ok = False
+        finally:
+            if writer:
+                writer.close()
+
+        if ok:
+            self.forwarded += 1
+        return ok
+
+    async def _handle(self, reader, writer):
+        """Recebe um comando repassado e o executa neste nó"""
+        try:
+            request = json.loads(await asyncio.wait_for(reader.readline(), FORWARD_TIMEOUT))
+            if not hmac.compare_digest(str(request.get('secret', '')), self.secret):
+                writer.write(b'{"ok": false, "error": "unauthorized"}\n')
+                return
+
+            channel = self.bot.get_channel(request['channel_id']) or await self.bot.fetch_channel(request['channel_id'])
+            message = await channel.fetch_message(request['message_id'])
+
+            # Confirmar antes de executar: o comando pode levar minutos
+            writer.write(b'{"ok": true}\n')
+            await writer.drain()
+
+            self.received += 1
+            asyncio.ensure_future(self.bot.process_commands(message))
+        except Exception as e:
+            print(f"Erro ao receber comando repassado: {e}")
+            writer.write(b'{"ok": false}\n')
+        finally:
+            try:
+                await writer.drain()
+            except Exception:
+                pass
+            writer.close()
+
+    async def stats(self):
+        """Nós do cluster e contadores de repasse"""
+        return {
+            'node_id': self.registry.node_id,
+            'nodes': await self._registry(self.registry.stats),
+            'forwarded': self.forwarded,
+            'received': self.received,
+            'forward_failures': self.forward_failures,
+        }
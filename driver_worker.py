@@ -0,0 +1,87 @@
+import asyncio
+import concurrent.futures
+import queue
+import threading
+
+
+class DriverWorker:
+    """Thread dedicada que executa comandos bloqueantes do Selenium em ordem FIFO"""
+
+    def __init__(self, name='driver-worker', default_timeout=30):
+        self.default_timeout = default_timeout
+        self._queue = queue.Queue()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run_loop, name=name, daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        """Consome a fila executando um comando por vez"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            future, fn, args = item
+
+            # Comandos cancelados enquanto estavam na fila são descartados
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                result = fn(*args)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def submit(self, fn, *args):
+        """Enfileira um comando e retorna um concurrent.futures.Future"""
+        if self._stopped:
+            raise Exception("Worker do navegador encerrado")
+
+        future = concurrent.futures.Future()
+        self._queue.put((future, fn, args))
+        return future
+
+    async def run(self, fn, *args, timeout=None):
+        """Executa um comando na thread do navegador e aguarda o resultado sem bloquear o loop"""
+        if timeout is None:
+            timeout = self.default_timeout
+
+        future = self.submit(fn, *args)
+        try:
+            # Cancelar a tarefa ou estourar o tempo cancela o comando se ainda estiver na fila
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"Comando do navegador excedeu {timeout}s")
+
+    def pending(self):
+        """Quantidade de comandos aguardando na fila"""
+        return self._queue.qsize()
+
+    def cancel_pending(self):
+        """Cancela todos os comandos que ainda não começaram a executar"""
+        cancelled = 0
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if item is None:
+                # Preservar o sinal de parada
+                self._queue.put(None)
+                break
+
+            if item[0].cancel():
+                cancelled += 1
+
+        return cancelled
+
+    def stop(self):
+        """Encerra a thread após os comandos já enfileirados"""
+        if self._stopped:
+            return
+        self._stopped = True
+        self._queue.put(None)
@@ -0,0 +1,194 @@
+import re
+
+# Elementos interativos indexados
+INTERACTIVE_SELECTOR = (
+    'a[href], button, input:not([type="hidden"]), textarea, select, '
+    '[role="button"], [role="link"], [role="tab"], [role="menuitem"], [role="searchbox"], '
+    '[onclick], [contenteditable="true"]'
+)
+
+# Script de índice: na primeira chamada em cada documento indexa a página inteira e instala um
+# MutationObserver; nas seguintes retorna só as diferenças acumuladas desde a última coleta.
+INDEX_SCRIPT = """
+const SELECTOR = arguments[0];
+let reset = false;
+
+const describe = (el) => {
+    const rect = el.getBoundingClientRect();
+    const label = el.innerText || el.value || el.getAttribute('aria-label') ||
+        el.getAttribute('placeholder') || el.getAttribute('title') || el.getAttribute('alt') || '';
+    return {
+        id: el.dataset.kkkId,
+        tag: el.tagName.toLowerCase(),
+        role: el.getAttribute('role') || '',
+        type: el.getAttribute('type') || '',
+        name: el.getAttribute('name') || '',
+        placeholder: el.getAttribute('placeholder') || '',
+        text: label.replace(/\\s+/g, ' ').trim().slice(0, 80),
+        href: el.getAttribute('href') || '',
+        visible: rect.width > 0 && rect.height > 0,
+        box: [Math.round(rect.left + window.scrollX), Math.round(rect.top + window.scrollY),
+              Math.round(rect.width), Math.round(rect.height)]
+    };
+};
+
+if (!window.__kkkIndex) {
+    const state = {nextId: 1, pending: new Set(), removed: new Set()};
+
+    const register = (el) => {
+        if (!el.dataset.kkkId) el.dataset.kkkId = String(state.nextId++);
+        state.pending.add(el);
+    };
+
+    const unregister = (el) => {
+        const id = el.dataset && el.dataset.kkkId;
+        if (id && !el.isConnected) {
+            state.removed.add(id);
+            state.pending.delete(el);
+        }
+    };
+
+    document.querySelectorAll(SELECTOR).forEach(register);
+
+    new MutationObserver((mutations) => {
+        for (const mutation of mutations) {
+            const target = mutation.target.nodeType === 1 ? mutation.target : mutation.target.parentElement;
+            const owner = target && target.closest(SELECTOR);
+            if (owner) register(owner);
+
+            for (const node of mutation.addedNodes) {
+                if (node.nodeType !== 1) continue;
+                if (node.matches(SELECTOR)) register(node);
+                node.querySelectorAll(SELECTOR).forEach(register);
+            }
+
+            for (const node of mutation.removedNodes) {
+                if (node.nodeType !== 1) continue;
+                unregister(node);
+                node.querySelectorAll('[data-kkk-id]').forEach(unregister);
+            }
+        }
+    }).observe(document.documentElement, {
+        subtree: true, childList: true, characterData: true, attributes: true,
+        attributeFilter: ['value', 'placeholder', 'aria-label', 'href', 'disabled', 'hidden', 'style', 'class', 'role']
+    });
+
+    window.__kkkIndex = state;
+    reset = true;
+}
+
+const index = window.__kkkIndex;
+const changed = [];
+for (const el of index.pending) {
+    if (el.isConnected) changed.push(describe(el));
+}
+index.pending.clear();
+
+const removed = Array.from(index.removed);
+index.removed.clear();
+
+return {reset: reset, url: location.href, changed: changed, removed: removed};
+"""
+
+# Pistas de campo de busca nos atributos
+SEARCH_HINTS = ('search', 'busca', 'buscar', 'pesquis', 'procur')
+
+
+def normalize_text(text):
+    """Normaliza texto para consulta (minúsculas, espaços simples)"""
+    return re.sub(r'\s+', ' ', (text or '').lower()).strip()
+
+
+class ElementIndex:
+    """Índice dos elementos interativos da página atual, atualizado por diferenças"""
+
+    def __init__(self):
+        self.url = None
+        self.navigations = 0
+        self.elements = {}
+        self._by_text = {}
+
+    @staticmethod
+    def selector_for(element_id):
+        """Seletor CSS estável do elemento"""
+        return f'[data-kkk-id="{element_id}"]'
+
+    def apply(self, diff):
+        """Aplica o resultado do INDEX_SCRIPT; reset indica um documento novo"""
+        if not diff:
+            return
+
+        if diff.get('reset'):
+            self.elements.clear()
+            self._by_text.clear()
+            self.navigations += 1
+
+        self.url = diff.get('url')
+
+        for element_id in diff.get('removed', []):
+            self._remove(element_id)
+
+        for element in diff.get('changed', []):
+            self._remove(element['id'])
+            element['selector'] = self.selector_for(element['id'])
+            self.elements[element['id']] = element
+            key = normalize_text(element['text'])
+            if key:
+                self._by_text.setdefault(key, set()).add(element['id'])
+
+    def _remove(self, element_id):
+        element = self.elements.pop(element_id, None)
+        if not element:
+            return
+
+        key = normalize_text(element['text'])
+        ids = self._by_text.get(key)
+        if ids:
+            ids.discard(element_id)
+            if not ids:
+                del self._by_text[key]
+
+    def get(self, element_id):
+        """Consulta por ID"""
+        return self.elements.get(str(element_id))
+
+    def find_by_text(self, text, visible_only=True):
+        """Consulta por texto exato (normalizado); retorna a lista de elementos"""
+        ids = self._by_text.get(normalize_text(text), ())
+        found = [self.elements[element_id] for element_id in ids]
+        if visible_only:
+            found = [element for element in found if element['visible']]
+        return sorted(found, key=lambda element: int(element['id']))
+
+    def find_search_box(self):
+        """Melhor candidato a campo de busca, ou None"""
+        best = None
+        best_score = 0
+
+        for element in self.elements.values():
+            if not element['visible'] or element['tag'] not in ('input', 'textarea') and element['role'] != 'searchbox':
+                continue
+
+            score = 0
+            if element['type'] == 'search' or element['role'] == 'searchbox':
+                score += 3
+            if element['name'] in ('q', 'query', 'search', 's', 'k'):
+                score += 3
+
+            hints = normalize_text(' '.join((element['name'], element['placeholder'], element['text'])))
+            if any(hint in hints for hint in SEARCH_HINTS):
+                score += 2
+
+            if element['type'] in ('', 'text', 'search'):
+                score += 1
+
+            if score > best_score:
+                best, best_score = element, score
+
+        return best if best_score >= 3 else None
+
+    def visible_elements(self, limit=None):
+        """Elementos visíveis em ordem de criação"""
+        visible = [element for element in self.elements.values() if element['visible']]
+        visible.sort(key=lambda element: int(element['id']))
+        return visible[:limit] if limit else visible
@@ -0,0 +1,107 @@
+import asyncio
+import hashlib
+import random
+import time
+from metrics import tracer
+
+
+def transient_errors():
+    """Erros transitórios que justificam nova tentativa (google.api_core importado sob demanda)"""
+    from google.api_core import exceptions as google_exceptions
+
+    return (
+        google_exceptions.ResourceExhausted,
+        google_exceptions.TooManyRequests,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.InternalServerError,
+        google_exceptions.BadGateway,
+        google_exceptions.GatewayTimeout,
+        google_exceptions.DeadlineExceeded,
+        google_exceptions.Aborted,
+        asyncio.TimeoutError,
+        ConnectionError,
+    )
+
+
+class GeminiClient:
+    """Cliente assíncrono do Gemini com limites de concorrência, prazos e novas tentativas"""
+
+    def __init__(self, model, max_concurrency=8, per_user_concurrency=1, request_timeout=20,
+                 deadline=45, max_retries=3, backoff_base=0.5, backoff_max=8):
+        self.model = model
+        self.transient_errors = transient_errors()
+        self.request_timeout = request_timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.per_user_concurrency = max(1, per_user_concurrency)
+
+        self._global = asyncio.Semaphore(max(1, max_concurrency))
+        # usuário -> [semáforo, referências]
+        self._users = {}
+        # (usuário, chave do pedido) -> tarefa em andamento
+        self._inflight = {}
+
+    @tracer.timed('gemini')
+    async def generate(self, prompt, user_id=None, coalesce_key=None):
+        """Gera a resposta em texto, reaproveitando uma requisição equivalente em andamento
+
+        `coalesce_key` identifica pedidos equivalentes (ex.: mesmo comando na mesma URL); o prompt
+        inclui o texto vivo da página e quase nunca se repete, então o hash dele é só o padrão.
+        """
+        key = (user_id, coalesce_key or hashlib.sha1(prompt.encode('utf-8')).hexdigest())
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._generate_limited(prompt, user_id))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        return await asyncio.shield(task)
+
+    async def _generate_limited(self, prompt, user_id):
+        """Aplica os semáforos por usuário e global"""
+        entry = self._users.setdefault(user_id, [asyncio.Semaphore(self.per_user_concurrency), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                async with self._global:
+                    return await self._generate_with_retry(prompt)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._users.pop(user_id, None)
+
+    async def _generate_with_retry(self, prompt):
+        """Chama o modelo com prazo total e backoff exponencial em erros transitórios"""
+        started = time.monotonic()
+        attempt = 0
+
+        while True:
+            remaining = self.deadline - (time.monotonic() - started)
+            if remaining <= 0:
+                raise TimeoutError(f"Prazo de {self.deadline}s da IA esgotado")
+
+            try:
+                response = await asyncio.wait_for(self._call(prompt), min(self.request_timeout, remaining))
+                return response.text
+            except self.transient_errors as e:
+                if attempt >= self.max_retries:
+                    raise
+
+                delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+                delay *= random.uniform(0.5, 1.0)
+                print(f"Erro transitório na IA ({type(e).__name__}), nova tentativa em {delay:.1f}s")
+
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def _call(self, prompt):
+        """Usa a API assíncrona do SDK, ou uma thread se não estiver disponível"""
+        generate_async = getattr(self.model, 'generate_content_async', None)
+        if generate_async:
+            return await generate_async(prompt)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.model.generate_content, prompt)
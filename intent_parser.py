@@ -0,0 +1,221 @@
+import re
+import unicodedata
+
+# Apelidos de sites populares -> URL
+SITE_ALIASES = {
+    'youtube': 'https://www.youtube.com',
+    'google': 'https://www.google.com',
+    'gmail': 'https://mail.google.com',
+    'facebook': 'https://www.facebook.com',
+    'instagram': 'https://www.instagram.com',
+    'twitter': 'https://x.com',
+    'x': 'https://x.com',
+    'tiktok': 'https://www.tiktok.com',
+    'linkedin': 'https://www.linkedin.com',
+    'reddit': 'https://www.reddit.com',
+    'github': 'https://github.com',
+    'stackoverflow': 'https://stackoverflow.com',
+    'stack overflow': 'https://stackoverflow.com',
+    'wikipedia': 'https://pt.wikipedia.org',
+    'whatsapp': 'https://web.whatsapp.com',
+    'whatsapp web': 'https://web.whatsapp.com',
+    'netflix': 'https://www.netflix.com',
+    'spotify': 'https://open.spotify.com',
+    'twitch': 'https://www.twitch.tv',
+    'amazon': 'https://www.amazon.com.br',
+    'mercado livre': 'https://www.mercadolivre.com.br',
+    'mercadolivre': 'https://www.mercadolivre.com.br',
+    'shopee': 'https://shopee.com.br',
+    'globo': 'https://www.globo.com',
+    'g1': 'https://g1.globo.com',
+    'uol': 'https://www.uol.com.br',
+}
+
+# Confiança mínima para dispensar a IA
+MIN_CONFIDENCE = 0.8
+
+NAVIGATE_PATTERN = re.compile(
+    r'^(?:va|vai|ir|abra|abrir|abre|acesse|acessar|acessa|entre|entrar|entra|navegue|navegar|'
+    r'go to|go|open|visit|navigate to|navigate)'
+    r'(?:\s+(?:para|pra|pro|no|na|em|ao|a|o|to))*'
+    r'(?:\s+(?:site|pagina|page))?'
+    r'(?:\s+(?:do|da|de|o|a|the))?'
+    r'\s+(?P<target>.+)$'
+)
+
+SEARCH_PATTERN = re.compile(
+    r'^(?:pesquise|pesquisar|pesquisa|busque|buscar|busca|procure|procurar|procura|'
+    r'search for|search|look up|google)'
+    r'(?:\s+(?:por|sobre|pelo|pela|for))?'
+    r'\s+(?P<query>.+)$'
+)
+
+SCROLL_PATTERN = re.compile(
+    r'^(?:role|rolar|rola|desca|descer|desce|suba|subir|sobe|scroll)'
+    r'(?:\s+(?:a|the))?(?:\s+(?:pagina|tela|page|screen))?'
+    r'(?:\s+(?:para|pra))?'
+    r'(?:\s+(?P<direction>baixo|cima|down|up))?'
+    r'(?:\s+(?P<pixels>\d+)\s*(?:px|pixels?)?)?$'
+)
+
+TYPE_PATTERN = re.compile(
+    r'^(?:digite|digitar|digita|escreva|escrever|escreve|type|write)\s+(?P<text>.+)$'
+)
+
+CLICK_COORDS_PATTERN = re.compile(
+    r'^(?:clique|clicar|clica|click)(?:\s+(?:em|no|na|at|on))?\s+\(?(?P<x>\d+)\s*[, ]\s*(?P<y>\d+)\)?$'
+)
+
+CLICK_CENTER_PATTERN = re.compile(
+    r'^(?:clique|clicar|clica|click)(?:\s+(?:em|no|na|at|on|in))?\s+(?:o\s+|the\s+)?'
+    r'(?:meio|centro|middle|center)(?:\s+(?:da|of the|of))?(?:\s+(?:tela|pagina|screen|page))?$'
+)
+
+# Comandos com várias etapas ou que descrevem um elemento da página ficam para a IA
+SEQUENCE_PATTERN = re.compile(r'\b(?:e|and|depois|then|entao|então|em seguida|after that)\b')
+ACTION_VERB_PATTERN = re.compile(
+    r'\b(?:va|vai|abra|abrir|abre|acesse|acessar|navegue|pesquise|pesquisar|busque|buscar|procure|procurar|'
+    r'role|rolar|desca|suba|digite|digitar|escreva|clique|clicar|clica|aperte|apertar|pressione|feche|fechar|'
+    r'go|open|visit|navigate|search|scroll|type|write|click|press|close)\b'
+)
+DESCRIPTIVE_QUERY_PATTERN = re.compile(
+    r'^(?:(?:o|a|os|as|um|uma|the|a|an)\s+)?(?:botao|botoes|link|links|campo|menu|icone|opcao|aba|'
+    r'button|buttons|field|icon|option|tab)\b'
+)
+QUOTED_PATTERN = re.compile(r'"[^"]*"|\'[^\']*\'')
+COMPOUND_CONFIDENCE = 0.4
+
+URL_LIKE = re.compile(r'^(?:https?://)?[\w-]+(?:\.[\w-]+)+(?:[/?#]\S*)?$')
+
+# Direções de rolagem implícitas no verbo
+UP_VERBS = ('suba', 'subir', 'sobe')
+
+
+def _fold(text):
+    """Remove acentos preservando o comprimento (para fatiar o texto original)"""
+    return ''.join(unicodedata.normalize('NFD', char)[0] for char in text)
+
+
+class IntentParser:
+    """Interpretador determinístico de comandos comuns em português e inglês"""
+
+    def __init__(self, aliases=None, screen_size=(1920, 1080)):
+        self.aliases = dict(SITE_ALIASES)
+        if aliases:
+            self.aliases.update(aliases)
+        self.screen_size = screen_size
+
+        self.hits = 0
+        self.misses = 0
+
+    def parse(self, command):
+        """Retorna (ação, confiança); ação é None quando o comando não é reconhecido"""
+        original = re.sub(r'\s+', ' ', command.strip()).rstrip('.!?')
+        folded = _fold(original).lower()
+
+        for handler in (self._parse_scroll, self._parse_search, self._parse_type,
+                        self._parse_click, self._parse_navigate):
+            result = handler(original, folded)
+            if result:
+                action, confidence = result
+                if self._is_compound(original, folded):
+                    confidence = min(confidence, COMPOUND_CONFIDENCE)
+                return action, confidence
+
+        return None, 0.0
+
+    @staticmethod
+    def _is_compound(original, folded):
+        """Várias ações encadeadas (conjunções ou mais de um verbo), ignorando textos entre aspas"""
+        # A conjunção é procurada no texto com acentos: 'é' não pode virar 'e'
+        text = QUOTED_PATTERN.sub(' ', original.lower())
+        if SEQUENCE_PATTERN.search(text):
+            return True
+        return len(ACTION_VERB_PATTERN.findall(QUOTED_PATTERN.sub(' ', folded))) > 1
+
+    def resolve(self, command, min_confidence=MIN_CONFIDENCE):
+        """Retorna a ação se a confiança for suficiente, senão None"""
+        action, confidence = self.parse(command)
+        if action and confidence >= min_confidence:
+            self.hits += 1
+            return action
+
+        self.misses += 1
+        return None
+
+    def _parse_navigate(self, original, folded):
+        match = NAVIGATE_PATTERN.match(folded)
+        if not match:
+            return None
+
+        target = folded[match.start('target'):].strip()
+        if target in self.aliases:
+            return {'type': 'navigate', 'url': self.aliases[target]}, 1.0
+
+        raw_target = original[match.start('target'):].strip()
+        if URL_LIKE.match(raw_target):
+            url = raw_target if raw_target.startswith(('http://', 'https://')) else 'https://' + raw_target
+            return {'type': 'navigate', 'url': url}, 0.95
+
+        # Nome desconhecido de uma palavra: palpite de baixa confiança
+        if re.fullmatch(r'[a-z0-9-]+', target):
+            return {'type': 'navigate', 'url': f'https://www.{target}.com'}, 0.5
+
+        return None
+
+    def _parse_search(self, original, folded):
+        match = SEARCH_PATTERN.match(folded)
+        if not match:
+            return None
+
+        query = original[match.start('query'):].strip().strip('"\'')
+        if not query:
+            return None
+
+        # 'procure o botão de login' descreve um elemento da página, não uma busca
+        if DESCRIPTIVE_QUERY_PATTERN.match(folded[match.start('query'):]):
+            return {'type': 'search', 'query': query}, COMPOUND_CONFIDENCE
+
+        return {'type': 'search', 'query': query}, 0.95
+
+    def _parse_scroll(self, original, folded):
+        match = SCROLL_PATTERN.match(folded)
+        if not match:
+            return None
+
+        direction = match.group('direction')
+        if direction in ('cima', 'up') or (direction is None and folded.startswith(UP_VERBS)):
+            direction = 'up'
+        else:
+            direction = 'down'
+
+        pixels = int(match.group('pixels')) if match.group('pixels') else 500
+        return {'type': 'scroll', 'direction': direction, 'pixels': pixels}, 0.95
+
+    def _parse_type(self, original, folded):
+        match = TYPE_PATTERN.match(folded)
+        if not match:
+            return None
+
+        text = original[match.start('text'):].strip().strip('"\'')
+        return {'type': 'type', 'text': text}, 0.95
+
+    def _parse_click(self, original, folded):
+        match = CLICK_COORDS_PATTERN.match(folded)
+        if match:
+            return {'type': 'click', 'x': int(match.group('x')), 'y': int(match.group('y'))}, 0.95
+
+        if CLICK_CENTER_PATTERN.match(folded):
+            width, height = self.screen_size
+            return {'type': 'click', 'x': width // 2, 'y': height // 2}, 0.9
+
+        return None
+
+    def stats(self):
+        """Contadores de comandos resolvidos localmente"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
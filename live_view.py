@@ -0,0 +1,269 @@
+import aiohttp
+import asyncio
+import base64
+import io
+import itertools
+import time
+import discord
+from screenshot_pipeline import FrameTracker, screenshot_from_encoded
+
+
+class CDPSession:
+    """Cliente mínimo do Chrome DevTools Protocol via WebSocket"""
+
+    def __init__(self):
+        self._http = None
+        self._ws = None
+        self._reader = None
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._handlers = {}
+
+    async def connect(self, debugger_address, target_id=None):
+        """Conecta à aba target_id (ou à primeira aba, sem target_id) do navegador exposto em debugger_address"""
+        self._http = aiohttp.ClientSession()
+        async with self._http.get(f'http://{debugger_address}/json/list') as response:
+            targets = await response.json(content_type=None)
+
+        pages = [target for target in targets if target.get('type') == 'page']
+        if target_id:
+            # Nunca transmitir outra aba (pode ser de outra sessão no mesmo navegador)
+            pages = [target for target in pages if target.get('id') == target_id]
+            if not pages:
+                raise Exception("Aba da sessão não encontrada para transmissão")
+        if not pages:
+            raise Exception("Nenhuma aba encontrada para transmissão")
+
+        self._ws = await self._http.ws_connect(pages[0]['webSocketDebuggerUrl'], max_msg_size=0)
+        self._reader = asyncio.ensure_future(self._read_loop())
+
+    def on(self, method, callback):
+        """Registra callback (corrotina) para um evento CDP"""
+        self._handlers[method] = callback
+
+    async def send(self, method, params=None, timeout=10):
+        """Envia um comando e aguarda a resposta"""
+        message_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[message_id] = future
+
+        await self._ws.send_json({'id': message_id, 'method': method, 'params': params or {}})
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(message_id, None)
+
+    async def _read_loop(self):
+        """Distribui respostas e eventos recebidos"""
+        async for message in self._ws:
+            if message.type != aiohttp.WSMsgType.TEXT:
+                break
+
+            data = message.json()
+            if 'id' in data:
+                future = self._pending.get(data['id'])
+                if future and not future.done():
+                    if 'error' in data:
+                        future.set_exception(Exception(data['error'].get('message', 'Erro CDP')))
+                    else:
+                        future.set_result(data.get('result', {}))
+            else:
+                handler = self._handlers.get(data.get('method'))
+                if handler:
+                    asyncio.ensure_future(handler(data.get('params', {})))
+
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(Exception("Conexão CDP encerrada"))
+
+    async def close(self):
+        """Fecha a conexão"""
+        if self._reader:
+            self._reader.cancel()
+        if self._ws:
+            await self._ws.close()
+        if self._http:
+            await self._http.close()
+
+
+class LiveView:
+    """Transmite a tela via Page.startScreencast editando uma única mensagem do Discord"""
+
+    def __init__(self, browser_controller, max_size=(960, 540), quality=60,
+                 min_interval=1.0, max_interval=8.0, max_duration=300, outbound=None):
+        self.browser_controller = browser_controller
+        # OutboundScheduler: envios e edições dividem o limite de taxa do canal com as demais mensagens
+        self.outbound = outbound
+        self.max_size = max_size
+        self.quality = quality
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_duration = max_duration
+
+        self.interval = min_interval
+        self.channel = None
+        self.message = None
+        self.frames_received = 0
+        self.frames_sent = 0
+        self.frames_dropped = 0
+
+        self._cdp = None
+        self._task = None
+        self._latest = None
+        self._last_image = None
+        self._frame_ready = asyncio.Event()
+        self._tracker = FrameTracker(max_channels=1)
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    async def start(self, channel):
+        """Envia a mensagem inicial e começa a transmissão"""
+        address, target_id = await self.browser_controller.get_debugger_target()
+        if not address:
+            raise Exception("Endereço de depuração do navegador indisponível")
+
+        self.channel = channel
+        self._cdp = CDPSession()
+        try:
+            await self._cdp.connect(address, target_id)
+            self._cdp.on('Page.screencastFrame', self._on_frame)
+
+            self.message = await self._send(embed=self._embed("🔴 Ao vivo: iniciando..."))
+
+            await self._cdp.send('Page.startScreencast', {
+                'format': 'jpeg',
+                'quality': self.quality,
+                'maxWidth': self.max_size[0],
+                'maxHeight': self.max_size[1],
+            })
+        except Exception:
+            # Não deixar a conexão CDP (e a sessão aiohttp) aberta
+            cdp, self._cdp = self._cdp, None
+            await cdp.close()
+            raise
+
+        self._task = asyncio.ensure_future(self._render_loop())
+
+    async def _send(self, **kwargs):
+        """Envia pelo agendador de mensagens, se houver"""
+        if self.outbound:
+            return await self.outbound.send(self.channel, **kwargs)
+        return await self.channel.send(**kwargs)
+
+    async def _edit(self, **kwargs):
+        """Edita a mensagem da transmissão pelo agendador de mensagens, se houver"""
+        if self.outbound:
+            return await self.outbound.edit(self.channel, self.message, **kwargs)
+        return await self.message.edit(**kwargs)
+
+    async def _on_frame(self, params):
+        """Guarda apenas o frame mais recente e confirma o recebimento"""
+        if self._latest is not None:
+            self.frames_dropped += 1
+
+        self.frames_received += 1
+        self._latest = params['data']
+        self._frame_ready.set()
+
+        try:
+            await self._cdp.send('Page.screencastFrameAck', {'sessionId': params['sessionId']})
+        except Exception:
+            pass
+
+    async def _render_loop(self):
+        """Decodifica, descarta frames iguais e edita a mensagem respeitando o intervalo adaptativo"""
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+
+        try:
+            while True:
+                remaining = self.max_duration - (time.monotonic() - started)
+                if remaining <= 0:
+                    break
+
+                try:
+                    await asyncio.wait_for(self._frame_ready.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                self._frame_ready.clear()
+
+                data, self._latest = self._latest, None
+                if data is None:
+                    continue
+
+                shot = await loop.run_in_executor(None, self._decode, data)
+                mode, _ = self._tracker.compare('live', shot)
+                if mode == 'unchanged':
+                    self.frames_dropped += 1
+                    continue
+
+                sent_at = time.monotonic()
+                try:
+                    await self._edit(
+                        embed=self._embed("🔴 Ao vivo", image=shot.filename),
+                        attachments=[discord.File(io.BytesIO(shot.data), shot.filename)]
+                    )
+                    self._tracker.update('live', shot)
+                    self._last_image = shot.filename
+                    self.frames_sent += 1
+                except discord.HTTPException as e:
+                    if e.status != 429:
+                        raise
+                    # Limite de taxa atingido: reduzir a frequência
+                    self.interval = min(self.max_interval, self.interval * 2)
+
+                # Intervalo adaptativo: se a edição demorou (fila de rate limit), desacelerar
+                elapsed = time.monotonic() - sent_at
+                if elapsed > self.interval:
+                    self.interval = min(self.max_interval, self.interval * 1.5)
+                else:
+                    self.interval = max(self.min_interval, self.interval * 0.9)
+
+                await asyncio.sleep(max(0.0, self.interval - elapsed))
+        finally:
+            await self._shutdown()
+
+    def _decode(self, data):
+        """Decodifica o frame base64 (executado fora do loop)"""
+        return screenshot_from_encoded(base64.b64decode(data), 'JPEG')
+
+    def _embed(self, title, image=None):
+        """Embed da transmissão"""
+        embed = discord.Embed(title=title, color=0xff0000)
+        embed.set_footer(text=f"Frames enviados: {self.frames_sent} · descartados: {self.frames_dropped} · "
+                              f"intervalo: {self.interval:.1f}s")
+        if image:
+            embed.set_image(url=f"attachment://{image}")
+        return embed
+
+    async def stop(self):
+        """Encerra a transmissão"""
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        else:
+            await self._shutdown()
+
+    async def _shutdown(self):
+        """Para o screencast e fecha a conexão CDP"""
+        cdp, self._cdp = self._cdp, None
+        if cdp is None:
+            return
+
+        try:
+            await cdp.send('Page.stopScreencast', timeout=3)
+        except Exception:
+            pass
+        await cdp.close()
+
+        if self.message:
+            try:
+                # Manter o último frame na mensagem
+                await self._edit(embed=self._embed("⏹️ Transmissão encerrada", image=self._last_image))
+            except discord.HTTPException:
+                pass
@@ -0,0 +1,53 @@
+# Perfis de carregamento de página: o que o navegador baixa e o tamanho da janela
+LOAD_PROFILES = {
+    # Página completa, como um navegador comum
+    'full': {
+        'block_resources': False,
+        'block_domains': False,
+        'viewport': (1920, 1080),
+        'maximize': True,
+    },
+    # Só o necessário para comandos baseados em texto: sem imagens, mídia, fontes e rastreadores
+    'lean': {
+        'block_resources': True,
+        'block_domains': True,
+        'viewport': (1280, 720),
+        'maximize': False,
+    },
+}
+
+DEFAULT_LOAD_PROFILE = 'full'
+
+# Extensões de recursos pesados (Network.setBlockedURLs aceita padrões com '*', não tipos de recurso)
+BLOCKED_EXTENSIONS = (
+    'png', 'jpg', 'jpeg', 'gif', 'webp', 'avif', 'bmp', 'ico',
+    'woff', 'woff2', 'ttf', 'otf', 'eot',
+    'mp4', 'webm', 'm4v', 'mov', 'mp3', 'm4a', 'ogg', 'wav', 'm3u8',
+)
+
+# Anúncios e rastreadores
+BLOCKED_DOMAINS = (
+    'doubleclick.net', 'googlesyndication.com', 'googleadservices.com', 'adservice.google.com',
+    'google-analytics.com', 'googletagmanager.com', 'googletagservices.com',
+    'connect.facebook.net', 'amazon-adsystem.com', 'adnxs.com', 'criteo.com', 'criteo.net',
+    'taboola.com', 'outbrain.com', 'scorecardresearch.com', 'hotjar.com', 'quantserve.com',
+    'moatads.com', 'pubmatic.com', 'rubiconproject.com', 'casalemedia.com', 'hs-analytics.net',
+)
+
+
+def blocked_url_patterns(profile_name, extra_domains=()):
+    """Padrões para Network.setBlockedURLs conforme o perfil"""
+    profile = LOAD_PROFILES[profile_name]
+    patterns = []
+
+    if profile['block_resources']:
+        for extension in BLOCKED_EXTENSIONS:
+            patterns.append(f'*.{extension}')
+            patterns.append(f'*.{extension}?*')
+
+    if profile['block_domains']:
+        for domain in BLOCKED_DOMAINS + tuple(extra_domains):
+            patterns.append(f'*://{domain}/*')
+            patterns.append(f'*.{domain}/*')
+
+    return patterns
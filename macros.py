@@ -0,0 +1,118 @@
+import time
+
+# Limite de passos de uma macro (gravação e reprodução)
+MAX_MACRO_STEPS = 100
+
+# Ações aceitas numa macro (as mesmas de _execute_step do BrowserController)
+MACRO_ACTIONS = ('navigate', 'click', 'type', 'search', 'scroll')
+
+# Seletor CSS que identifica o elemento sem o data-kkk-id do índice (os IDs mudam a cada carregamento)
+STABLE_SELECTOR_SCRIPT = """
+const el = document.querySelector(arguments[0]);
+if (!el) return null;
+
+const unique = (selector) => {
+    try { return document.querySelectorAll(selector).length === 1 && document.querySelector(selector) === el; }
+    catch (e) { return false; }
+};
+const quote = (value) => '"' + value.replace(/["\\\\]/g, '\\\\$&') + '"';
+const tag = el.tagName.toLowerCase();
+
+if (el.id && unique('#' + CSS.escape(el.id))) return '#' + CSS.escape(el.id);
+for (const attribute of ['name', 'aria-label', 'data-testid', 'placeholder', 'title']) {
+    const value = el.getAttribute(attribute);
+    if (value && unique(tag + '[' + attribute + '=' + quote(value) + ']')) {
+        return tag + '[' + attribute + '=' + quote(value) + ']';
+    }
+}
+const href = el.getAttribute('href');
+if (href && !href.startsWith('javascript:') && unique('a[href=' + quote(href) + ']')) {
+    return 'a[href=' + quote(href) + ']';
+}
+
+// Caminho por posição entre irmãos até um ancestral com id (ou o body)
+const path = [];
+let node = el;
+while (node && node !== document.body && node.parentElement) {
+    if (node.id && node !== el) {
+        path.unshift('#' + CSS.escape(node.id));
+        break;
+    }
+    let index = 1;
+    for (let sibling = node.previousElementSibling; sibling; sibling = sibling.previousElementSibling) {
+        if (sibling.tagName === node.tagName) index++;
+    }
+    path.unshift(node.tagName.toLowerCase() + ':nth-of-type(' + index + ')');
+    node = node.parentElement;
+}
+if (!path.length || !path[0].startsWith('#')) path.unshift('body');
+return path.join(' > ');
+"""
+
+
+class MacroRecorder:
+    """Gravações em andamento por sessão: ações já resolvidas, prontas para reproduzir sem a IA"""
+
+    def __init__(self, max_steps=MAX_MACRO_STEPS):
+        self.max_steps = max_steps
+        # chave da sessão -> {'name', 'steps', 'truncated'}
+        self.recordings = {}
+
+    def start(self, key, name):
+        """Começa (ou recomeça) a gravação da sessão"""
+        self.recordings[key] = {'name': name, 'steps': [], 'truncated': False}
+
+    def is_recording(self, key):
+        return key in self.recordings
+
+    def record(self, key, *steps):
+        """Acrescenta passos executados com sucesso; retorna False se a gravação atingiu o limite"""
+        recording = self.recordings.get(key)
+        if recording is None:
+            return False
+
+        for step in steps:
+            if len(recording['steps']) >= self.max_steps:
+                recording['truncated'] = True
+                return False
+            if step.get('type') in MACRO_ACTIONS:
+                recording['steps'].append(dict(step))
+        return True
+
+    def stop(self, key):
+        """Encerra a gravação e retorna a macro ({'name', 'steps', 'truncated', 'created_at'}) ou None"""
+        recording = self.recordings.pop(key, None)
+        if recording is None:
+            return None
+        return dict(recording, created_at=time.time())
+
+    def stats(self):
+        return {'recording': len(self.recordings)}
+
+
+def portable_step(action, selector=None):
+    """Cópia da ação para a macro: o elemento do índice vira um seletor CSS estável"""
+    step = {name: value for name, value in action.items() if name != 'element_id'}
+    if action.get('element_id') is not None:
+        if not selector:
+            return None
+        step['selector'] = selector
+    return step
+
+
+async def play_macro(controller, steps, start_url=None):
+    """Reproduz a macro em sequência (esperas de prontidão entre passos, sem IA) e captura um único screenshot
+
+    `start_url` leva sessões novas à página de origem quando a macro não começa navegando.
+    Retorna (ok, resultado, screenshot, segundos).
+    """
+    started = time.perf_counter()
+    steps = [step for step in steps if step.get('type') in MACRO_ACTIONS]
+
+    if start_url and steps and steps[0].get('type') != 'navigate':
+        steps.insert(0, {'type': 'navigate', 'url': start_url})
+
+    result = await controller.execute_plan(steps, max_steps=MAX_MACRO_STEPS + 1)
+    ok = controller.last_action_ok
+    screenshot = await controller.take_screenshot()
+    return ok, result, screenshot, time.perf_counter() - started
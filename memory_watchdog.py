@@ -0,0 +1,161 @@
+import asyncio
+import os
+import signal
+
+MB = 2 ** 20
+
+
+def process_tree(pid):
+    """PIDs do processo e de seus descendentes via /proc (somente Linux)"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    pids = []
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        pids.append(current)
+        stack.extend(children.get(current, []))
+    return pids
+
+
+def process_tree_rss(pid):
+    """RSS total (bytes) do processo e seus descendentes via /proc (somente Linux)"""
+    if not pid or not os.path.isdir('/proc'):
+        return None
+
+    total = 0
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    for current in process_tree(pid):
+        try:
+            with open(f'/proc/{current}/statm') as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, ValueError, IndexError):
+            pass
+
+    return total
+
+
+def kill_process_tree(pid):
+    """Encerra à força o processo e seus descendentes (ex.: Chrome que não fechou); retorna quantos"""
+    if not pid:
+        return 0
+
+    # Sem /proc só o próprio processo é conhecido
+    pids = process_tree(pid) if os.path.isdir('/proc') else [pid]
+    killed = 0
+    # Filhos primeiro: o pai morto primeiro deixaria os filhos órfãos com outro ppid
+    for current in reversed(pids):
+        try:
+            os.kill(current, signal.SIGKILL)
+            killed += 1
+        except (OSError, AttributeError):
+            pass
+    return killed
+
+
+class MemoryWatchdog:
+    """Amostra a memória de cada sessão e recicla os navegadores que passam do limite
+
+    A reciclagem só acontece entre comandos: sessões ocupadas ficam marcadas
+    e são recicladas numa verificação seguinte.
+    """
+
+    def __init__(self, pool, rss_limit_mb=1500, heap_limit_mb=512, interval=60, is_busy=None):
+        self.pool = pool
+        self.rss_limit = rss_limit_mb * MB if rss_limit_mb else None
+        self.heap_limit = heap_limit_mb * MB if heap_limit_mb else None
+        self.interval = interval
+        # Verificação extra de uso (ex.: transmissão ao vivo ativa)
+        self.is_busy = is_busy
+
+        self.samples = 0
+        self.recycles = 0
+        self.failures = 0
+        self._task = None
+
+    def start(self):
+        """Inicia a verificação periódica em segundo plano"""
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.ensure_future(self._loop())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception as e:
+                print(f"Erro no monitor de memória: {e}")
+
+    def over_limit(self, usage):
+        """Motivo da reciclagem ou None se a sessão está dentro dos limites"""
+        if not usage:
+            return None
+        if self.rss_limit and usage.get('rss') and usage['rss'] > self.rss_limit:
+            return f"RSS {usage['rss'] / MB:.0f} MB"
+        if self.heap_limit and usage.get('js_heap') and usage['js_heap'] > self.heap_limit:
+            return f"heap JS {usage['js_heap'] / MB:.0f} MB"
+        return None
+
+    async def check(self):
+        """Amostra todas as sessões e recicla as marcadas que estiverem livres"""
+        recycled = 0
+
+        for key, session in list(self.pool.sessions.items()):
+            if session.recycle_reason is None:
+                try:
+                    session.memory = await session.controller.memory_usage()
+                except Exception as e:
+                    print(f"Erro ao medir memória da sessão {key}: {e}")
+                    continue
+
+                self.samples += 1
+                session.recycle_reason = self.over_limit(session.memory)
+                if session.recycle_reason is None:
+                    continue
+
+            if session.active or (self.is_busy and self.is_busy(key)):
+                continue
+
+            print(f"Sessão {key} acima do limite de memória ({session.recycle_reason}): reciclando navegador")
+            if await self.pool.recycle(key):
+                self.recycles += 1
+                recycled += 1
+            else:
+                self.failures += 1
+
+        return recycled
+
+    def stats(self):
+        """Uso de memória por sessão e contadores de reciclagem"""
+        sessions = []
+        for key, session in self.pool.sessions.items():
+            usage = session.memory or {}
+            sessions.append({
+                'key': key,
+                'rss': usage.get('rss'),
+                'js_heap': usage.get('js_heap'),
+                'recycles': session.recycles,
+                'pending': session.recycle_reason is not None,
+            })
+
+        return {
+            'samples': self.samples,
+            'recycles': self.recycles,
+            'failures': self.failures,
+            'sessions': sessions,
+        }
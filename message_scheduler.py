@@ -0,0 +1,213 @@
+import asyncio
+import itertools
+import time
+import discord
+
+# Prioridades: resultados finais passam na frente das notas de progresso
+PRIORITY_FINAL = 0
+PRIORITY_PROGRESS = 1
+
+
+class TokenBucket:
+    """Balde de fichas: `rate` envios por segundo com rajadas de até `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Aguarda até haver uma ficha disponível"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def penalize(self, retry_after):
+        """Esvazia o balde após um 429 para respeitar o retry_after"""
+        self.tokens = -retry_after * self.rate
+        self.updated = time.monotonic()
+
+
+class _Outbound:
+    """Item da fila de saída"""
+
+    def __init__(self, kind, key, kwargs, future=None, generation=0, message=None):
+        self.kind = kind
+        self.key = key
+        # Mensagem a editar (kind 'edit')
+        self.message = message
+        self.kwargs = kwargs
+        self.future = future
+        self.cancelled = False
+        # Geração do progresso da sessão quando o item foi criado
+        self.generation = generation
+
+
+class _ChannelState:
+    """Fila, balde e mensagens de status de um canal"""
+
+    def __init__(self, channel, bucket):
+        self.channel = channel
+        self.bucket = bucket
+        self.queue = asyncio.PriorityQueue()
+        self.worker = None
+        # chave da sessão -> mensagem de status já enviada
+        self.status = {}
+        # chave da sessão -> nota de progresso ainda na fila
+        self.pending_progress = {}
+        # chave da sessão -> geração do progresso (avança a cada finish)
+        self.generations = {}
+
+
+class OutboundScheduler:
+    """Agendador central de mensagens do Discord com baldes por canal, prioridade e coalescência"""
+
+    def __init__(self, channel_rate=1.0, channel_burst=5, global_rate=40.0, idle_timeout=60):
+        self.channel_rate = channel_rate
+        self.channel_burst = channel_burst
+        self.idle_timeout = idle_timeout
+
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self._channels = {}
+        self._sequence = itertools.count()
+
+        self.sent = 0
+        self.edits = 0
+        self.coalesced = 0
+        self.rate_limited = 0
+
+    def _state(self, channel):
+        """Obtém (ou cria) o estado do canal e garante que o worker está rodando"""
+        state = self._channels.get(channel.id)
+        if state is None:
+            state = _ChannelState(channel, TokenBucket(self.channel_rate, self.channel_burst))
+            self._channels[channel.id] = state
+
+        if state.worker is None or state.worker.done():
+            state.worker = asyncio.ensure_future(self._worker(state))
+
+        return state
+
+    async def send(self, channel, priority=PRIORITY_FINAL, **kwargs):
+        """Enfileira uma mensagem e aguarda o envio, retornando a discord.Message"""
+        future = asyncio.get_running_loop().create_future()
+        state = self._state(channel)
+        state.queue.put_nowait((priority, next(self._sequence), _Outbound('send', None, kwargs, future)))
+        return await future
+
+    async def edit(self, channel, message, priority=PRIORITY_PROGRESS, **kwargs):
+        """Enfileira a edição de uma mensagem já enviada (ex.: frames da transmissão ao vivo) e aguarda"""
+        future = asyncio.get_running_loop().create_future()
+        state = self._state(channel)
+        state.queue.put_nowait((priority, next(self._sequence), _Outbound('edit', None, kwargs, future, message=message)))
+        return await future
+
+    def progress(self, channel, key, content):
+        """Nota de progresso: substitui a anterior ainda na fila ou edita a mensagem de status"""
+        state = self._state(channel)
+
+        pending = state.pending_progress.get(key)
+        if pending:
+            pending.kwargs['content'] = content
+            self.coalesced += 1
+            return
+
+        item = _Outbound('progress', key, {'content': content}, generation=state.generations.get(key, 0))
+        state.pending_progress[key] = item
+        state.queue.put_nowait((PRIORITY_PROGRESS, next(self._sequence), item))
+
+    def finish(self, channel, key):
+        """Encerra o progresso da sessão: notas ainda não enviadas são descartadas"""
+        state = self._channels.get(channel.id)
+        if state is None:
+            return
+
+        pending = state.pending_progress.pop(key, None)
+        if pending:
+            pending.cancelled = True
+            self.coalesced += 1
+
+        state.status.pop(key, None)
+        # Uma nota já em envio pertence ao comando encerrado e não deve virar o status do próximo
+        state.generations[key] = state.generations.get(key, 0) + 1
+
+    async def _worker(self, state):
+        """Envia os itens do canal em ordem de prioridade"""
+        while True:
+            try:
+                _, _, item = await asyncio.wait_for(state.queue.get(), self.idle_timeout)
+            except asyncio.TimeoutError:
+                if state.queue.empty() and not state.status:
+                    self._channels.pop(state.channel.id, None)
+                return
+
+            if item.cancelled:
+                continue
+
+            if item.kind == 'progress':
+                state.pending_progress.pop(item.key, None)
+
+            try:
+                result = await self._deliver(state, item)
+            except Exception as e:
+                if item.future and not item.future.done():
+                    item.future.set_exception(e)
+                else:
+                    print(f"Erro ao enviar mensagem de progresso: {e}")
+                continue
+
+            if item.future and not item.future.done():
+                item.future.set_result(result)
+
+    async def _deliver(self, state, item):
+        """Envia ou edita respeitando os baldes do canal e global"""
+        await state.bucket.acquire()
+        await self.global_bucket.acquire()
+
+        try:
+            if item.kind == 'edit':
+                self.edits += 1
+                return await item.message.edit(**item.kwargs)
+
+            if item.kind == 'progress':
+                message = state.status.get(item.key)
+                if message:
+                    self.edits += 1
+                    return await message.edit(**item.kwargs)
+
+                message = await state.channel.send(**item.kwargs)
+                if state.generations.get(item.key, 0) == item.generation:
+                    state.status[item.key] = message
+                self.sent += 1
+                return message
+
+            self.sent += 1
+            return await state.channel.send(**item.kwargs)
+
+        except discord.HTTPException as e:
+            if e.status == 429:
+                self.rate_limited += 1
+                retry_after = getattr(e, 'retry_after', None) or 1.0
+                state.bucket.penalize(retry_after)
+            raise
+
+    def stats(self):
+        """Contadores do agendador"""
+        return {
+            'sent': self.sent,
+            'edits': self.edits,
+            'coalesced': self.coalesced,
+            'rate_limited': self.rate_limited,
+            'channels': len(self._channels),
+            'queued': sum(state.queue.qsize() for state in self._channels.values()),
+        }
@@ -0,0 +1,180 @@
+import asyncio
+import contextlib
+import contextvars
+import functools
+import math
+import os
+import threading
+import time
+
+# Comando em execução na tarefa atual (rótulo dos spans)
+current_command = contextvars.ContextVar('current_command', default='-')
+
+PERCENTILES = (50, 95, 99)
+
+
+class LatencyHistogram:
+    """Histograma log-linear no estilo HDR: memória fixa e erro relativo de ~1/sub_buckets"""
+
+    def __init__(self, min_value=1e-5, max_value=600.0, sub_buckets=16):
+        self.min_value = min_value
+        self.max_value = max_value
+        self._log_growth = math.log(2) / sub_buckets
+        self.counts = [0] * (int(math.log(max_value / min_value) / self._log_growth) + 2)
+
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value):
+        """Registra uma amostra (segundos)"""
+        if value <= self.min_value:
+            index = 0
+        else:
+            index = min(len(self.counts) - 1, int(math.log(value / self.min_value) / self._log_growth) + 1)
+
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, percent):
+        """Valor do percentil (limite superior do bucket, nunca acima do máximo observado)"""
+        if not self.count:
+            return 0.0
+
+        target = max(1, math.ceil(percent / 100 * self.count))
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return min(self.max, self.min_value * math.exp(index * self._log_growth))
+
+        return self.max
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+
+class Tracer:
+    """Spans de latência por etapa e comando, agregados em histogramas"""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.started = time.time()
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds, command=None):
+        """Registra a duração de uma etapa"""
+        if not self.enabled:
+            return
+
+        key = (stage, command or current_command.get())
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram()
+            histogram.record(seconds)
+
+    @contextlib.contextmanager
+    def span(self, stage, command=None):
+        """Mede o bloco: `with tracer.span('gemini'): ...`"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started, command)
+
+    def timed(self, stage):
+        """Decorador de span para funções síncronas ou corrotinas"""
+        def decorator(fn):
+            if asyncio.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(stage):
+                        return await fn(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(stage):
+                    return fn(*args, **kwargs)
+            return wrapper
+
+        return decorator
+
+    def summary(self, command=None):
+        """Linhas (etapa, comando, contagem, p50, p95, p99, máximo) ordenadas por etapa"""
+        with self._lock:
+            items = sorted(self.histograms.items())
+
+        rows = []
+        for (stage, stage_command), histogram in items:
+            if command and stage_command != command:
+                continue
+            rows.append((stage, stage_command, histogram.count,
+                         *(histogram.percentile(p) for p in PERCENTILES), histogram.max))
+        return rows
+
+    def prometheus_text(self):
+        """Exporta os histogramas no formato texto do Prometheus (summary com quantis)"""
+        with self._lock:
+            items = sorted(self.histograms.items())
+
+        lines = [
+            '# HELP kkk_stage_latency_seconds Latência por etapa e comando',
+            '# TYPE kkk_stage_latency_seconds summary',
+        ]
+        for (stage, command), histogram in items:
+            labels = f'stage="{stage}",command="{command}"'
+            for percent in PERCENTILES:
+                lines.append(f'kkk_stage_latency_seconds{{{labels},quantile="{percent / 100}"}} '
+                             f'{histogram.percentile(percent):.6f}')
+            lines.append(f'kkk_stage_latency_seconds_sum{{{labels}}} {histogram.total:.6f}')
+            lines.append(f'kkk_stage_latency_seconds_count{{{labels}}} {histogram.count}')
+
+        lines.append('# TYPE kkk_uptime_seconds gauge')
+        lines.append(f'kkk_uptime_seconds {time.time() - self.started:.0f}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """Grava o arquivo de métricas de forma atômica (para o textfile collector)"""
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(temp_path, path)
+
+    async def export_loop(self, path, interval=15):
+        """Regrava o arquivo de métricas periodicamente"""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.write_prometheus, path)
+            except Exception as e:
+                print(f"Erro ao gravar métricas: {e}")
+            await asyncio.sleep(interval)
+
+    async def serve(self, host='127.0.0.1', port=9108):
+        """Servidor HTTP mínimo que responde com as métricas em qualquer caminho"""
+        async def handle(reader, writer):
+            try:
+                await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), 5)
+                body = self.prometheus_text().encode('utf-8')
+                writer.write(b'HTTP/1.1 200 OK\r\n'
+                             b'Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n'
+                             b'Content-Length: ' + str(len(body)).encode() + b'\r\n'
+                             b'Connection: close\r\n\r\n' + body)
+                await writer.drain()
+            except Exception:
+                pass
+            finally:
+                writer.close()
+
+        return await asyncio.start_server(handle, host, port)
+
+
+# Instância global compartilhada pelos módulos
+tracer = Tracer(enabled=os.getenv('METRICS_ENABLED', '1') == '1')
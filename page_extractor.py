@@ -0,0 +1,174 @@
+from html.parser import HTMLParser
+import re
+
+# Limites do conteúdo extraído (o prompt seleciona depois os trechos relevantes para o comando)
+MAX_TEXT = 20000
+MAX_ELEMENTS = 80
+
+# Script executado na página: uma única ida ao navegador retorna tudo que a IA precisa
+EXTRACTION_SCRIPT = """
+const maxText = arguments[0];
+const maxElements = arguments[1];
+const clean = (value) => (value || '').replace(/\\s+/g, ' ').trim();
+
+// Texto preserva as quebras de linha (limites naturais dos trechos ranqueados no prompt)
+const text = (document.body ? document.body.innerText : '')
+    .replace(/[ \\t\\u00a0]+/g, ' ').replace(/\\s*\\n\\s*/g, '\\n').trim().slice(0, maxText);
+
+const selector = 'a[href], button, input:not([type="hidden"]), textarea, select, ' +
+    '[role="button"], [role="link"], [role="tab"], [role="menuitem"], [onclick], [contenteditable="true"]';
+
+const elements = [];
+for (const el of document.querySelectorAll(selector)) {
+    if (elements.length >= maxElements) break;
+
+    const rect = el.getBoundingClientRect();
+    if (rect.width === 0 || rect.height === 0) continue;
+    if (rect.bottom < 0 || rect.top > window.innerHeight || rect.right < 0 || rect.left > window.innerWidth) continue;
+
+    const style = window.getComputedStyle(el);
+    if (style.visibility === 'hidden' || style.display === 'none') continue;
+
+    elements.push({
+        id: el.dataset.kkkId || '',
+        tag: el.tagName.toLowerCase(),
+        type: el.getAttribute('type') || '',
+        role: el.getAttribute('role') || '',
+        text: clean(el.innerText || el.value || el.getAttribute('aria-label') ||
+                    el.getAttribute('placeholder') || el.getAttribute('title') || el.getAttribute('alt')).slice(0, 80),
+        href: el.getAttribute('href') || '',
+        x: Math.round(rect.left + rect.width / 2),
+        y: Math.round(rect.top + rect.height / 2)
+    });
+}
+
+return {url: location.href, title: document.title, text: text, elements: elements};
+"""
+
+INTERACTIVE_TAGS = ('a', 'button', 'input', 'textarea', 'select')
+SKIPPED_TAGS = ('script', 'style', 'noscript', 'template', 'svg')
+
+
+class _FallbackParser(HTMLParser):
+    """Parser em fluxo (sem árvore) para extrair texto e elementos do HTML"""
+
+    def __init__(self, max_text, max_elements):
+        super().__init__(convert_charrefs=True)
+        self.max_text = max_text
+        self.max_elements = max_elements
+
+        self.title = ''
+        self.canonical = ''
+        self.elements = []
+
+        self._text = []
+        self._text_length = 0
+        self._skip_depth = 0
+        self._in_title = False
+        self._open_element = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+            return
+
+        attrs = dict(attrs)
+
+        if tag == 'title':
+            self._in_title = True
+        elif tag == 'link' and 'canonical' in (attrs.get('rel') or '').split():
+            self.canonical = attrs.get('href') or ''
+        elif tag in INTERACTIVE_TAGS and len(self.elements) < self.max_elements:
+            if tag == 'input' and attrs.get('type') == 'hidden':
+                return
+            if tag == 'a' and not attrs.get('href'):
+                return
+
+            element = {
+                'tag': tag,
+                'type': attrs.get('type') or '',
+                'role': attrs.get('role') or '',
+                'text': (attrs.get('aria-label') or attrs.get('placeholder') or attrs.get('value')
+                         or attrs.get('title') or ''),
+                'href': attrs.get('href') or '',
+            }
+            self.elements.append(element)
+
+            if tag in ('a', 'button'):
+                self._open_element = element
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == 'title':
+            self._in_title = False
+        elif tag in ('a', 'button'):
+            self._open_element = None
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+
+        if self._in_title:
+            self.title += data
+            return
+
+        data = data.strip()
+        if not data:
+            return
+
+        if self._open_element is not None and len(self._open_element['text']) < 80:
+            self._open_element['text'] = (self._open_element['text'] + ' ' + data).strip()[:80]
+
+        if self._text_length < self.max_text:
+            self._text.append(data)
+            self._text_length += len(data) + 1
+
+    @property
+    def text(self):
+        return '\n'.join(self._text)[:self.max_text]
+
+
+def extract_from_html(page_source, url='', max_text=MAX_TEXT, max_elements=MAX_ELEMENTS):
+    """Extração alternativa a partir do HTML bruto (uso offline ou sem navegador)"""
+    parser = _FallbackParser(max_text, max_elements)
+    try:
+        parser.feed(page_source)
+        parser.close()
+    except Exception as e:
+        print(f"Erro ao analisar HTML: {e}")
+
+    return {
+        'url': url or parser.canonical,
+        'title': re.sub(r'\s+', ' ', parser.title).strip(),
+        'text': parser.text,
+        'elements': parser.elements,
+    }
+
+
+def extract_from_driver(driver, max_text=MAX_TEXT, max_elements=MAX_ELEMENTS):
+    """Extrai URL, título, texto visível e elementos interativos com um único execute_script"""
+    try:
+        return driver.execute_script(EXTRACTION_SCRIPT, max_text, max_elements)
+    except Exception as e:
+        print(f"Erro na extração da página, usando HTML bruto: {e}")
+        return extract_from_html(driver.page_source, driver.current_url, max_text, max_elements)
+
+
+def describe_elements(elements, limit=MAX_ELEMENTS):
+    """Formata os elementos interativos em linhas compactas para o prompt"""
+    lines = []
+    for element in elements[:limit]:
+        label = element.get('role') or element.get('type') or element['tag']
+        line = f"- #{element['id']} {element['tag']}" if element.get('id') else f"- {element['tag']}"
+        if label != element['tag']:
+            line += f"[{label}]"
+        if element.get('text'):
+            line += f" \"{element['text']}\""
+        if element.get('href'):
+            line += f" -> {element['href'][:80]}"
+        if 'x' in element:
+            line += f" @ ({element['x']}, {element['y']})"
+        lines.append(line)
+
+    return '\n'.join(lines)
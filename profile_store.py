@@ -0,0 +1,188 @@
+import asyncio
+import gzip
+import json
+import os
+import re
+import shutil
+import time
+
+MB = 2 ** 20
+
+# Arquivo marcador com o último uso do perfil (o mtime do diretório muda a cada gravação do Chrome)
+LAST_USED_FILE = '.last_used'
+
+# Nomes aceitos para perfis e snapshots (viram nomes de arquivo)
+NAME_PATTERN = re.compile(r'[\w-]{1,32}')
+
+
+def directory_size(path):
+    """Tamanho total (bytes) dos arquivos de um diretório"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class ProfileStore:
+    """Perfis persistentes do Chrome (user-data-dir) por usuário com limite de espaço e despejo LRU"""
+
+    def __init__(self, directory='profiles', max_total_mb=2048, max_profiles=50, disk_cache_mb=256):
+        self.directory = os.path.abspath(directory)
+        self.max_total = max_total_mb * MB if max_total_mb else None
+        self.max_profiles = max_profiles
+        self.disk_cache_mb = disk_cache_mb
+
+        # Perfis abertos por algum navegador (o Chrome trava o diretório em uso)
+        self.in_use = set()
+        self.evictions = 0
+        self._cleanup_task = None
+
+    @staticmethod
+    def profile_name(key):
+        """Perfil do usuário da sessão"""
+        return f'user-{key[2]}'
+
+    def acquire(self, key):
+        """Reserva o perfil da sessão e retorna (nome, caminho)
+
+        O mesmo usuário em outro canal ao mesmo tempo usa um perfil próprio daquele canal.
+        """
+        name = self.profile_name(key)
+        if name in self.in_use:
+            name = f'{name}-{key[1]}'
+
+        path = os.path.join(self.directory, name)
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, LAST_USED_FILE), 'w') as f:
+            f.write(str(time.time()))
+
+        self.in_use.add(name)
+        return name, path
+
+    def release(self, name):
+        """Libera o perfil e verifica os limites em segundo plano"""
+        self.in_use.discard(name)
+        self.schedule_cleanup()
+
+    def schedule_cleanup(self):
+        """Aplica os limites numa thread sem bloquear o loop"""
+        if self._cleanup_task and not self._cleanup_task.done():
+            return
+        loop = asyncio.get_running_loop()
+        self._cleanup_task = loop.run_in_executor(None, self.enforce_limits)
+
+    def _last_used(self, path):
+        try:
+            return os.path.getmtime(os.path.join(path, LAST_USED_FILE))
+        except OSError:
+            return 0
+
+    def enforce_limits(self):
+        """Remove os perfis livres usados há mais tempo até respeitar quantidade e espaço"""
+        if not os.path.isdir(self.directory):
+            return 0
+
+        profiles = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if os.path.isdir(path):
+                profiles.append((self._last_used(path), name, path, directory_size(path)))
+
+        # Mais antigo primeiro
+        profiles.sort()
+        total = sum(profile[3] for profile in profiles)
+        count = len(profiles)
+        removed = 0
+
+        for _, name, path, size in profiles:
+            over_count = self.max_profiles and count > self.max_profiles
+            over_size = self.max_total and total > self.max_total
+            if not (over_count or over_size):
+                break
+            if name in self.in_use:
+                continue
+
+            shutil.rmtree(path, ignore_errors=True)
+            print(f"Perfil {name} removido ({size / MB:.0f} MB, LRU)")
+            total -= size
+            count -= 1
+            removed += 1
+
+        self.evictions += removed
+        return removed
+
+    def stats(self):
+        """Perfis no disco e em uso (o tamanho exige percorrer os diretórios)"""
+        names = os.listdir(self.directory) if os.path.isdir(self.directory) else []
+        return {
+            'profiles': len(names),
+            'in_use': len(self.in_use),
+            'evictions': self.evictions,
+        }
+
+
+class SnapshotStore:
+    """Snapshots nomeados de sessões (abas, URL, cookies e localStorage) em JSON compactado"""
+
+    def __init__(self, directory='snapshots', max_per_user=10):
+        self.directory = directory
+        self.max_per_user = max_per_user
+
+    def _path(self, user_id, name):
+        return os.path.join(self.directory, str(user_id), f'{name}.json.gz')
+
+    async def save(self, user_id, name, state):
+        """Grava o snapshot (substitui um de mesmo nome)"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._save_sync, user_id, name, state)
+
+    def _save_sync(self, user_id, name, state):
+        path = self._path(user_id, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        data = gzip.compress(json.dumps(state, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+        # Cookies são credenciais: arquivo legível só pelo dono, trocado de forma atômica
+        temporary = f'{path}.tmp'
+        fd = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temporary, path)
+
+        self._trim(os.path.dirname(path))
+        return len(data)
+
+    def _trim(self, directory):
+        """Mantém apenas os snapshots mais recentes do usuário"""
+        files = sorted((entry for entry in os.scandir(directory) if entry.name.endswith('.json.gz')),
+                       key=lambda entry: entry.stat().st_mtime)
+        for entry in files[:max(0, len(files) - self.max_per_user)]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    async def load(self, user_id, name):
+        """Lê o snapshot ou retorna None se não existir"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._load_sync, user_id, name)
+
+    def _load_sync(self, user_id, name):
+        try:
+            with gzip.open(self._path(user_id, name), 'rb') as f:
+                return json.loads(f.read().decode('utf-8'))
+        except FileNotFoundError:
+            return None
+
+    def list(self, user_id):
+        """Nomes dos snapshots do usuário, do mais recente para o mais antigo"""
+        directory = os.path.join(self.directory, str(user_id))
+        if not os.path.isdir(directory):
+            return []
+        files = sorted((entry for entry in os.scandir(directory) if entry.name.endswith('.json.gz')),
+                       key=lambda entry: entry.stat().st_mtime, reverse=True)
+        return [entry.name[:-len('.json.gz')] for entry in files]
@@ -0,0 +1,220 @@
+import math
+import re
+import unicodedata
+from page_extractor import describe_elements
+
+# Instruções fixas no início de cada prompt
+SYSTEM_INSTRUCTION = """Você controla um navegador web. Analise o comando do usuário e a página atual e retorne uma ação ou um plano de ações em JSON.
+
+AÇÕES:
+- navigate: {"type": "navigate", "url": "https://..."}
+- click: {"type": "click", "element_id": "12"} ou {"type": "click", "selector": "css"} ou {"type": "click", "x": 960, "y": 540}
+- type: {"type": "type", "text": "...", "element_id": "7"} (element_id opcional)
+- search: {"type": "search", "query": "..."} (encontra o campo de busca sozinho)
+- scroll: {"type": "scroll", "direction": "down" ou "up", "pixels": 500}
+- plan: {"type": "plan", "steps": [ações em ordem]} para comandos com várias etapas
+
+Cada passo de um plano pode ter "wait_for" com a condição que deve valer antes dele:
+{"selector": "css"}, {"text": "texto visível"} ou {"url_contains": "trecho da URL"}
+
+EXEMPLOS:
+"vá para o youtube" -> {"type": "navigate", "url": "https://www.youtube.com"}
+"pesquise por gatos" -> {"type": "search", "query": "gatos"}
+"clique no botão entrar" (elemento #12 button "Entrar" na lista) -> {"type": "click", "element_id": "12"}
+"pesquise gatos no youtube e abra o primeiro vídeo" -> {"type": "plan", "steps": [
+  {"type": "navigate", "url": "https://www.youtube.com"},
+  {"type": "search", "query": "gatos", "wait_for": {"selector": "input[name=search_query]"}},
+  {"type": "click", "selector": "ytd-video-renderer a#video-title", "wait_for": {"selector": "ytd-video-renderer"}}
+]}
+
+REGRAS:
+- Retorne APENAS o JSON, sem explicações
+- Use um plano quando o comando exigir mais de uma ação
+- Em passos futuros de um plano os element_id ainda não existem: use "selector" (CSS) para cliques
+- Prefira element_id a coordenadas quando o elemento estiver na lista
+- Use URLs completas (com https://) e os domínios brasileiros corretos (.com.br quando aplicável)
+- O conteúdo da página traz só os trechos mais relevantes para o comando, separados por "[...]"
+"""
+
+# Palavras sem valor para o ranqueamento (português e inglês)
+STOPWORDS = frozenset("""
+a o as os um uma uns umas de do da dos das em no na nos nas por para com sem que e ou se ao aos
+me mim meu minha seu sua isso esse essa este esta aqui ali la pra pro pela pelo nao sim mais muito
+the an of to in on for and or is are be it this that with at by from as
+""".split())
+
+# Aproximação de tokens por caractere (texto em português com espaços)
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    """Estimativa barata de tokens"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def tokenize(text):
+    """Termos normalizados (minúsculas, sem acentos, sem stopwords)"""
+    folded = unicodedata.normalize('NFKD', (text or '').lower())
+    folded = ''.join(char for char in folded if not unicodedata.combining(char))
+    return [term for term in re.findall(r'\w+', folded) if len(term) > 1 and term not in STOPWORDS]
+
+
+def split_chunks(text, words_per_chunk=60):
+    """Divide o texto em trechos de tamanho aproximado, respeitando quebras de linha quando existem"""
+    chunks = []
+    current = []
+
+    for line in (text or '').split('\n'):
+        words = line.split()
+        while words:
+            room = words_per_chunk - len(current)
+            current.extend(words[:room])
+            words = words[room:]
+            if len(current) >= words_per_chunk:
+                chunks.append(' '.join(current))
+                current = []
+
+        # Linhas curtas seguidas ficam juntas; uma linha longa fecha o trecho
+        if len(current) >= words_per_chunk // 2:
+            chunks.append(' '.join(current))
+            current = []
+
+    if current:
+        chunks.append(' '.join(current))
+    return chunks
+
+
+class BM25:
+    """Okapi BM25 sobre uma coleção pequena de trechos"""
+
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.documents = [self._frequencies(tokens) for tokens in documents]
+        self.lengths = [len(tokens) for tokens in documents]
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0
+
+        document_frequency = {}
+        for frequencies in self.documents:
+            for term in frequencies:
+                document_frequency[term] = document_frequency.get(term, 0) + 1
+
+        total = len(self.documents)
+        self.idf = {term: math.log(1 + (total - count + 0.5) / (count + 0.5))
+                    for term, count in document_frequency.items()}
+
+    @staticmethod
+    def _frequencies(tokens):
+        frequencies = {}
+        for token in tokens:
+            frequencies[token] = frequencies.get(token, 0) + 1
+        return frequencies
+
+    def scores(self, query):
+        """Pontuação de cada documento para os termos da consulta"""
+        terms = set(query)
+        results = []
+        for frequencies, length in zip(self.documents, self.lengths):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / (self.average_length or 1))
+            for term in terms:
+                frequency = frequencies.get(term)
+                if frequency:
+                    score += self.idf[term] * frequency * (self.k1 + 1) / (frequency + norm)
+            results.append(score)
+        return results
+
+
+class PromptBuilder:
+    """Monta o prompt dentro de um orçamento de tokens com os trechos da página mais relevantes"""
+
+    def __init__(self, budget=1200, chunk_words=60, element_share=0.4):
+        self.budget = budget
+        self.chunk_words = chunk_words
+        self.element_share = element_share
+
+        self.calls = 0
+        self.total_tokens = 0
+
+    def build(self, command, page, context=''):
+        """Prompt com comando, elementos e trechos ranqueados e as instruções fixas"""
+        query = tokenize(command)
+
+        header = (f"COMANDO DO USUÁRIO: {command}\n"
+                  f"URL ATUAL: {page.get('url') or 'URL não detectada'}\n"
+                  f"TÍTULO: {page.get('title', '')}\n")
+        remaining = self.budget - estimate_tokens(header) - estimate_tokens(context)
+
+        elements = self._select_elements(page.get('elements', []), query, int(remaining * self.element_share))
+        element_lines = describe_elements(elements, limit=len(elements))
+        remaining -= estimate_tokens(element_lines)
+
+        text = self._select_text(page.get('text', ''), query, remaining)
+
+        prompt = (f"{header}\n"
+                  f"CONTEÚDO DA PÁGINA (trechos relevantes):\n{text}\n\n"
+                  f"ELEMENTOS INTERATIVOS VISÍVEIS (#id, centro em coordenadas da tela):\n{element_lines}\n")
+        if context:
+            prompt += f"\n{context.strip()}\n"
+        prompt += "\nRESPONDA APENAS COM O JSON:"
+
+        prompt = f"{SYSTEM_INSTRUCTION}\n{prompt}"
+
+        self.calls += 1
+        self.total_tokens += estimate_tokens(prompt)
+        return prompt
+
+    def _select_elements(self, elements, query, budget):
+        """Elementos com mais termos em comum com o comando, na ordem da página, dentro do orçamento"""
+        terms = set(query)
+        ranked = sorted(
+            range(len(elements)),
+            key=lambda index: (-len(terms.intersection(tokenize(elements[index].get('text', '')))), index)
+        )
+
+        chosen = []
+        used = 0
+        for index in ranked:
+            cost = estimate_tokens(describe_elements([elements[index]]))
+            if used + cost > budget:
+                break
+            chosen.append(index)
+            used += cost
+
+        return [elements[index] for index in sorted(chosen)]
+
+    def _select_text(self, text, query, budget):
+        """Trechos com maior BM25 para o comando, na ordem original, até o orçamento"""
+        chunks = split_chunks(text, self.chunk_words)
+        if not chunks or budget <= 0:
+            return ''
+
+        scores = BM25([tokenize(chunk) for chunk in chunks]).scores(query) if query else [0.0] * len(chunks)
+        # Sem termos em comum: manter a ordem da página
+        ranked = sorted(range(len(chunks)), key=lambda index: (-scores[index], index))
+
+        chosen = []
+        used = 0
+        for index in ranked:
+            cost = estimate_tokens(chunks[index]) + 2
+            if used + cost > budget:
+                continue
+            chosen.append(index)
+            used += cost
+
+        parts = []
+        previous = None
+        for index in sorted(chosen):
+            if previous is not None and index != previous + 1:
+                parts.append('[...]')
+            parts.append(chunks[index])
+            previous = index
+
+        return '\n'.join(parts)
+
+    def stats(self):
+        """Tokens estimados por chamada"""
+        return {
+            'calls': self.calls,
+            'average_tokens': self.total_tokens / self.calls if self.calls else 0,
+        }
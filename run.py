@@ -6,8 +6,13 @@ Script para executar o bot Discord com verificações de dependências
 import sys
 import subprocess
 import os
+import re
+import time
 from pathlib import Path
 
+# Referência para o tempo total de inicialização
+STARTED_AT = time.monotonic()
+
 def check_python_version():
     """Verifica se a versão do Python é compatível"""
     if sys.version_info < (3, 8):
@@ -15,11 +20,47 @@ def check_python_version():
         sys.exit(1)
     print(f"✅ Python {sys.version_info.major}.{sys.version_info.minor} detectado")
 
+def read_requirements(path="requirements.txt"):
+    """Lê as linhas de dependência (sem comentários e opções do pip)"""
+    with open(path, encoding="utf-8") as f:
+        lines = [line.split("#", 1)[0].strip() for line in f]
+    return [line for line in lines if line and not line.startswith("-")]
+
+def missing_requirements(requirements):
+    """Dependências ausentes ou com versão diferente da fixada (==), via importlib.metadata"""
+    from importlib import metadata
+    
+    missing = []
+    for requirement in requirements:
+        match = re.match(r"([A-Za-z0-9_.\-]+)(\[[^\]]*\])?\s*(==\s*([^\s;,]+))?", requirement)
+        if not match:
+            missing.append(requirement)
+            continue
+        
+        name, pinned = match.group(1), match.group(4)
+        try:
+            installed = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            missing.append(requirement)
+            continue
+        
+        if pinned and installed != pinned:
+            missing.append(requirement)
+    
+    return missing
+
 def install_requirements():
-    """Instala as dependências necessárias"""
-    print("📦 Instalando dependências...")
+    """Instala apenas as dependências que faltam"""
+    started = time.perf_counter()
+    missing = missing_requirements(read_requirements())
+    
+    if not missing:
+        print(f"✅ Dependências já instaladas (verificadas em {(time.perf_counter() - started) * 1000:.0f} ms)")
+        return
+    
+    print(f"📦 Instalando dependências: {', '.join(missing)}")
     try:
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"])
+        subprocess.check_call([sys.executable, "-m", "pip", "install", *missing])
         print("✅ Dependências instaladas com sucesso")
     except subprocess.CalledProcessError:
         print("❌ Erro ao instalar dependências")
@@ -56,6 +97,32 @@ def create_directories():
     os.makedirs("screenshots", exist_ok=True)
     print("✅ Diretórios criados")
 
+def launch_cluster(nodes):
+    """Inicia um processo do bot por nó, dividindo os shards e com endpoints de repasse distintos"""
+    base_port = int(os.getenv("CLUSTER_PORT", "8765"))
+    shard_count = int(os.getenv("SHARD_COUNT", str(nodes)))
+    
+    processes = []
+    for index in range(nodes):
+        env = dict(os.environ)
+        env.pop("CLUSTER_ADDRESS", None)
+        env.update({
+            "NODE_ID": f"node-{index}",
+            "CLUSTER_PORT": str(base_port + index),
+            "SHARD_COUNT": str(shard_count),
+            "SHARD_IDS": ",".join(str(shard) for shard in range(index, shard_count, nodes)),
+        })
+        processes.append(subprocess.Popen([sys.executable, "-c", "import bot; bot.main()"], env=env))
+        print(f"🕸️ Nó {index} iniciado (pid {processes[-1].pid}, shards {env['SHARD_IDS']})")
+    
+    try:
+        for process in processes:
+            process.wait()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        print("\n👋 Cluster encerrado pelo usuário")
+
 def main():
     """Função principal"""
     print("🤖 Iniciando Bot Discord com IA Gemini")
@@ -79,12 +146,20 @@ def main():
     # Criar diretórios
     create_directories()
     
+    print(f"⏱️ Verificações concluídas em {time.monotonic() - STARTED_AT:.1f}s")
+    
     # Executar bot
     print("\n🚀 Iniciando bot...")
     print("=" * 50)
     
+    # `python run.py --nodes N`: N processos com shards e registro de sessões compartilhado
+    if "--nodes" in sys.argv:
+        launch_cluster(int(sys.argv[sys.argv.index("--nodes") + 1]))
+        return
+    
     try:
         import bot
+        bot.main()
     except KeyboardInterrupt:
         print("\n👋 Bot encerrado pelo usuário")
     except Exception as e:
@@ -0,0 +1,304 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from urllib.parse import urldefrag
+
+# Itens lidos por chamada ao navegador (limita o tamanho de cada resposta)
+SCRAPE_BATCH = 200
+# Limite de texto por item
+MAX_ITEM_TEXT = 2000
+
+# Extrai os itens que correspondem ao seletor a partir de uma posição (rolagem infinita acumula itens)
+SCRAPE_SCRIPT = """
+const selector = arguments[0];
+const start = arguments[1];
+const limit = arguments[2];
+const maxText = arguments[3];
+
+let nodes;
+try {
+    nodes = document.querySelectorAll(selector);
+} catch (e) {
+    return {valid: false, total: 0, records: [], url: location.href};
+}
+
+const absolute = (value) => {
+    try { return value ? new URL(value, location.href).href : ''; } catch (e) { return ''; }
+};
+
+const records = [];
+for (let i = start; i < nodes.length && records.length < limit; i++) {
+    const el = nodes[i];
+    const link = el.matches('a[href]') ? el : el.querySelector('a[href]');
+    const image = el.matches('img') ? el : el.querySelector('img');
+    records.push({
+        text: (el.innerText || el.textContent || '').replace(/[ \\t\\u00a0]+/g, ' ')
+            .replace(/\\s*\\n\\s*/g, '\\n').trim().slice(0, maxText),
+        link: link ? absolute(link.getAttribute('href')) : '',
+        image: image ? absolute(image.currentSrc || image.getAttribute('src')) : ''
+    });
+}
+
+return {valid: true, total: nodes.length, records: records, url: location.href};
+"""
+
+# Procura o controle de próxima página: rel=next, rótulos comuns ou aria-label
+NEXT_PAGE_SCRIPT = """
+const labels = ['próxima', 'proxima', 'próximo', 'proximo', 'seguinte', 'next', 'mais resultados', '›', '»', '>'];
+const visible = (el) => {
+    const rect = el.getBoundingClientRect();
+    const style = window.getComputedStyle(el);
+    return rect.width > 0 && rect.height > 0 && style.visibility !== 'hidden' && style.display !== 'none';
+};
+const usable = (el) => el && visible(el) && !el.disabled && el.getAttribute('aria-disabled') !== 'true';
+
+let target = document.querySelector('a[rel~="next"], link[rel~="next"]');
+if (target && target.tagName === 'LINK') return {href: new URL(target.href, location.href).href};
+if (!usable(target)) {
+    target = null;
+    for (const el of document.querySelectorAll('a[href], button, [role="button"]')) {
+        const label = ((el.innerText || '') + ' ' + (el.getAttribute('aria-label') || '')).trim().toLowerCase();
+        if (labels.some((text) => label === text || label.startsWith(text + ' ')) && usable(el)) {
+            target = el;
+            break;
+        }
+    }
+}
+if (!target) return null;
+
+const href = target.getAttribute('href');
+if (href && !href.startsWith('#') && !href.toLowerCase().startsWith('javascript:')) {
+    return {href: new URL(href, location.href).href};
+}
+target.scrollIntoView({block: 'center'});
+target.click();
+return {clicked: true};
+"""
+
+# Rola até o fim e informa a altura antes da rolagem (a comparação mostra se carregou mais conteúdo)
+SCROLL_BOTTOM_SCRIPT = """
+const before = document.documentElement.scrollHeight;
+window.scrollTo(0, before);
+return before;
+"""
+
+# Sem seletor: grupo de elementos irmãos repetidos (mesma tag e classe) com mais ocorrências
+AUTO_SELECTOR_SCRIPT = """
+const counts = new Map();
+for (const el of document.body.querySelectorAll('*')) {
+    if (!el.parentElement || !el.classList.length) continue;
+    const length = (el.innerText || '').trim().length;
+    if (length < 20 || length > 3000) continue;
+    const key = el.tagName.toLowerCase() + '.' + CSS.escape(el.classList[0]);
+    const entry = counts.get(key) || {count: 0, text: 0};
+    entry.count += 1;
+    entry.text += length;
+    counts.set(key, entry);
+}
+let best = null;
+for (const [key, entry] of counts) {
+    if (entry.count < 3) continue;
+    if (!best || entry.count * Math.log(entry.text) > best.score) {
+        best = {selector: key, score: entry.count * Math.log(entry.text)};
+    }
+}
+return best ? best.selector : null;
+"""
+
+
+def page_key(url):
+    """URL sem fragmento, usada para não visitar a mesma página duas vezes"""
+    return urldefrag(url or '')[0].rstrip('/')
+
+
+def record_hash(record):
+    """Impressão digital compacta de um item (8 bytes)"""
+    data = json.dumps([record.get('text'), record.get('link'), record.get('image')], ensure_ascii=False)
+    return hashlib.blake2b(data.encode('utf-8'), digest_size=8).digest()
+
+
+class Scraper:
+    """Coleta itens de uma sessão seguindo paginação ou rolagem infinita
+
+    Os itens são produzidos por geradores assíncronos em lotes pequenos;
+    nada além das impressões digitais dos itens e das URLs visitadas fica em memória.
+    """
+
+    def __init__(self, controller, selector, max_pages=50, max_items=5000, max_idle_scrolls=3):
+        self.controller = controller
+        self.selector = selector
+        self.max_pages = max_pages
+        self.max_items = max_items
+        self.max_idle_scrolls = max_idle_scrolls
+
+        self.pages_visited = 0
+        self.items = 0
+        self.duplicates = 0
+        self.stop_reason = None
+
+        self._visited = set()
+        self._seen = set()
+
+    async def pages(self):
+        """Gera (url, lote de itens) percorrendo a página atual e as seguintes"""
+        while self.pages_visited < self.max_pages:
+            start = 0
+            idle_scrolls = 0
+
+            while True:
+                batch = await self.controller.scrape_items(self.selector, start, SCRAPE_BATCH)
+                if not batch['valid']:
+                    self.stop_reason = 'seletor inválido'
+                    return
+
+                if start == 0:
+                    # Mesma URL e mesmo primeiro item: página repetida (inclusive paginação sem mudar a URL)
+                    first = record_hash(batch['records'][0]) if batch['records'] else None
+                    key = (page_key(batch['url']), first)
+                    if key in self._visited:
+                        self.stop_reason = 'página já visitada'
+                        return
+                    self._visited.add(key)
+                    self.pages_visited += 1
+
+                if batch['records']:
+                    start += len(batch['records'])
+                    idle_scrolls = 0
+                    yield batch['url'], batch['records']
+                    continue
+
+                # Sem itens novos: rolar para carregar mais (rolagem infinita)
+                if idle_scrolls >= self.max_idle_scrolls or not await self.controller.scroll_for_more():
+                    break
+                idle_scrolls += 1
+
+            if not await self.controller.next_page():
+                self.stop_reason = 'fim da paginação'
+                return
+
+        self.stop_reason = 'limite de páginas'
+
+    async def records(self):
+        """Itens únicos com a URL de origem, até o limite configurado"""
+        pages = self.pages()
+        try:
+            async for url, batch in pages:
+                for record in batch:
+                    digest = record_hash(record)
+                    if digest in self._seen:
+                        self.duplicates += 1
+                        continue
+                    self._seen.add(digest)
+
+                    record['url'] = url
+                    self.items += 1
+                    yield record
+
+                    if self.items >= self.max_items:
+                        self.stop_reason = 'limite de itens'
+                        return
+        finally:
+            await pages.aclose()
+
+    def stats(self):
+        return {
+            'pages': self.pages_visited,
+            'items': self.items,
+            'duplicates': self.duplicates,
+            'stop_reason': self.stop_reason,
+        }
+
+
+class ChunkedJsonlWriter:
+    """Grava itens em arquivos JSONL compactados (gzip), fechando um arquivo ao atingir o tamanho limite
+
+    Os métodos são bloqueantes (compressão e disco): chamar pelo executor, como em scrape_to_chunks.
+    """
+
+    def __init__(self, prefix='scrape', max_bytes=8 * 2 ** 20, directory=None):
+        self.prefix = prefix
+        # Margem para o restante do buffer do gzip ao fechar o arquivo
+        self.max_bytes = max_bytes - 64 * 1024
+        self.directory = directory or tempfile.gettempdir()
+
+        self.chunks = 0
+        self.records = 0
+        self._file = None
+        self._gzip = None
+        self._path = None
+        self._chunk_records = 0
+
+    def _open(self):
+        self.chunks += 1
+        self._path = os.path.join(self.directory, f'{self.prefix}-{self.chunks:03d}.jsonl.gz')
+        self._file = open(self._path, 'wb')
+        self._gzip = gzip.GzipFile(fileobj=self._file, mode='wb')
+        self._chunk_records = 0
+
+    def write(self, record):
+        """Grava um item; retorna (caminho, itens) de um arquivo concluído ou None"""
+        if self._gzip is None:
+            self._open()
+
+        self._gzip.write(json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n')
+        self._chunk_records += 1
+        self.records += 1
+
+        # tell() do arquivo mede os bytes já compactados
+        if self._file.tell() >= self.max_bytes:
+            return self.close()
+        return None
+
+    def write_many(self, records):
+        """Grava um lote de itens; retorna a lista de (caminho, itens) dos arquivos concluídos"""
+        chunks = []
+        for record in records:
+            chunk = self.write(record)
+            if chunk:
+                chunks.append(chunk)
+        return chunks
+
+    def close(self):
+        """Fecha o arquivo atual; retorna (caminho, itens) ou None se não havia arquivo aberto"""
+        if self._gzip is None:
+            return None
+
+        self._gzip.close()
+        self._file.close()
+        chunk = (self._path, self._chunk_records)
+        self._gzip = self._file = self._path = None
+        return chunk
+
+
+async def scrape_to_chunks(records, writer, on_chunk, batch_size=SCRAPE_BATCH):
+    """Consome o gerador de itens gravando em partes; `on_chunk(caminho, itens)` recebe cada parte pronta
+
+    Os itens são acumulados em lotes e a compressão e a gravação rodam no executor, fora do loop.
+    """
+    loop = asyncio.get_running_loop()
+    buffer = []
+
+    async def flush():
+        batch = buffer[:]
+        buffer.clear()
+        for chunk in await loop.run_in_executor(None, writer.write_many, batch):
+            await on_chunk(*chunk)
+
+    try:
+        async for record in records:
+            buffer.append(record)
+            if len(buffer) >= batch_size:
+                await flush()
+    finally:
+        try:
+            if buffer:
+                await flush()
+        finally:
+            chunk = await loop.run_in_executor(None, writer.close)
+            if chunk and chunk[1]:
+                await on_chunk(*chunk)
+            elif chunk:
+                await loop.run_in_executor(None, os.remove, chunk[0])
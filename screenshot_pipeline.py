@@ -0,0 +1,217 @@
+from collections import deque
+import asyncio
+import io
+import os
+
+# Perfis de saída: formato, qualidade e resolução máxima
+SCREENSHOT_PROFILES = {
+    'full': {'format': 'PNG', 'quality': None, 'max_size': None},
+    'balanced': {'format': 'WEBP', 'quality': 80, 'max_size': (1920, 1080)},
+    'fast': {'format': 'JPEG', 'quality': 70, 'max_size': (1280, 720)},
+    'preview': {'format': 'WEBP', 'quality': 60, 'max_size': (960, 540)},
+}
+
+DEFAULT_PROFILE = 'balanced'
+
+FORMAT_EXTENSIONS = {'PNG': 'png', 'WEBP': 'webp', 'JPEG': 'jpg'}
+
+# Grade usada na detecção de mudanças (cada célula é a média de um bloco da tela)
+# Blocos de ~10x10 px em 1920x1080: um caractere digitado muda a média do bloco bem acima do limite
+TILE_GRID = (192, 108)
+# Diferença mínima de luminância (0-255) para considerar um bloco alterado
+TILE_THRESHOLD = 10
+# Acima desta fração da tela alterada, envia a imagem inteira em vez do recorte
+REGION_MAX_FRACTION = 0.4
+# Margem (px) em volta da região alterada, para o recorte mostrar o contexto da mudança
+REGION_MARGIN = 40
+
+
+class Screenshot:
+    """Screenshot codificado em memória com assinatura para detecção de mudanças"""
+
+    def __init__(self, data, image_format, image, tiles):
+        self.data = data
+        self.format = image_format
+        self.tiles = tiles
+        self._image = image
+        self._size = image.size
+
+    def __getstate__(self):
+        """Serializa sem a imagem decodificada (envio entre processos): bytes e grade bastam"""
+        state = self.__dict__.copy()
+        state['_image'] = None
+        return state
+
+    @property
+    def image(self):
+        """Imagem decodificada; recriada a partir dos bytes quando veio de outro processo"""
+        if self._image is None:
+            from PIL import Image
+            self._image = Image.open(io.BytesIO(self.data))
+            self._image.load()
+        return self._image
+
+    @property
+    def extension(self):
+        return FORMAT_EXTENSIONS[self.format]
+
+    @property
+    def filename(self):
+        return f'browser.{self.extension}'
+
+    @property
+    def size(self):
+        return self._size
+
+
+def encode_image(img, profile):
+    """Codifica uma imagem Pillow segundo o perfil"""
+    buffer = io.BytesIO()
+    image_format = profile['format']
+
+    if image_format == 'PNG':
+        img.save(buffer, 'PNG')
+    else:
+        if image_format == 'JPEG' and img.mode != 'RGB':
+            img = img.convert('RGB')
+        img.save(buffer, image_format, quality=profile['quality'])
+
+    return buffer.getvalue()
+
+
+def compute_tiles(img):
+    """Reduz a imagem a uma grade de luminância média por bloco"""
+    from PIL import Image
+    return img.convert('L').resize(TILE_GRID, Image.Resampling.BOX)
+
+
+def process_screenshot(png_bytes, profile_name=DEFAULT_PROFILE):
+    """Decodifica o PNG do navegador, redimensiona e codifica conforme o perfil"""
+    # Pillow importado só no primeiro screenshot (importação lenta)
+    from PIL import Image
+    profile = SCREENSHOT_PROFILES.get(profile_name, SCREENSHOT_PROFILES[DEFAULT_PROFILE])
+
+    img = Image.open(io.BytesIO(png_bytes))
+    img.load()
+
+    max_size = profile['max_size']
+    resized = max_size and (img.width > max_size[0] or img.height > max_size[1])
+    if resized:
+        img.thumbnail(max_size, Image.Resampling.LANCZOS)
+
+    # PNG sem redimensionamento já está pronto: evita re-encode
+    if profile['format'] == 'PNG' and not resized:
+        data = png_bytes
+    else:
+        data = encode_image(img, profile)
+
+    return Screenshot(data, profile['format'], img, compute_tiles(img))
+
+
+def screenshot_from_encoded(data, image_format):
+    """Cria um Screenshot a partir de uma imagem já codificada (sem re-encode)"""
+    from PIL import Image
+    img = Image.open(io.BytesIO(data))
+    img.load()
+    return Screenshot(data, image_format, img, compute_tiles(img))
+
+
+def crop_screenshot(shot, box, profile_name=DEFAULT_PROFILE):
+    """Recorta a região alterada e codifica como um novo screenshot"""
+    profile = SCREENSHOT_PROFILES.get(profile_name, SCREENSHOT_PROFILES[DEFAULT_PROFILE])
+    region = shot.image.crop(box)
+    return Screenshot(encode_image(region, profile), profile['format'], region, shot.tiles)
+
+
+class FrameTracker:
+    """Guarda a assinatura do último frame enviado em cada canal"""
+
+    def __init__(self, max_channels=1000):
+        self.max_channels = max_channels
+        # canal -> (grade de luminância, tamanho da imagem)
+        self._last = {}
+
+    def compare(self, channel_id, shot):
+        """Compara com o último frame do canal.
+
+        Retorna ('full', None), ('unchanged', None) ou ('region', (left, top, right, bottom)).
+        """
+        previous = self._last.get(channel_id)
+        if previous is None or previous[1] != shot.size:
+            return 'full', None
+
+        from PIL import ImageChops
+        diff = ImageChops.difference(previous[0], shot.tiles).point(
+            lambda value: 255 if value > TILE_THRESHOLD else 0)
+        bbox = diff.getbbox()
+        if bbox is None:
+            return 'unchanged', None
+
+        # Converter a caixa da grade para pixels da imagem
+        cols, rows = TILE_GRID
+        width, height = shot.size
+        left = max(0, bbox[0] * width // cols - REGION_MARGIN)
+        top = max(0, bbox[1] * height // rows - REGION_MARGIN)
+        right = min(width, -(-bbox[2] * width // cols) + REGION_MARGIN)
+        bottom = min(height, -(-bbox[3] * height // rows) + REGION_MARGIN)
+
+        fraction = ((right - left) * (bottom - top)) / float(width * height)
+        if fraction > REGION_MAX_FRACTION:
+            return 'full', None
+
+        return 'region', (left, top, right, bottom)
+
+    def update(self, channel_id, shot):
+        """Registra o frame enviado no canal"""
+        if channel_id not in self._last and len(self._last) >= self.max_channels:
+            # Remover o canal mais antigo (ordem de inserção)
+            self._last.pop(next(iter(self._last)))
+
+        self._last[channel_id] = (shot.tiles, shot.size)
+
+    def forget(self, channel_id):
+        """Descarta o frame do canal (próximo envio será completo)"""
+        self._last.pop(channel_id, None)
+
+
+class ScreenshotStore:
+    """Armazenamento opcional em disco com buffer circular limitado"""
+
+    def __init__(self, directory='screenshots', max_files=50):
+        self.directory = directory
+        self.max_files = max(1, max_files)
+        self.counter = 0
+        self._files = deque()
+
+    async def save(self, data, extension='png'):
+        """Grava a imagem e remove as mais antigas que excedem o limite"""
+        filename = os.path.join(self.directory, f'browser_{self.counter}.{extension}')
+        self.counter += 1
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._write, filename, data)
+        self._files.append(filename)
+
+        expired = []
+        while len(self._files) > self.max_files:
+            expired.append(self._files.popleft())
+
+        if expired:
+            # Limpeza em segundo plano para não atrasar o comando
+            loop.run_in_executor(None, self._remove, expired)
+
+        return filename
+
+    def _write(self, filename, data):
+        """Grava bytes em disco"""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(filename, 'wb') as f:
+            f.write(data)
+
+    def _remove(self, filenames):
+        """Remove arquivos ignorando os que já não existem"""
+        for filename in filenames:
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
@@ -0,0 +1,204 @@
+import sqlite3
+import threading
+import time
+
+
+class MemoryRegistryBackend:
+    """Backend em memória: um único processo (desenvolvimento e testes)
+
+    Qualquer objeto com os mesmos métodos pode substituir os backends daqui
+    (ex.: um serviço compartilhado entre máquinas).
+    """
+
+    def __init__(self):
+        # nó -> {'address', 'capacity', 'load', 'heartbeat'}
+        self._nodes = {}
+        # chave da sessão -> nó
+        self._sessions = {}
+
+    def upsert_node(self, node_id, address, capacity, load, now):
+        self._nodes[node_id] = {'address': address, 'capacity': capacity, 'load': load, 'heartbeat': now}
+
+    def remove_node(self, node_id):
+        self._nodes.pop(node_id, None)
+        self._sessions = {key: owner for key, owner in self._sessions.items() if owner != node_id}
+
+    def nodes(self):
+        return [dict(info, node_id=node_id) for node_id, info in self._nodes.items()]
+
+    def get_owner(self, key):
+        return self._sessions.get(key)
+
+    def set_owner(self, key, node_id, now):
+        self._sessions[key] = node_id
+
+    def delete_owner(self, key, node_id):
+        if self._sessions.get(key) == node_id:
+            del self._sessions[key]
+
+    def replace_sessions(self, node_id, keys, now):
+        self._sessions = {key: owner for key, owner in self._sessions.items() if owner != node_id}
+        for key in keys:
+            self._sessions[key] = node_id
+
+    def session_counts(self):
+        counts = {}
+        for owner in self._sessions.values():
+            counts[owner] = counts.get(owner, 0) + 1
+        return counts
+
+
+class SQLiteRegistryBackend:
+    """Backend SQLite: processos do mesmo host compartilham o arquivo"""
+
+    def __init__(self, db_path):
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=5)
+        self._lock = threading.Lock()
+
+        with self._lock:
+            # WAL: leituras de um processo não bloqueiam as gravações dos outros
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS nodes ("
+                "node_id TEXT PRIMARY KEY, address TEXT NOT NULL, capacity INTEGER NOT NULL, "
+                "load INTEGER NOT NULL, heartbeat REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "key TEXT PRIMARY KEY, node_id TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS sessions_node ON sessions (node_id)")
+            self._db.commit()
+
+    def _write(self, *statements):
+        with self._lock:
+            for sql, params in statements:
+                self._db.execute(sql, params)
+            self._db.commit()
+
+    def upsert_node(self, node_id, address, capacity, load, now):
+        self._write((
+            "INSERT OR REPLACE INTO nodes (node_id, address, capacity, load, heartbeat) VALUES (?, ?, ?, ?, ?)",
+            (node_id, address, capacity, load, now)
+        ))
+
+    def remove_node(self, node_id):
+        self._write(
+            ("DELETE FROM nodes WHERE node_id = ?", (node_id,)),
+            ("DELETE FROM sessions WHERE node_id = ?", (node_id,)),
+        )
+
+    def nodes(self):
+        with self._lock:
+            rows = self._db.execute("SELECT node_id, address, capacity, load, heartbeat FROM nodes").fetchall()
+        return [{'node_id': row[0], 'address': row[1], 'capacity': row[2], 'load': row[3], 'heartbeat': row[4]}
+                for row in rows]
+
+    def get_owner(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT node_id FROM sessions WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_owner(self, key, node_id, now):
+        self._write((
+            "INSERT OR REPLACE INTO sessions (key, node_id, updated_at) VALUES (?, ?, ?)",
+            (key, node_id, now)
+        ))
+
+    def delete_owner(self, key, node_id):
+        self._write(("DELETE FROM sessions WHERE key = ? AND node_id = ?", (key, node_id)))
+
+    def replace_sessions(self, node_id, keys, now):
+        with self._lock:
+            self._db.execute("DELETE FROM sessions WHERE node_id = ?", (node_id,))
+            self._db.executemany(
+                "INSERT OR REPLACE INTO sessions (key, node_id, updated_at) VALUES (?, ?, ?)",
+                [(key, node_id, now) for key in keys]
+            )
+            self._db.commit()
+
+    def session_counts(self):
+        with self._lock:
+            rows = self._db.execute("SELECT node_id, COUNT(*) FROM sessions GROUP BY node_id").fetchall()
+        return dict(rows)
+
+    def close(self):
+        if self._db:
+            self._db.close()
+            self._db = None
+
+
+class SessionRegistry:
+    """Mapeia cada sessão ao nó (processo) dono do navegador e escolhe o nó para sessões novas"""
+
+    def __init__(self, backend, node_id, address='', capacity=4, node_ttl=30):
+        self.backend = backend
+        self.node_id = node_id
+        self.address = address
+        self.capacity = max(1, capacity)
+        # Nó sem sinal de vida por este tempo é considerado fora do ar
+        self.node_ttl = node_ttl
+
+    @staticmethod
+    def encode_key(key):
+        """Chave da sessão (servidor, canal, usuário) como texto"""
+        return ':'.join(str(part) for part in key)
+
+    def heartbeat(self, load, keys=None):
+        """Anuncia o nó com sua carga; com `keys`, reconcilia as sessões que ele possui"""
+        now = time.time()
+        self.backend.upsert_node(self.node_id, self.address, self.capacity, load, now)
+        if keys is not None:
+            self.backend.replace_sessions(self.node_id, [self.encode_key(key) for key in keys], now)
+
+    def leave(self):
+        """Remove o nó e suas sessões do registro (encerramento normal)"""
+        self.backend.remove_node(self.node_id)
+
+    def live_nodes(self):
+        """Nós com sinal de vida recente"""
+        limit = time.time() - self.node_ttl
+        return [node for node in self.backend.nodes() if node['heartbeat'] >= limit]
+
+    def owner(self, key):
+        """Nó vivo dono da sessão ou None (sessões de nós fora do ar são descartadas)"""
+        encoded = self.encode_key(key)
+        node_id = self.backend.get_owner(encoded)
+        if node_id is None:
+            return None
+
+        for node in self.live_nodes():
+            if node['node_id'] == node_id:
+                return node
+
+        self.backend.delete_owner(encoded, node_id)
+        return None
+
+    def claim(self, key):
+        """Registra este nó como dono da sessão"""
+        self.backend.set_owner(self.encode_key(key), self.node_id, time.time())
+
+    def release(self, key):
+        """Remove a sessão se ainda pertencer a este nó"""
+        self.backend.delete_owner(self.encode_key(key), self.node_id)
+
+    def place(self):
+        """Nó com menor ocupação (carga / capacidade) para uma sessão nova; empate favorece este nó"""
+        nodes = self.live_nodes()
+        if not nodes:
+            return None
+
+        # Sessões registradas desde o último sinal de vida também contam
+        counts = self.backend.session_counts()
+
+        def occupancy(node):
+            load = max(node['load'], counts.get(node['node_id'], 0))
+            return load / max(1, node['capacity']), node['node_id'] != self.node_id
+
+        return min(nodes, key=occupancy)
+
+    def stats(self):
+        """Nós vivos com carga e sessões registradas"""
+        counts = self.backend.session_counts()
+        return [dict(node, sessions=counts.get(node['node_id'], 0), local=node['node_id'] == self.node_id)
+                for node in sorted(self.live_nodes(), key=lambda node: node['node_id'])]
@@ -0,0 +1,134 @@
+import time
+
+# Tempo máximo de espera (segundos) por tipo de ação
+WAIT_TIMEOUTS = {
+    'start': 10,
+    'navigate': 10,
+    'search': 8,
+    'click': 4,
+    'type': 1,
+    'scroll': 1,
+    'load_more': 5,
+    'default': 3,
+}
+
+# Script injetado na página: instala contadores de rede/DOM e retorna o estado atual
+READINESS_SCRIPT = """
+const state = window.__kkkWait || (function () {
+    const s = {inflight: 0, lastActivity: performance.now()};
+    const bump = () => { s.lastActivity = performance.now(); };
+
+    try {
+        new MutationObserver(bump).observe(document, {
+            subtree: true, childList: true, attributes: true, characterData: true
+        });
+    } catch (e) {}
+
+    const origFetch = window.fetch;
+    if (origFetch) {
+        window.fetch = function () {
+            s.inflight++; bump();
+            return origFetch.apply(this, arguments).finally(() => { s.inflight--; bump(); });
+        };
+    }
+
+    const origSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        s.inflight++; bump();
+        this.addEventListener('loadend', () => { s.inflight--; bump(); });
+        return origSend.apply(this, arguments);
+    };
+
+    window.__kkkWait = s;
+    return s;
+})();
+
+let lastResource = 0;
+for (const entry of performance.getEntriesByType('resource')) {
+    lastResource = Math.max(lastResource, entry.responseEnd);
+}
+
+const now = performance.now();
+return {
+    readyState: document.readyState,
+    inflight: state.inflight,
+    networkQuiet: now - lastResource,
+    domQuiet: now - state.lastActivity
+};
+"""
+
+# Avalia a condição "wait_for" de um passo de plano
+CONDITION_SCRIPT = """
+const condition = arguments[0];
+if (condition.selector) return document.querySelector(condition.selector) !== null;
+if (condition.text) {
+    const text = document.body ? document.body.innerText : '';
+    return text.toLowerCase().includes(condition.text.toLowerCase());
+}
+if (condition.url_contains) return location.href.includes(condition.url_contains);
+return true;
+"""
+
+
+class WaitEngine:
+    """Espera baseada em prontidão: retorna assim que a página estabiliza"""
+
+    def __init__(self, timeouts=None, network_idle=0.3, dom_quiet=0.2, poll_interval=0.05):
+        self.timeouts = dict(WAIT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.network_idle = network_idle
+        self.dom_quiet = dom_quiet
+        self.poll_interval = poll_interval
+
+    def timeout_for(self, action_type):
+        """Tempo máximo de espera para o tipo de ação"""
+        return self.timeouts.get(action_type, self.timeouts['default'])
+
+    def is_ready(self, status):
+        """Avalia o estado retornado pelo script de prontidão"""
+        if not status or status.get('readyState') == 'loading':
+            return False
+        if status.get('inflight', 0) > 0:
+            return False
+        if status.get('networkQuiet', 0) < self.network_idle * 1000:
+            return False
+        return status.get('domQuiet', 0) >= self.dom_quiet * 1000
+
+    def wait_ready(self, driver, action_type='default'):
+        """Bloqueia até a página ficar pronta ou o tempo máximo da ação (executado na thread do navegador)"""
+        deadline = time.monotonic() + self.timeout_for(action_type)
+
+        while True:
+            try:
+                status = driver.execute_script(READINESS_SCRIPT)
+            except Exception:
+                # Página em transição (navegação em andamento)
+                status = None
+
+            if self.is_ready(status):
+                return True
+
+            if time.monotonic() >= deadline:
+                return False
+
+            time.sleep(self.poll_interval)
+
+    def wait_for_condition(self, driver, condition, timeout=None):
+        """Bloqueia até a condição valer ou o tempo acabar (executado na thread do navegador)"""
+        if timeout is None:
+            timeout = self.timeouts['navigate']
+        deadline = time.monotonic() + timeout
+
+        while True:
+            try:
+                if driver.execute_script(CONDITION_SCRIPT, condition):
+                    return True
+            except Exception:
+                # Página em transição (navegação em andamento)
+                pass
+
+            if time.monotonic() >= deadline:
+                return False
+
+            time.sleep(self.poll_interval)